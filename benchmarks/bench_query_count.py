@@ -0,0 +1,75 @@
+"""
+Benchmark: Prolog queries issued with and without label predicate deduplication.
+
+Usage:
+	python benchmarks/bench_query_count.py [use_case] [rules_file] [csv_path]
+
+Defaults to KB/Rain_Forecast/generated_rules_rain.pl on the Rain_Forecast
+source CSV. Requires SWI-Prolog and PySwip.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from lib.auto_label import query_rule
+from lib.auto_label.query_rule import extract_predicates_from_rules, label_rows, load_prolog
+from lib.auto_label.query_engine_config import (
+	load_config,
+	build_column_mapping,
+	get_multi_label_mode,
+	get_rules_file,
+	get_source_csv_path
+)
+
+
+def run(prolog, df, predicates, column_mapping, prolog_var_names, multi_label):
+	# Label queries run through PySwip's term API, so count query_predicate calls
+	queries = 0
+	query_predicate = query_rule.query_predicate
+
+	def counting_query_predicate(*args, **kwargs):
+		nonlocal queries
+		queries += 1
+		return query_predicate(*args, **kwargs)
+
+	query_rule.query_predicate = counting_query_predicate
+	try:
+		start = time.perf_counter()
+		labels = label_rows(prolog, df, predicates, column_mapping, prolog_var_names, multi_label)
+		elapsed = time.perf_counter() - start
+	finally:
+		query_rule.query_predicate = query_predicate
+	return labels, queries, elapsed
+
+
+def main():
+	use_case = sys.argv[1] if len(sys.argv) > 1 else "Rain_Forecast"
+	config = load_config(use_case)
+	rule_file = os.path.join("KB", use_case, sys.argv[2]) if len(sys.argv) > 2 else get_rules_file(config, use_case)
+	csv_path = sys.argv[3] if len(sys.argv) > 3 else get_source_csv_path(config)
+
+	df = pd.read_csv(csv_path)
+	column_mapping, prolog_var_names = build_column_mapping(config)
+	multi_label = get_multi_label_mode(config)
+	prolog = load_prolog(rule_file)
+
+	per_clause, _ = extract_predicates_from_rules(rule_file, dedupe=False)
+	deduped, _ = extract_predicates_from_rules(rule_file, prolog_var_names=prolog_var_names)
+
+	labels_before, queries_before, time_before = run(prolog, df, per_clause, column_mapping, prolog_var_names, multi_label)
+	labels_after, queries_after, time_after = run(prolog, df, deduped, column_mapping, prolog_var_names, multi_label)
+
+	print(f"\nRule file: {rule_file} ({len(df)} rows)")
+	print(f"{'mode':<12}{'predicates':>12}{'queries':>10}{'seconds':>10}")
+	print(f"{'per-clause':<12}{len(per_clause):>12}{queries_before:>10}{time_before:>10.3f}")
+	print(f"{'deduped':<12}{len(deduped):>12}{queries_after:>10}{time_after:>10.3f}")
+	if queries_after:
+		print(f"Query reduction: {queries_before / queries_after:.1f}x")
+	print(f"Labels identical: {labels_before == labels_after}")
+
+
+if __name__ == "__main__":
+	main()
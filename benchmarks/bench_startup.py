@@ -0,0 +1,86 @@
+"""
+Benchmark: application startup cost (imports and time to first window).
+
+Usage:
+	python benchmarks/bench_startup.py [runs]
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters and
+reports the median import time, the slowest modules and whether any heavy
+module (pandas, matplotlib, PySwip, google.genai) is imported at startup.
+When a display is available it also times ``Project_UI()`` up to the first
+drawn window. Local runs only; nothing is written.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported after "Submit Rules"
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "pyswip", "google.genai", "dotenv"]
+
+FIRST_WINDOW_CODE = """
+import time
+start = time.perf_counter()
+import main
+ui = main.Project_UI()
+ui.app.update()
+print(time.perf_counter() - start)
+ui.app.destroy()
+"""
+
+
+def parse_importtime(stderr):
+	"""Parse ``-X importtime`` output into {module: (self_us, cumulative_us)}."""
+	modules = {}
+	for line in stderr.splitlines():
+		if not line.startswith("import time:") or "self [us]" in line:
+			continue
+		self_us, cumulative_us, name = line[len("import time:"):].split("|")
+		modules[name.strip()] = (int(self_us), int(cumulative_us))
+	return modules
+
+
+def import_profile():
+	result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+							cwd=ROOT, capture_output=True, text=True)
+	if result.returncode != 0:
+		raise RuntimeError(result.stderr.strip().splitlines()[-1])
+	return parse_importtime(result.stderr)
+
+
+def time_to_first_window():
+	result = subprocess.run([sys.executable, "-c", FIRST_WINDOW_CODE], cwd=ROOT, capture_output=True, text=True)
+	if result.returncode != 0:
+		return None
+	return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+	runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+	profiles = [import_profile() for _ in range(runs)]
+	totals = [profile["main"][1] / 1000 for profile in profiles]
+	last = profiles[-1]
+
+	print(f"import main: median {statistics.median(totals):.1f} ms over {runs} runs "
+		  f"(min {min(totals):.1f}, max {max(totals):.1f})")
+
+	print(f"\n{'module':<40}{'cumulative ms':>15}")
+	slowest = sorted(last.items(), key=lambda item: item[1][1], reverse=True)
+	for name, (_, cumulative_us) in [item for item in slowest if item[0] != "main"][:10]:
+		print(f"{name:<40}{cumulative_us / 1000:>15.1f}")
+
+	loaded = [name for name in HEAVY_MODULES if name in last]
+	print(f"\nHeavy modules imported at startup: {', '.join(loaded) if loaded else 'none'}")
+
+	windows = [time_to_first_window() for _ in range(runs)]
+	if None in windows:
+		print("Time to first window: skipped (no display or Tk error)")
+	else:
+		print(f"Time to first window: median {statistics.median(windows) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+	main()
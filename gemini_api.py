@@ -1,35 +1,347 @@
-from dotenv import load_dotenv
+import argparse
+import glob
 import os
-from google import genai
-from lib.auto_label.query_engine_config import build_variable_descriptions, get_prompt_template
+import random
+import time
+from datetime import datetime
+from lib.auto_label.query_engine_config import (
+    load_config,
+    get_kb_dir,
+    build_variable_descriptions,
+    get_prompt_template,
+    get_response_cache_dir,
+    get_response_cache_ttl,
+    get_response_cache_size
+)
+from lib.auto_label.response_cache import ResponseCache, response_key
 
 class GEMINI_GOOGLE:
-    def __init__(self):
-        load_dotenv()
-        self.client = genai.Client()
+    model = "gemini-2.5-flash"
+
+    def __init__(self, use_cache=True, client=None):
+        """Set up the Gemini wrapper.
+
+        The real client (and ``google.genai``) is only created on first use,
+        so constructing this object at application startup is free.
+
+        Args:
+            use_cache (bool): Reuse cached responses for repeated prompts.
+                Always off with an injected ``client``: cache keys only name
+                the model, so a stub's answers would later be served as
+                Gemini's.
+            client: Object with the ``google.genai.Client`` interface
+                (e.g. ``StubGeminiClient``); a real client when None.
+        """
+
+        self._client = client
+        self.use_cache = use_cache and client is None
+
+    @property
+    def client(self):
+        """The ``google.genai.Client``, created on first access."""
+
+        if self._client is None:
+            from dotenv import load_dotenv
+            from google import genai
+
+            load_dotenv()
+            self._client = genai.Client()
+        return self._client
+
+    def render_prompt(self, prompt, config=None):
+        """Render the config's prompt template around the user's prompt."""
 
-    def get_response(self, prompt, config=None):
-        """Generate Prolog rules based on prompt and config."""
-        
         # Build variable descriptions from config
         var_descriptions = build_variable_descriptions(config)
-        
+
         # Get prompt template from config
         template = get_prompt_template(config)
-        prompt_template = template.format(
+        return template.format(
             var_descriptions=var_descriptions,
             user_input=prompt
         )
-        
+
+    def get_cache(self, config=None):
+        """Return the response cache configured for ``config``, or None if disabled."""
+
+        cache_dir = get_response_cache_dir(config)
+        if not self.use_cache or not cache_dir:
+            return None
+        return ResponseCache(cache_dir, get_response_cache_ttl(config), get_response_cache_size(config))
+
+    def get_response(self, prompt, config=None):
+        """Generate Prolog rules based on prompt and config.
+
+        Responses are cached on disk by model, rendered prompt and config,
+        so submitting the same prompt again does not call the API.
+        """
+
+        prompt_template = self.render_prompt(prompt, config)
+
+        cache = self.get_cache(config)
+        key = response_key(self.model, prompt_template, config)
+        if cache is not None:
+            cached_text = cache.get(key)
+            if cached_text is not None:
+                print(f"Using cached response {key[:12]}")
+                return cached_text
+
         response = self.client.models.generate_content(
-            model="gemini-2.5-flash",
+            model=self.model,
             contents=prompt_template,
         )
 
+        if cache is not None and response.text:
+            cache.put(key, response.text, self.model)
         return response.text
 
-if __name__ == "__main__":
-    ai = GEMINI_GOOGLE()
+    def get_responses(self, prompts, config=None, concurrency=4, requests_per_minute=None,
+                      retries=3, timeout=120, backoff=2.0):
+        """Generate Prolog rules for many prompts concurrently.
+
+        Blocking wrapper around ``get_responses_async``.
+
+        Returns:
+            list: Response text per prompt (None where every attempt failed).
+        """
+        import asyncio
+
+        return asyncio.run(self.get_responses_async(prompts, config, concurrency, requests_per_minute,
+                                                    retries, timeout, backoff))
+
+    async def get_responses_async(self, prompts, config=None, concurrency=4, requests_per_minute=None,
+                                  retries=3, timeout=120, backoff=2.0):
+        """Generate Prolog rules for many prompts with the client's async API.
+
+        Cached prompts are answered without a request. The others run with at
+        most ``concurrency`` requests in flight; request starts are spaced to
+        stay under ``requests_per_minute``. A failed or timed-out request is
+        retried with exponential backoff and jitter.
+
+        Args:
+            prompts (list): User prompts.
+            config (dict): Use case config used to render every prompt.
+            concurrency (int): Maximum requests in flight.
+            requests_per_minute (float): Rate limit (None for no limit).
+            retries (int): Retries per prompt after the first attempt.
+            timeout (float): Seconds before a single request is abandoned.
+            backoff (float): Base delay in seconds before the first retry.
+
+        Returns:
+            list: Response text per prompt, in input order (None where every
+            attempt failed).
+        """
+        # asyncio is imported here rather than at module level; it dominates
+        # this module's import time and the UI never needs it
+        import asyncio
+
+        cache = self.get_cache(config)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        rate_lock = asyncio.Lock()
+        min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        next_start = [0.0]
+
+        async def wait_for_rate_limit():
+            async with rate_lock:
+                delay = next_start[0] - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_start[0] = time.monotonic() + min_interval
+
+        async def generate(index, prompt):
+            prompt_template = self.render_prompt(prompt, config)
+            key = response_key(self.model, prompt_template, config)
+            if cache is not None:
+                cached_text = cache.get(key)
+                if cached_text is not None:
+                    print(f"[{index}] Using cached response {key[:12]}")
+                    return cached_text
+
+            async with semaphore:
+                for attempt in range(retries + 1):
+                    await wait_for_rate_limit()
+                    try:
+                        response = await asyncio.wait_for(
+                            self.client.aio.models.generate_content(model=self.model, contents=prompt_template),
+                            timeout,
+                        )
+                        if cache is not None and response.text:
+                            cache.put(key, response.text, self.model)
+                        return response.text
+                    except Exception as e:
+                        reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+                        if attempt == retries:
+                            print(f"[{index}] Giving up after {retries + 1} attempts: {reason}")
+                            return None
+                        delay = backoff * (2 ** attempt) * (1 + random.random())
+                        print(f"[{index}] Request failed ({reason}); retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+
+        return await asyncio.gather(*(generate(index, prompt) for index, prompt in enumerate(prompts)))
+
+
+class StubGeminiClient:
+    """Offline stand-in for ``google.genai.Client``.
+
+    Implements ``models.generate_content`` and ``aio.models.generate_content``
+    and answers every prompt with ``reply(contents)`` (a fixed rule by
+    default), so generation can run in tests without network or API key.
+    """
+
+    class _Response:
+        def __init__(self, text):
+            self.text = text
 
-    result = ai.get_response(prompt="ถ้าอุณหภูมิเกิน 35 องศา ให้เตือนว่า Danger")
-    print(result)
+    class _Models:
+        def __init__(self, client):
+            self.client = client
+
+        def generate_content(self, model, contents):
+            self.client.calls.append((model, contents))
+            return StubGeminiClient._Response(self.client.reply(contents))
+
+    class _AsyncModels(_Models):
+        async def generate_content(self, model, contents):
+            import asyncio
+
+            if self.client.delay:
+                await asyncio.sleep(self.client.delay)
+            return StubGeminiClient._Models.generate_content(self, model, contents)
+
+    class _Aio:
+        def __init__(self, client):
+            self.models = StubGeminiClient._AsyncModels(client)
+
+    def __init__(self, reply=None, delay=0.0):
+        """
+        Args:
+            reply (callable): Maps the rendered prompt to the response text.
+            delay (float): Seconds each async request takes.
+        """
+
+        self.reply = reply or (lambda contents: "stub_label(_, 'stub') :- true.")
+        self.delay = delay
+        self.calls = []
+        self.models = StubGeminiClient._Models(self)
+        self.aio = StubGeminiClient._Aio(self)
+
+
+def save_generated_rules(prolog_rules, use_case, config, suffix=""):
+    """Write generated rules to a timestamped ``.pl`` file under ``KB/<use_case>/``.
+
+    Uses the same layout as ``Project_UI.save_rules_to_file``.
+
+    Args:
+        prolog_rules (str): Generated Prolog text, one rule per line.
+        use_case (str): Use case name.
+        config (dict): Use case config (for the KB directory).
+        suffix (str): Appended to the filename so files written in the same
+            second do not collide.
+
+    Returns:
+        str: Path of the written file.
+    """
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    rules_filename = f"generated_rules_{timestamp}{suffix}.pl"
+    rules_file_path = os.path.join(get_kb_dir(config), use_case, rules_filename)
+
+    with open(rules_file_path, "w", encoding='utf-8') as f:
+        f.write(":- encoding(utf8).\n")
+        for rule in prolog_rules.strip().split('\n'):
+            f.write(rule + "\n")
+    return rules_file_path
+
+
+def generate_rules_from_dir(prompt_dir, use_case, pattern="*.txt", kb_dir="KB", client=None, use_cache=True,
+                            concurrency=4, requests_per_minute=None, retries=3, timeout=120):
+    """Generate one rules file per prompt file in a directory.
+
+    Args:
+        prompt_dir (str): Directory containing prompt text files.
+        use_case (str): Use case whose config renders the prompts.
+        pattern (str): Glob pattern for prompt files.
+        kb_dir (str): Directory where knowledge base files are stored.
+        client: Client to use instead of a real Gemini client (optional;
+            responses are then never cached).
+        use_cache (bool): Reuse cached responses for repeated prompts.
+        concurrency (int): Maximum requests in flight.
+        requests_per_minute (float): Rate limit (None for no limit).
+        retries (int): Retries per prompt after the first attempt.
+        timeout (float): Seconds before a single request is abandoned.
+
+    Returns:
+        dict: {prompt file: written rules path, or None if generation failed}
+    """
+
+    config = load_config(use_case, kb_dir)
+    prompt_files = sorted(glob.glob(os.path.join(prompt_dir, pattern)))
+    prompts = []
+    for prompt_file in prompt_files:
+        with open(prompt_file, 'r', encoding='utf-8') as f:
+            prompts.append(f.read())
+
+    gemini = GEMINI_GOOGLE(use_cache=use_cache, client=client)
+    responses = gemini.get_responses(prompts, config, concurrency, requests_per_minute, retries, timeout)
+
+    results = {}
+    for prompt_file, response in zip(prompt_files, responses):
+        if not response:
+            results[prompt_file] = None
+            continue
+        stem = os.path.splitext(os.path.basename(prompt_file))[0]
+        results[prompt_file] = save_generated_rules(response, use_case, config, suffix=f"_{stem}")
+        print(f"{prompt_file} -> {results[prompt_file]}")
+    return results
+
+
+def build_parser(prog=None):
+    """Build the argument parser of the rule generation command line.
+
+    It is the only definition of these options: ``python gemini_api.py``
+    and ``python -m lib.auto_label generate`` both parse with it.
+
+    Args:
+        prog (str): Program name shown in usage and help (script name if None).
+
+    Returns:
+        argparse.ArgumentParser: Parser for the generation options.
+    """
+
+    parser = argparse.ArgumentParser(prog=prog, description="Generate Prolog rule files from a directory of prompts.")
+    parser.add_argument("prompt_dir", help="Directory containing prompt files")
+    parser.add_argument("--use-case", required=True, help="Use case name, e.g. PM_Temperature")
+    parser.add_argument("--pattern", default="*.txt", help="Glob pattern for prompt files")
+    parser.add_argument("--kb-dir", default="KB", help="Knowledge base directory")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum requests in flight")
+    parser.add_argument("--rpm", type=float, default=None, help="Maximum requests per minute")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per prompt")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per request")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API")
+    parser.add_argument("--stub", action="store_true", help="Use the offline stub client")
+    return parser
+
+
+def main(argv=None, prog=None):
+    """Generate rule files as requested on the command line.
+
+    Args:
+        argv (list): Arguments (``sys.argv[1:]`` if None).
+        prog (str): Program name shown in usage and help.
+
+    Returns:
+        int: Process exit code (1 if any prompt failed).
+    """
+
+    args = build_parser(prog).parse_args(argv)
+
+    results = generate_rules_from_dir(args.prompt_dir, args.use_case, args.pattern, args.kb_dir,
+                                      client=StubGeminiClient() if args.stub else None,
+                                      use_cache=not args.no_cache, concurrency=args.concurrency,
+                                      requests_per_minute=args.rpm, retries=args.retries, timeout=args.timeout)
+    failed = [prompt_file for prompt_file, path in results.items() if path is None]
+    print(f"Generated {len(results) - len(failed)} of {len(results)} rule files")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""
+Headless command line for the auto-labeling pipeline.
+
+Usage:
+	python -m lib.auto_label label --use-case PM_Temperature --rules generated_rules_x.pl \
+		--input data/PM_Temp.csv --output data/PM_Temp_labeled.csv
+	python -m lib.auto_label generate domain --use-case PM_Temperature
+
+Only the modules a subcommand needs are imported, so labeling never loads
+Tkinter, matplotlib or the Gemini client, and Prolog is only started when
+some rows cannot be labeled by the vectorized compiler. ``--plot`` renders
+the result plot headless in a worker process, which loads matplotlib there.
+"""
+import argparse
+import sys
+import time
+
+
+def build_parser():
+	"""
+	Build the argument parser with one sub-parser per subcommand.
+
+	Returns:
+		argparse.ArgumentParser: Parser for ``python -m lib.auto_label``
+	"""
+	parser = argparse.ArgumentParser(prog="python -m lib.auto_label", description="Auto-labeling pipeline")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	label = subparsers.add_parser("label", help="Label a CSV file with a rule file")
+	label.add_argument("--use-case", required=True, help="Use case name, e.g. PM_Temperature")
+	label.add_argument("--rules", help="Rules filename inside KB/<use_case> (config default if omitted)")
+	label.add_argument("--input", required=True, help="CSV file to label")
+	label.add_argument("--output", help="Labeled CSV path (config output_csv_pattern if omitted)")
+	label.add_argument("--kb-dir", default="KB", help="Knowledge base directory")
+	label.add_argument("--label-column", help="Name of the label column (overrides config)")
+	label.add_argument("--multi-label", dest="multi_label", action="store_true", default=None,
+					   help="Collect all matching labels (overrides config)")
+	label.add_argument("--single-label", dest="multi_label", action="store_false",
+					   help="Keep only the first matching label (overrides config)")
+	label.add_argument("--no-vectorize", dest="vectorize", action="store_false", default=None,
+					   help="Label every row through Prolog")
+	label.add_argument("--batch", action="store_true", default=None, help="Label Prolog rows set-at-a-time")
+	label.add_argument("--workers", type=int, help="Worker processes for Prolog labeling (overrides config)")
+	label.add_argument("--chunksize", type=int, help="Stream the CSV in chunks of this many rows (overrides config)")
+	label.add_argument("--incremental", action="store_true", default=None,
+					   help="Only label rows appended since the last run (overrides config)")
+	label.add_argument("--rule-diff", dest="rule_diff", action="store_true", default=None,
+					   help="Relabel an already labeled input only where the rule change affects it")
+	label.add_argument("--plot", action="store_true",
+					   help="Render the result plot headless in a separate process")
+	label.set_defaults(func=run_label)
+
+	# Options (and --help) are parsed by gemini_api's own parser, see run_generate
+	generate = subparsers.add_parser("generate", add_help=False,
+									 help="Generate rule files from a directory of prompts (generate --help)")
+	generate.set_defaults(func=run_generate)
+	return parser
+
+
+def run_label(args):
+	"""Run the ``label`` subcommand."""
+	from lib.auto_label.labeling_engine import LabelingEngine
+
+	started = time.perf_counter()
+	engine = LabelingEngine(args.use_case, args.kb_dir, rules_file=args.rules, label_column=args.label_column,
+							multi_label=args.multi_label, vectorize=args.vectorize, batch=args.batch,
+							workers=args.workers)
+	try:
+		result = engine.label_dataset(args.input, args.output, chunksize=args.chunksize, incremental=args.incremental,
+									  rule_diff=args.rule_diff, keep_frame=args.plot)
+	finally:
+		engine.close()
+	print(f"Wrote {result.rows} rows to {result.output_path} in {time.perf_counter() - started:.2f}s "
+		  f"(labeling {result.timings['label']:.2f}s)")
+
+	if args.plot:
+		from lib.auto_label.query_engine_config import get_plot_max_points
+		from render_graph import render_in_background
+
+		started = time.perf_counter()
+		plot = render_in_background(args.use_case, result.output_path, get_plot_max_points(engine.config), result.df)
+		if plot.result() is None:
+			return 1
+		result.timings['plot'] = time.perf_counter() - started
+		print(f"Plotted in {result.timings['plot']:.2f}s")
+	return 0
+
+
+def run_generate(args):
+	"""
+	Run the ``generate`` subcommand through ``gemini_api.main``.
+
+	The generation options are defined once, in ``gemini_api.build_parser``,
+	and only parsed here after the subcommand was chosen, so ``label`` runs
+	never import ``gemini_api``.
+	"""
+	from gemini_api import main as generate_main
+
+	return generate_main(args.extra, prog="python -m lib.auto_label generate")
+
+
+def main(argv=None):
+	"""
+	Parse arguments and run the selected subcommand.
+
+	Args:
+		argv (list): Arguments (``sys.argv[1:]`` if None)
+
+	Returns:
+		int: Process exit code
+	"""
+	parser = build_parser()
+	args, extra = parser.parse_known_args(argv)
+	if extra and args.command != "generate":
+		parser.error(f"unrecognized arguments: {' '.join(extra)}")
+	args.extra = extra
+	return args.func(args)
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,327 @@
+import io
+import os
+from contextlib import contextmanager
+import pandas as pd
+
+# File extension -> dataset format
+FORMAT_EXTENSIONS = {
+	'.csv': 'csv',
+	'.parquet': 'parquet',
+	'.pq': 'parquet',
+	'.feather': 'feather',
+	'.arrow': 'feather',
+	'.ipc': 'feather',
+}
+
+# Columns recording the rules used for labeling; constant ones are kept in
+# the schema metadata of columnar files, under these keys
+PROVENANCE_METADATA_KEYS = {'rules_file': b'rules_file', 'rules_hash': b'rules_hash'}
+
+
+def get_dataset_format(path):
+	"""
+	Get the dataset format of a path from its extension.
+
+	Args:
+		path (str): Dataset file path
+
+	Returns:
+		str: 'csv', 'parquet' or 'feather' (Arrow IPC)
+	"""
+	ext = os.path.splitext(path)[1].lower()
+	if ext not in FORMAT_EXTENSIONS:
+		raise ValueError(f"Unsupported dataset format '{ext}' for {path}; use one of {sorted(FORMAT_EXTENSIONS)}")
+	return FORMAT_EXTENSIONS[ext]
+
+
+def _import_pyarrow():
+	"""Import pyarrow, which Parquet and Feather support depends on."""
+	try:
+		import pyarrow
+		import pyarrow.feather
+		import pyarrow.parquet
+	except ImportError as e:
+		raise ImportError("Parquet/Feather datasets require pyarrow (pip install pyarrow)") from e
+	return pyarrow
+
+
+class _BoundedReader(io.RawIOBase):
+	"""Raw binary reader that stops after the first ``limit`` bytes of a file."""
+
+	def __init__(self, f, limit):
+		self._file = f
+		self._remaining = limit
+
+	def readable(self):
+		return True
+
+	def readinto(self, buffer):
+		size = min(len(buffer), self._remaining)
+		if size <= 0:
+			return 0
+		data = self._file.read(size)
+		buffer[:len(data)] = data
+		self._remaining -= len(data)
+		return len(data)
+
+
+@contextmanager
+def _open_csv(path, end=None):
+	"""
+	Open a CSV for pandas, limited to its first ``end`` bytes when given.
+
+	Bytes appended after ``end`` (possibly a line still being written) are
+	never read.
+	"""
+	if end is None:
+		yield path
+		return
+	with open(path, 'rb') as f:
+		yield io.BufferedReader(_BoundedReader(f, end))
+
+
+def read_dataset(path, columns=None, memory_map=True, end=None):
+	"""
+	Read a CSV, Parquet or Feather dataset.
+
+	Columnar files are memory-mapped, so only the columns that are used are
+	actually read from disk. The ``rules_file`` and ``rules_hash`` stored in
+	the file metadata are returned in ``df.attrs``.
+
+	Args:
+		path (str): Dataset file path
+		columns (list): Only read these columns (optional)
+		memory_map (bool): Memory-map columnar files
+		end (int): Only read CSV bytes before this offset (optional; ignored
+			for columnar files)
+
+	Returns:
+		pd.DataFrame: Dataset contents
+	"""
+	fmt = get_dataset_format(path)
+	if fmt == 'csv':
+		if end == 0:
+			# Not even the header line is complete yet
+			return pd.read_csv(path, nrows=0, usecols=columns)
+		with _open_csv(path, end) as source:
+			return pd.read_csv(source, usecols=columns)
+
+	pa = _import_pyarrow()
+	if fmt == 'parquet':
+		table = pa.parquet.read_table(path, columns=columns, memory_map=memory_map)
+	else:
+		table = pa.feather.read_table(path, columns=columns, memory_map=memory_map)
+
+	df = table.to_pandas()
+	metadata = table.schema.metadata or {}
+	for column, key in PROVENANCE_METADATA_KEYS.items():
+		if key in metadata:
+			df.attrs[column] = metadata[key].decode('utf-8')
+	return df
+
+
+def dataset_columns(path):
+	"""
+	Get the column names of a dataset without reading its rows.
+
+	Args:
+		path (str): Dataset file path
+
+	Returns:
+		list: Column names
+	"""
+	fmt = get_dataset_format(path)
+	if fmt == 'csv':
+		return list(pd.read_csv(path, nrows=0).columns)
+
+	pa = _import_pyarrow()
+	if fmt == 'parquet':
+		return list(pa.parquet.read_schema(path).names)
+	return list(pa.feather.read_table(path, memory_map=True).column_names)
+
+
+def iter_dataset_chunks(path, chunksize, end=None):
+	"""
+	Iterate over a dataset in DataFrames of at most ``chunksize`` rows.
+
+	Args:
+		path (str): Dataset file path
+		chunksize (int): Rows per chunk
+		end (int): Only read CSV bytes before this offset (optional; ignored
+			for columnar files)
+
+	Yields:
+		pd.DataFrame: Consecutive chunks of the dataset
+	"""
+	fmt = get_dataset_format(path)
+	if fmt == 'csv':
+		if end == 0:
+			return
+		with _open_csv(path, end) as source:
+			yield from pd.read_csv(source, chunksize=chunksize)
+		return
+
+	pa = _import_pyarrow()
+	if fmt == 'parquet':
+		batches = pa.parquet.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize)
+	else:
+		batches = pa.feather.read_table(path, memory_map=True).to_batches(max_chunksize=chunksize)
+	for batch in batches:
+		yield batch.to_pandas()
+
+
+def _to_arrow_table(df, label_column, label_type=None):
+	"""
+	Convert a labeled DataFrame to an Arrow table for columnar output.
+
+	The label column is dictionary-encoded. Constant ``rules_file`` and
+	``rules_hash`` columns are dropped and stored in the schema metadata
+	instead.
+	"""
+	pa = _import_pyarrow()
+	provenance = {}
+	for column in PROVENANCE_METADATA_KEYS:
+		if column in df.columns and df[column].nunique(dropna=False) <= 1:
+			if len(df):
+				provenance[column] = df[column].iloc[0]
+			df = df.drop(columns=[column])
+
+	table = pa.Table.from_pandas(df, preserve_index=False)
+	if label_column and label_column in table.column_names:
+		index = table.column_names.index(label_column)
+		labels = table.column(index).cast(pa.string()).dictionary_encode()
+		if label_type is not None:
+			labels = labels.cast(label_type)
+		table = table.set_column(index, pa.field(label_column, labels.type), labels)
+
+	if provenance:
+		metadata = dict(table.schema.metadata or {})
+		for column, value in provenance.items():
+			metadata[PROVENANCE_METADATA_KEYS[column]] = str(value).encode('utf-8')
+		table = table.replace_schema_metadata(metadata)
+	return table
+
+
+def part_path(path):
+	"""
+	Get the temporary path a dataset is written to before it replaces ``path``.
+
+	Args:
+		path (str): Final dataset path
+
+	Returns:
+		str: ``<path>.part<ext>`` (same extension, so the format is kept)
+	"""
+	return f"{path}.part{os.path.splitext(path)[1]}"
+
+
+def write_dataset(df, path, label_column=None):
+	"""
+	Write a labeled DataFrame as CSV, Parquet or Feather (by extension).
+
+	CSV output is written as is. Columnar output stores ``label_column`` as a
+	dictionary-encoded (categorical) column and moves the constant
+	``rules_file`` and ``rules_hash`` columns into the file metadata.
+
+	The file is written to ``part_path(path)`` and then moved into place, so
+	an existing file at ``path`` (possibly the input that was labeled) is
+	only replaced by a complete one.
+
+	Args:
+		df (pd.DataFrame): Data to write
+		path (str): Output file path
+		label_column (str): Name of the label column (optional)
+	"""
+	fmt = get_dataset_format(path)
+	write_path = part_path(path)
+	try:
+		if fmt == 'csv':
+			df.to_csv(write_path, index=False)
+		else:
+			pa = _import_pyarrow()
+			table = _to_arrow_table(df, label_column)
+			if fmt == 'parquet':
+				pa.parquet.write_table(table, write_path)
+			else:
+				pa.feather.write_feather(table, write_path)
+	except BaseException:
+		if os.path.exists(write_path):
+			os.remove(write_path)
+		raise
+	os.replace(write_path, path)
+
+
+def _widen_schema(schema):
+	"""
+	Widen integer fields to float64 for a file written chunk by chunk.
+
+	The Parquet schema is fixed by the first chunk, but pandas infers types
+	per chunk: a column that is all integers in the first chunk may hold
+	fractions or missing values in a later one.
+	"""
+	pa = _import_pyarrow()
+	fields = [field.with_type(pa.float64()) if pa.types.is_integer(field.type) else field for field in schema]
+	return pa.schema(fields, metadata=schema.metadata)
+
+
+class DatasetWriter:
+	"""
+	Append labeled chunks to a CSV or Parquet file.
+
+	Arrow IPC (Feather) files need one dictionary for the whole file, so
+	they cannot be written chunk by chunk; use Parquet for streamed
+	columnar output. Integer columns are written to Parquet as float64 (see
+	``_widen_schema``).
+	"""
+
+	def __init__(self, path, label_column=None):
+		"""
+		Args:
+			path (str): Output file path
+			label_column (str): Name of the label column (optional)
+		"""
+		self.path = path
+		self.label_column = label_column
+		self.format = get_dataset_format(path)
+		if self.format == 'feather':
+			raise ValueError("Chunked labeling cannot write Feather files; use .parquet or .csv output")
+		self._file = None
+		self._writer = None
+		self._closed = False
+
+	def write(self, df):
+		"""Append one chunk."""
+		if self.format == 'csv':
+			if self._file is None:
+				self._file = open(self.path, 'w', newline='', encoding='utf-8')
+				df.to_csv(self._file, header=True, index=False)
+			else:
+				df.to_csv(self._file, header=False, index=False)
+			return
+
+		pa = _import_pyarrow()
+		table = _to_arrow_table(df, self.label_column, pa.dictionary(pa.int32(), pa.string()))
+		if self._writer is None:
+			self._writer = pa.parquet.ParquetWriter(self.path, _widen_schema(table.schema))
+		self._writer.write_table(table.cast(self._writer.schema))
+
+	def close(self):
+		"""Finish the file."""
+		if self._closed:
+			return
+		self._closed = True
+		if self._file is None and self._writer is None and self.format == 'csv':
+			# Nothing was written; still leave an (empty) output file behind
+			open(self.path, 'w').close()
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+		if self._writer is not None:
+			self._writer.close()
+			self._writer = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		self.close()
@@ -0,0 +1,193 @@
+import io
+import json
+import os
+import pandas as pd
+from lib.auto_label.dataset_io import get_dataset_format, read_dataset, write_dataset
+
+# Bump when the watermark format changes so old sidecars trigger a rebuild
+WATERMARK_VERSION = 2
+WATERMARK_SUFFIX = ".watermark.json"
+
+
+def watermark_path(source_path):
+	"""
+	Get the watermark sidecar path of a source dataset.
+
+	Args:
+		source_path (str): Path to the source dataset
+
+	Returns:
+		str: ``<source_path>.watermark.json``
+	"""
+	return source_path + WATERMARK_SUFFIX
+
+
+def load_watermark(source_path):
+	"""
+	Load the watermark left by the last labeling run of a source.
+
+	Args:
+		source_path (str): Path to the source dataset
+
+	Returns:
+		dict: Watermark, or None if missing, unreadable or outdated
+	"""
+	try:
+		with open(watermark_path(source_path), 'r', encoding='utf-8') as f:
+			watermark = json.load(f)
+	except (OSError, ValueError):
+		return None
+	if watermark.get('version') != WATERMARK_VERSION:
+		return None
+	return watermark
+
+
+def save_watermark(source_path, output_path, rules_hash, settings, rows, offset):
+	"""
+	Record how far a source has been labeled.
+
+	Args:
+		source_path (str): Path to the source dataset
+		output_path (str): Labeled output the rows were written to
+		rules_hash (str): Content hash of the rule file used
+		settings (dict): Labeling settings that change the output
+		rows (int): Number of source rows labeled so far
+		offset (int): Byte offset just after the last labeled CSV line
+	"""
+	watermark = {
+		'version': WATERMARK_VERSION,
+		'output_path': os.path.abspath(output_path),
+		'rules_hash': rules_hash,
+		'settings': settings,
+		'rows': rows,
+		'offset': offset,
+	}
+	tmp_path = watermark_path(source_path) + '.tmp'
+	with open(tmp_path, 'w', encoding='utf-8') as f:
+		json.dump(watermark, f, ensure_ascii=False, indent=2)
+	os.replace(tmp_path, watermark_path(source_path))
+
+
+def complete_lines_offset(path, block_size=65536):
+	"""
+	Get the byte offset just after the last complete line of a file.
+
+	A line still being written by an appending process is left for the next
+	run. A file that simply does not end with a newline looks the same, so
+	its last row is labeled once the next row is appended after it.
+
+	Args:
+		path (str): Path to a text file
+
+	Returns:
+		int: Offset after the last newline (0 if there is none)
+	"""
+	with open(path, 'rb') as f:
+		end = f.seek(0, os.SEEK_END)
+		position = end
+		while position > 0:
+			start = max(0, position - block_size)
+			f.seek(start)
+			block = f.read(position - start)
+			newline = block.rfind(b'\n')
+			if newline >= 0:
+				return start + newline + 1
+			position = start
+	return 0
+
+
+def source_end(path):
+	"""
+	Get the watermark position of the end of a source dataset.
+
+	Args:
+		path (str): Path to the source dataset
+
+	Returns:
+		int: Offset after the last complete CSV line, or 0 for columnar files
+			(which are tracked by row count only)
+	"""
+	if get_dataset_format(path) == 'csv':
+		return complete_lines_offset(path)
+	return 0
+
+
+def read_source_tail(path, watermark, end):
+	"""
+	Read the rows appended to a source since the watermark.
+
+	Args:
+		path (str): Path to the source dataset
+		watermark (dict): Watermark from ``load_watermark``
+		end (int): Offset from ``source_end`` taken before reading
+
+	Returns:
+		pd.DataFrame: New rows (possibly empty)
+	"""
+	if get_dataset_format(path) != 'csv':
+		return read_dataset(path).iloc[watermark['rows']:].reset_index(drop=True)
+
+	columns = pd.read_csv(path, nrows=0).columns
+	with open(path, 'rb') as f:
+		f.seek(watermark['offset'])
+		data = f.read(end - watermark['offset'])
+	if not data.strip():
+		return pd.DataFrame(columns=columns)
+
+	return pd.read_csv(io.BytesIO(data), header=None, names=columns)
+
+
+def append_output(df, output_path, label_column):
+	"""
+	Append labeled rows to an existing labeled output.
+
+	CSV output is appended in place; Parquet/Feather output is rewritten
+	with the new rows added, which is still cheaper than relabeling.
+
+	Args:
+		df (pd.DataFrame): Newly labeled rows
+		output_path (str): Existing labeled output
+		label_column (str): Name of the label column
+	"""
+	if get_dataset_format(output_path) == 'csv':
+		with open(output_path, 'a', newline='', encoding='utf-8') as f:
+			df.to_csv(f, header=False, index=False)
+		return
+
+	existing = read_dataset(output_path)
+	for column in ('rules_file', 'rules_hash'):
+		if column in existing.attrs and column not in existing.columns:
+			existing[column] = existing.attrs[column]
+	if label_column in existing.columns:
+		existing[label_column] = existing[label_column].astype(object)
+	write_dataset(pd.concat([existing, df], ignore_index=True), output_path, label_column)
+
+
+def can_resume(watermark, source_path, output_path, rules_hash, settings, end):
+	"""
+	Check whether a watermark allows labeling only the new tail of a source.
+
+	Args:
+		watermark (dict): Watermark from ``load_watermark`` (or None)
+		source_path (str): Path to the source dataset
+		output_path (str): Requested output path (None to reuse the watermark's)
+		rules_hash (str): Content hash of the active rule file
+		settings (dict): Active labeling settings
+		end (int): Offset from ``source_end``
+
+	Returns:
+		str: Reason a full rebuild is needed, or None if the tail can be appended
+	"""
+	if watermark is None:
+		return "no watermark"
+	if watermark['rules_hash'] != rules_hash:
+		return "rules changed"
+	if watermark['settings'] != settings:
+		return "labeling settings changed"
+	if output_path is not None and os.path.abspath(output_path) != watermark['output_path']:
+		return "different output path"
+	if not os.path.exists(watermark['output_path']):
+		return "labeled output missing"
+	if get_dataset_format(source_path) == 'csv' and end < watermark['offset']:
+		return "source was truncated"
+	return None
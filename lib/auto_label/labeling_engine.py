@@ -0,0 +1,499 @@
+import os
+import csv
+import time
+import pandas as pd
+from lib.auto_label.query_engine_config import (
+	load_config,
+	build_column_mapping,
+	get_kb_dir,
+	get_label_column,
+	get_multi_label_mode,
+	get_vectorize_mode,
+	get_batch_mode,
+	get_worker_count,
+	get_chunk_size,
+	get_label_cache_size,
+	get_incremental_mode,
+	get_rule_diff_mode,
+	get_csv_headers,
+	get_rules_file,
+	get_output_csv_path
+)
+from lib.auto_label.query_rule import extract_predicates_from_rules, label_dataframe, label_csv_in_chunks, PrologWorkerPool
+from lib.auto_label.rule_cache import consult_compiled, unload_rules, rule_file_hash, LRUCache
+from lib.auto_label.dataset_io import get_dataset_format, dataset_columns, read_dataset, write_dataset
+from lib.auto_label.incremental import (
+	load_watermark,
+	save_watermark,
+	source_end,
+	read_source_tail,
+	append_output,
+	can_resume
+)
+from lib.auto_label.rule_diff import affected_rows
+
+
+class LabelResult:
+	"""
+	Outcome of one labeling run.
+
+	Attributes:
+		output_path (str): Path of the labeled output file that was written
+		rows (int): Number of rows in the labeled output
+		timings (dict): Seconds spent per step ('label'; callers add their own,
+			e.g. 'plot')
+		df (pd.DataFrame): The labeled rows, when the run was asked to keep
+			them (None otherwise)
+	"""
+
+	def __init__(self, output_path, rows, timings=None, df=None):
+		self.output_path = output_path
+		self.rows = rows
+		self.timings = timings if timings is not None else {}
+		self.df = df
+
+	def __repr__(self):
+		return f"LabelResult(output_path={self.output_path!r}, rows={self.rows}, timings={self.timings})"
+
+
+class LabelingEngine:
+	"""
+	Long-lived labeling engine that owns one Prolog instance.
+
+	PySwip embeds a single, process-global SWI-Prolog engine. Each rule set is
+	loaded into its own module (``rules_<hash>``) so switching to another
+	``generated_rules_*.pl`` unloads the previous clauses instead of piling
+	them up in ``user``. Prolog is only started when some rows actually need
+	it; rule sets the vectorized compiler handles never touch SWI.
+	"""
+
+	def __init__(self, use_case, kb_dir="KB", rules_file=None, label_column=None, multi_label=None,
+				 vectorize=None, batch=None, workers=None, label_cache_size=None):
+		"""
+		Load the use case config and rule set.
+
+		Args:
+			use_case (str): The use case name (e.g., 'PM_Temperature')
+			kb_dir (str): Directory where knowledge base files are stored
+			rules_file (str): Rules filename inside ``KB/<use_case>`` (config default if None)
+			label_column (str): Name of the label column (overrides config)
+			multi_label (bool): Collect all matching labels (overrides config)
+			vectorize (bool): Compile rules to vectorized masks when possible (overrides config)
+			batch (bool): Label Prolog rows set-at-a-time (overrides config)
+			workers (int): Number of worker processes for Prolog labeling (overrides config)
+			label_cache_size (int): Input tuples whose Prolog labels are remembered
+				across calls, 0 to disable (overrides config)
+		"""
+		self.use_case = use_case
+		self.config = load_config(use_case, kb_dir)
+
+		# Use config defaults if not specified
+		self.label_column = label_column if label_column is not None else get_label_column(self.config)
+		self.multi_label = multi_label if multi_label is not None else get_multi_label_mode(self.config)
+		self.vectorize = vectorize if vectorize is not None else get_vectorize_mode(self.config)
+		self.batch = batch if batch is not None else get_batch_mode(self.config)
+		self.workers = workers if workers is not None else get_worker_count(self.config)
+		if label_cache_size is None:
+			label_cache_size = get_label_cache_size(self.config)
+		self.label_cache = LRUCache(label_cache_size) if label_cache_size else None
+
+		# Build column mapping from config
+		self.column_mapping, self.prolog_var_names = build_column_mapping(self.config)
+
+		self._prolog = None
+		self.worker_pool = None
+		self.module = None
+		self.loaded_file = None
+		self.rule_file = None
+		self.rules_file = None
+		self.rules_hash = None
+		self.predicates = []
+		self.load_rules(rules_file)
+
+	def resolve_rule_file(self, rules_file=None):
+		"""
+		Resolve a rules filename to its path in the knowledge base.
+
+		Args:
+			rules_file (str): Specific rules filename (config default if None)
+
+		Returns:
+			tuple: (rule_file path, rules_file name)
+		"""
+		# Load rule file - use specific file if provided, otherwise use config default
+		if rules_file:
+			rule_file = os.path.join(get_kb_dir(self.config), self.use_case, rules_file)
+		else:
+			rule_file = get_rules_file(self.config, self.use_case)
+			rules_file = os.path.basename(rule_file)  # Extract filename for metadata
+
+		if not os.path.exists(rule_file):
+			raise FileNotFoundError(f"Rule file not found: {rule_file}")
+		return rule_file, rules_file
+
+	def load_rules(self, rules_file=None):
+		"""
+		Switch the engine to another rule set.
+
+		The previous rule set is unloaded from Prolog. Loading the rule set
+		that is already active (same content) is a no-op.
+
+		Args:
+			rules_file (str): Rules filename inside ``KB/<use_case>`` (config default if None)
+		"""
+		rule_file, rules_file = self.resolve_rule_file(rules_file)
+		rules_hash = rule_file_hash(rule_file)
+		if rule_file == self.rule_file and rules_hash == self.rules_hash:
+			return
+
+		self.unload_rules()
+		if self.label_cache is not None:
+			self.label_cache.clear()
+		self.rule_file = rule_file
+		self.rules_file = rules_file
+		self.rules_hash = rules_hash
+		# Workers start on first use and consult this rule file once
+		self.worker_pool = PrologWorkerPool(rule_file, self.workers)
+
+		# Extract label predicates and all rules
+		# label_predicates: only predicates that output labels (for querying)
+		# all_rules: all rules loaded into Prolog (enables chain rule inference)
+		self.predicates, _ = extract_predicates_from_rules(rule_file, prolog_var_names=self.prolog_var_names)
+		print(f"\nChain rule support enabled: Prolog will follow helper predicates automatically")
+
+	def unload_rules(self):
+		"""Remove the active rule set's clauses from Prolog and stop its worker processes."""
+		if self.worker_pool is not None:
+			self.worker_pool.shutdown()
+		if self._prolog is not None and self.loaded_file:
+			try:
+				unload_rules(self._prolog, self.loaded_file)
+			except Exception as e:
+				print(f"Error unloading {self.loaded_file}: {e}")
+		self.module = None
+		self.loaded_file = None
+
+	def prolog(self):
+		"""
+		Get the Prolog instance with the active rule set loaded.
+
+		Returns:
+			Prolog: PySwip Prolog instance
+		"""
+		if self._prolog is None:
+			from pyswip import Prolog
+			
+			self._prolog = Prolog()
+		if self.module is None:
+			module = self._module_name()
+			self.loaded_file = consult_compiled(self._prolog, self.rule_file, module)
+			self.module = module
+		return self._prolog
+
+	def label(self, df):
+		"""
+		Label a DataFrame with the active rule set.
+
+		Adds the label column and ``rules_file``/``rules_hash`` columns in place.
+
+		Args:
+			df (pd.DataFrame): Data to label
+
+		Returns:
+			pd.DataFrame: The same DataFrame with label columns added
+		"""
+		# Label all rows (vectorized where the rules compile, Prolog otherwise)
+		df[self.label_column] = label_dataframe(df, self.rule_file, self.predicates, self.column_mapping,
+												self.prolog_var_names, self.multi_label, self.vectorize,
+												self.batch, self.workers, prolog_loader=self.prolog,
+												module=self._module_name(), label_cache=self.label_cache,
+												worker_pool=self.worker_pool)
+		df['rules_file'] = self.rules_file  # Add column showing which rules file was used
+		df['rules_hash'] = self.rules_hash
+		return df
+
+	def label_csv(self, csv_path, output_path=None, chunksize=None, progress=None, incremental=None,
+				  rule_diff=None):
+		"""
+		Label a CSV file and write the result.
+
+		See ``label_dataset``, which also returns the row count, timings and
+		(optionally) the labeled rows.
+
+		Returns:
+			str: Path of the labeled output file
+		"""
+		return self.label_dataset(csv_path, output_path, chunksize, progress, incremental, rule_diff).output_path
+
+	def label_dataset(self, csv_path, output_path=None, chunksize=None, progress=None, incremental=None,
+					  rule_diff=None, keep_frame=False):
+		"""
+		Label a dataset file, write the result and describe the run.
+
+		The input is read in place and exactly one output file is written; the
+		output path is resolved once here and returned.
+
+		Parquet and Feather (Arrow IPC) input and output are supported by file
+		extension. Columnar output stores the label as a categorical column and
+		the rules filename in the file metadata instead of a column.
+
+		Args:
+			csv_path (str): Path to the CSV (or Parquet/Feather) file to label
+				(created with config headers if it does not exist)
+			output_path (str): Output path (config ``output_csv_pattern`` if None)
+			chunksize (int): Stream the CSV in chunks of this many rows (overrides config)
+			progress (callable): Progress callback for streaming mode, called with rows processed
+			incremental (bool): Only label rows appended since the last run and
+				append them to its output (overrides config)
+			rule_diff (bool): When the input (or the incremental output) is
+				already labeled with another rule file, only relabel the rows
+				whose labels that change can affect (overrides config)
+			keep_frame (bool): Keep the labeled rows in ``LabelResult.df`` so
+				they can be plotted without reading the output back (streamed
+				chunks are collected; an incremental append reads the output)
+
+		Returns:
+			LabelResult: Output path, row count, timings and labeled rows
+		"""
+		started = time.perf_counter()
+		if chunksize is None:
+			chunksize = get_chunk_size(self.config)
+		if incremental is None:
+			incremental = get_incremental_mode(self.config)
+		if rule_diff is None:
+			rule_diff = get_rule_diff_mode(self.config)
+
+		# Load CSV - create with headers from config if doesn't exist
+		if not os.path.exists(csv_path):
+			if not self.config or 'dataset' not in self.config or 'columns' not in self.config['dataset']:
+				raise ValueError(f"Config file must contain dataset.columns to create CSV for use case: {self.use_case}")
+
+			if get_dataset_format(csv_path) == 'csv':
+				with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+					writer = csv.writer(f)
+					writer.writerow(get_csv_headers(self.config))
+			else:
+				write_dataset(pd.DataFrame(columns=get_csv_headers(self.config)), csv_path)
+
+		if incremental:
+			output_path, rows, df = self._label_incremental(csv_path, output_path, chunksize, progress, rule_diff,
+															keep_frame)
+		elif rule_diff and self.label_column in dataset_columns(csv_path):
+			output_path, df = self._relabel(csv_path, output_path, progress)
+			rows = len(df)
+		else:
+			output_path, rows, df = self._label_file(csv_path, output_path, chunksize, progress, keep_frame)
+		return LabelResult(output_path, rows, {'label': time.perf_counter() - started}, df if keep_frame else None)
+
+	def relabel(self, labeled_path, output_path=None, progress=None):
+		"""
+		Relabel a dataset labeled with another rule file of this use case.
+
+		The two rule files are diffed clause by clause (see ``rule_diff``) and
+		only rows in the value regions where a changed label predicate answers
+		differently are labeled again; every other row keeps its label. When
+		the change cannot be localized all rows are relabeled.
+
+		The previous rule file is taken from the dataset's ``rules_file``
+		column (or file metadata). It is only diffed while its content hash
+		matches the dataset's ``rules_hash``; otherwise, or for datasets
+		labeled without a hash, all rows are relabeled.
+
+		Args:
+			labeled_path (str): Labeled CSV (or Parquet/Feather) file
+			output_path (str): Output path (config ``output_csv_pattern`` if None;
+				may be ``labeled_path`` itself, which is only replaced once the
+				new file is complete)
+			progress (callable): Called once with the number of rows processed
+
+		Returns:
+			str: Path of the relabeled output file
+		"""
+		output_path, _ = self._relabel(labeled_path, output_path, progress)
+		return output_path
+
+	def _relabel(self, labeled_path, output_path, progress):
+		"""
+		Relabel a labeled dataset (see ``relabel``).
+
+		Returns:
+			tuple: (output path, relabeled DataFrame)
+		"""
+		output_path = self._output_path(labeled_path, output_path)
+		df = read_dataset(labeled_path)
+		return output_path, self._write_relabeled(df, output_path, self._changed_rows(df), progress)
+
+	def _changed_rows(self, df, previous_hash=None):
+		"""
+		Find the rows of a labeled dataset the active rules may label differently.
+
+		Args:
+			df (pd.DataFrame): Labeled dataset
+			previous_hash (str): Content hash of the rule file the labels were
+				produced with (the dataset's ``rules_hash`` if None); the
+				previous rule file is only diffed if it still has this content
+
+		Returns:
+			np.ndarray: Boolean mask of rows to relabel, or None to relabel
+				every row (the previous rules are unknown, gone or edited)
+		"""
+		previous = self._dataset_provenance(df, 'rules_file')
+		if previous_hash is None:
+			previous_hash = self._dataset_provenance(df, 'rules_hash')
+		if not previous or not previous_hash:
+			return None
+		try:
+			old_rule_file, _ = self.resolve_rule_file(previous)
+		except FileNotFoundError as e:
+			print(f"Rule diff skipped ({e})")
+			return None
+		if rule_file_hash(old_rule_file) != previous_hash:
+			print(f"Rule diff skipped ({previous} changed since the dataset was labeled)")
+			return None
+
+		old_predicates, _ = extract_predicates_from_rules(old_rule_file, prolog_var_names=self.prolog_var_names)
+		return affected_rows(df, old_rule_file, self.rule_file, old_predicates, self.predicates,
+							 self.column_mapping, self.prolog_var_names)
+
+	@staticmethod
+	def _dataset_provenance(df, column):
+		"""Get the single ``rules_file``/``rules_hash`` value of a labeled dataset (None if unknown or mixed)."""
+		if column in df.columns:
+			values = df[column].dropna().unique()
+			return values[0] if len(values) == 1 else None
+		return df.attrs.get(column)
+
+	def _write_relabeled(self, df, output_path, affected, progress):
+		"""
+		Relabel the ``affected`` rows of a labeled dataset and write it.
+
+		Args:
+			df (pd.DataFrame): Labeled dataset
+			output_path (str): Output path (may be the dataset's own path)
+			affected (np.ndarray): Boolean mask of rows to relabel, or None for all
+			progress (callable): Called once with the number of rows processed
+
+		Returns:
+			pd.DataFrame: The relabeled dataset
+		"""
+		if affected is None:
+			df = self.label(df)
+		elif affected.any():
+			labels = df[self.label_column].astype(object).to_numpy(copy=True)
+			labels[affected] = self.label(df[affected].copy())[self.label_column].to_numpy(dtype=object)
+			df[self.label_column] = labels
+		df['rules_file'] = self.rules_file
+		df['rules_hash'] = self.rules_hash
+
+		write_dataset(df, output_path, self.label_column)
+		relabeled = len(df) if affected is None else int(affected.sum())
+		print(f"Relabeled {relabeled} of {len(df)} rows. Results saved to {output_path}")
+		if progress:
+			progress(len(df))
+		return df
+
+	def _label_file(self, csv_path, output_path, chunksize, progress, keep_frame=False, end=None):
+		"""
+		Label a whole file (see ``label_dataset``).
+
+		With ``end`` only the CSV bytes before that offset are labeled.
+
+		Returns:
+			tuple: (output path, number of rows labeled, labeled DataFrame or
+				None when streamed without ``keep_frame``)
+		"""
+		output_path = self._output_path(csv_path, output_path)
+		if chunksize:
+			chunks = []
+			total = label_csv_in_chunks(csv_path, output_path, self.rule_file, self.predicates, self.column_mapping,
+										self.prolog_var_names, self.label_column, self.rules_file, self.multi_label,
+										chunksize, self.vectorize, self.batch, self.workers, progress,
+										prolog_loader=self.prolog, module=self._module_name(),
+										label_cache=self.label_cache, on_chunk=chunks.append if keep_frame else None,
+										worker_pool=self.worker_pool, end=end, rules_hash=self.rules_hash)
+			print(f"Labeled {total} rows. Results saved to {output_path}")
+			if not keep_frame:
+				return output_path, total, None
+			if not chunks:
+				columns = dict.fromkeys([*dataset_columns(csv_path), self.label_column, 'rules_file', 'rules_hash'])
+				return output_path, total, pd.DataFrame(columns=list(columns))
+			return output_path, total, pd.concat(chunks, ignore_index=True)
+
+		df = self.label(read_dataset(csv_path, end=end))
+		write_dataset(df, output_path, self.label_column)
+		print(f"Labeled {len(df)} rows. Results saved to {output_path}")
+		return output_path, len(df), df
+
+	def _output_path(self, csv_path, output_path=None):
+		"""Resolve the output path of a run (config ``output_csv_pattern`` if None)."""
+		# Use output path from config if available, otherwise append _labeled
+		if output_path is None:
+			if self.config:
+				output_path = get_output_csv_path(self.config)
+			else:
+				root, ext = os.path.splitext(csv_path)
+				output_path = f"{root}_labeled{ext}"
+		return output_path
+
+	def _label_incremental(self, csv_path, output_path, chunksize, progress, rule_diff=False, keep_frame=False):
+		"""
+		Label only the rows appended to a source since the last run.
+
+		The watermark sidecar (``<source>.watermark.json``) records the rows
+		and byte offset already labeled, the rule file hash and the output
+		path. When the rules or settings changed, or the output is gone, the
+		whole source is relabeled into a new output instead; with
+		``rule_diff`` a rule change only relabels the affected rows of the
+		existing output before the new tail is appended.
+
+		Returns:
+			tuple: (output path, rows in the output, labeled DataFrame or None;
+				after an append the whole output is only read back with
+				``keep_frame``)
+		"""
+		settings = {
+			'source': os.path.abspath(csv_path),
+			'label_column': self.label_column,
+			'multi_label': bool(self.multi_label),
+			'column_mapping': self.column_mapping,
+		}
+		# Measure the end first; rows appended while we work belong to the next run
+		end = source_end(csv_path)
+		watermark = load_watermark(csv_path)
+		reason = can_resume(watermark, csv_path, output_path, self.rules_hash, settings, end)
+		if reason == "rules changed" and rule_diff and \
+				can_resume(dict(watermark, rules_hash=self.rules_hash), csv_path, output_path, self.rules_hash, settings, end) is None:
+			# Only diff against the old rule file if it still holds the rules the output was labeled with
+			labeled = read_dataset(watermark['output_path'])
+			affected = self._changed_rows(labeled, watermark['rules_hash'])
+			if affected is not None:
+				self._write_relabeled(labeled, watermark['output_path'], affected, None)
+				reason = None
+
+		if reason is None:
+			output_path = watermark['output_path']
+			tail = read_source_tail(csv_path, watermark, end)
+			if len(tail) > 0:
+				append_output(self.label(tail), output_path, self.label_column)
+			rows = watermark['rows'] + len(tail)
+			save_watermark(csv_path, output_path, self.rules_hash, settings, rows, end)
+			print(f"Labeled {len(tail)} new rows. Results appended to {output_path}")
+			return output_path, rows, read_dataset(output_path) if keep_frame else None
+
+		print(f"Full relabel of {csv_path} ({reason})")
+		if output_path is None and watermark is not None:
+			output_path = watermark['output_path']
+		# Label exactly the rows the watermark will record: a last line with no
+		# newline yet, or rows appended meanwhile, are left for the next run
+		limit = end if get_dataset_format(csv_path) == 'csv' else None
+		output_path, rows, df = self._label_file(csv_path, output_path, chunksize, progress, keep_frame, limit)
+		save_watermark(csv_path, output_path, self.rules_hash, settings, rows, end)
+		return output_path, rows, df
+
+	def _module_name(self):
+		"""Module the active rule set is (or will be) loaded into."""
+		return f"rules_{self.rules_hash[:16]}"
+
+	def close(self):
+		"""Unload the active rule set and stop its worker processes; the embedded SWI engine stays for reuse."""
+		self.unload_rules()
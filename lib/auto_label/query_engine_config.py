@@ -174,6 +174,51 @@ label_air_pollution(PM2_5, 'high pollution') :- PM2_5 > 35.
 
 User command: {user_input}"""
 
+def get_response_cache_dir(config, default=os.path.join(".cache", "gemini")):
+	"""
+	Get the directory of the generated-rules response cache from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (str): Default cache directory
+		
+	Returns:
+		str: Cache directory, or None to disable the cache
+	"""
+	if config and 'generation' in config:
+		return config['generation'].get('cache_dir', default)
+	return default
+
+def get_response_cache_ttl(config, default=7 * 24 * 3600):
+	"""
+	Get how long cached responses stay valid from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default time to live in seconds
+		
+	Returns:
+		int: Time to live in seconds (0 or None keeps entries forever)
+	"""
+	if config and 'generation' in config:
+		return config['generation'].get('cache_ttl', default)
+	return default
+
+def get_response_cache_size(config, default=500):
+	"""
+	Get the maximum number of cached responses from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default number of entries
+		
+	Returns:
+		int: Maximum entries kept (least recently used are evicted first)
+	"""
+	if config and 'generation' in config:
+		return config['generation'].get('cache_size', default)
+	return default
+
 def get_label_column(config, default='auto_label'):
 	"""
 	Get label column name from config.
@@ -204,6 +249,145 @@ def get_multi_label_mode(config, default=False):
 		return config['labeling'].get('multi_label', default)
 	return default
 
+def get_vectorize_mode(config, default=True):
+	"""
+	Get vectorized labeling setting from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (bool): Default vectorize mode
+		
+	Returns:
+		bool: True if rules should be compiled to vectorized masks when possible
+	"""
+	if config and 'labeling' in config:
+		return config['labeling'].get('vectorize', default)
+	return default
+
+def get_batch_mode(config, default=False):
+	"""
+	Get set-at-a-time Prolog labeling setting from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (bool): Default batch mode
+		
+	Returns:
+		bool: True if Prolog should label all rows with one query per predicate
+	"""
+	if config and 'labeling' in config:
+		return config['labeling'].get('batch', default)
+	return default
+
+def get_worker_count(config, default=1):
+	"""
+	Get number of Prolog worker processes from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default worker count
+		
+	Returns:
+		int: Number of worker processes (1 labels in the current process)
+	"""
+	if config and 'labeling' in config:
+		return int(config['labeling'].get('workers', default))
+	return default
+
+def get_chunk_size(config, default=None):
+	"""
+	Get streaming chunk size from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default chunk size
+		
+	Returns:
+		int: Rows per chunk, or None to label the whole file in memory
+	"""
+	if config and 'labeling' in config:
+		return config['labeling'].get('chunksize', default)
+	return default
+
+def get_incremental_mode(config, default=False):
+	"""
+	Get incremental labeling mode from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (bool): Default incremental mode
+		
+	Returns:
+		bool: True to label only rows appended since the last run
+	"""
+	if config and 'labeling' in config:
+		return config['labeling'].get('incremental', default)
+	return default
+
+def get_rule_diff_mode(config, default=False):
+	"""
+	Get rule-diff relabeling mode from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (bool): Default rule-diff mode
+		
+	Returns:
+		bool: True to relabel an already labeled dataset only where the new
+			rule file answers differently from the one recorded in it
+	"""
+	if config and 'labeling' in config:
+		return config['labeling'].get('rule_diff', default)
+	return default
+
+def get_plot_max_points(config, default=2000):
+	"""
+	Get the number of rows drawn per line in result plots from config.
+	
+	Longer series are downsampled (per-bucket min/max) before drawing.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default number of rows
+		
+	Returns:
+		int: Maximum rows drawn per line (0 or None draws every row)
+	"""
+	if config and 'plot' in config:
+		return config['plot'].get('max_points', default)
+	return default
+
+def get_plot_columns(config, default=None):
+	"""
+	Get the columns drawn as lines in result plots from config.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (list): Default columns (None plots the first two numeric columns)
+		
+	Returns:
+		list: Column names; the first is drawn on the left axis, the rest
+			on a twin axis
+	"""
+	if config and 'plot' in config:
+		return config['plot'].get('columns', default)
+	return default
+
+def get_label_cache_size(config, default=0):
+	"""
+	Get the size of the label LRU cache used by the streaming and online paths.
+	
+	Args:
+		config (dict): Configuration dictionary
+		default (int): Default cache size
+		
+	Returns:
+		int: Maximum number of cached input tuples (0 disables the cache)
+	"""
+	if config and 'labeling' in config:
+		return int(config['labeling'].get('label_cache_size', default) or 0)
+	return default
+
 def get_csv_headers(config, default_headers=None):
 	"""
 	Get CSV headers from config dataset columns.
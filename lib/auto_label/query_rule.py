@@ -1,22 +1,85 @@
 import os
+import numpy as np
 import pandas as pd
 import re
-from pyswip import Prolog
-from lib.auto_label.query_engine_config import (
-	load_config,
-	build_column_mapping,
-	get_label_column,
-	get_multi_label_mode,
-	get_csv_headers,
-	get_rules_file
-)
-
-def extract_predicates_from_rules(rule_file):
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from lib.auto_label.rule_compiler import compile_rule_file, label_dataframe_vectorized
+from lib.auto_label.rule_parser import is_label_clause, term_name_arity, term_to_string
+from lib.auto_label.rule_cache import load_parsed_rules, consult_compiled, rule_file_hash
+from lib.auto_label.dataset_io import DatasetWriter, iter_dataset_chunks, part_path
+
+# Rows consulted and queried together by label_rows_batch; bounds the fact
+# database and the findall result lists
+BATCH_ROWS = 10000
+
+# Stands in for missing (NaN/None) cells in label cache keys; unlike NaN it equals itself
+MISSING_KEY = object()
+
+def merge_arg_names(arg_lists, prolog_var_names=None):
+	"""
+	Merge the head argument names of several clauses of one predicate.
+	
+	For each position the first name that is a configured Prolog variable
+	wins, then the first named (non ``_``) argument, so the single query for
+	the predicate binds every position any of its clauses uses.
+	
+	Args:
+		arg_lists (list): Argument name lists, one per clause (same length)
+		prolog_var_names (list): List of Prolog variable names in config (optional)
+		
+	Returns:
+		list: Merged argument names
+	"""
+	merged = []
+	for names in zip(*arg_lists):
+		mapped = [n for n in names if prolog_var_names and n in prolog_var_names]
+		named = [n for n in names if n != '_']
+		merged.append(mapped[0] if mapped else (named[0] if named else '_'))
+	return merged
+
+def reachable_goals(bodies, bodies_by_key):
+	"""
+	Collect every goal clause bodies call, following helper predicates.
+	
+	Args:
+		bodies (list): Parsed clause bodies to start from
+		bodies_by_key (dict): {(name, arity): [body, ...]} for the rule file
+		
+	Returns:
+		list: Sorted "name/arity" strings, including goals the rule file does
+			not define (builtins, asserted facts)
+	"""
+	found = set()
+	terms = list(bodies)
+	while terms:
+		term = terms.pop()
+		if term[0] not in ('atom', 'compound'):
+			continue
+		key = term_name_arity(term)
+		if term[0] == 'compound':
+			terms.extend(term[2])
+		if key in found:
+			continue
+		found.add(key)
+		terms.extend(bodies_by_key.get(key, []))
+	return sorted(f"{name}/{arity}" for name, arity in found)
+
+def extract_predicates_from_rules(rule_file, dedupe=True, prolog_var_names=None):
 	"""
 	Extract predicates from Prolog rule file.
 	
+	Clauses are read with the Prolog-aware reader in ``rule_parser``, so heads
+	and bodies split across several lines are handled.
+	
 	Args:
 		rule_file (str): Path to the .pl rule file
+		dedupe (bool): Group clauses by name/arity so each label predicate is
+			queried once (Prolog backtracks over all of its clauses anyway)
+		prolog_var_names (list): List of Prolog variable names in config; when
+			clauses name an argument differently, a configured name wins (optional)
 		
 	Returns:
 		tuple: (label_predicates list, all_rules list)
@@ -24,43 +87,101 @@ def extract_predicates_from_rules(rule_file):
 			- all_rules: all rules as text for chain rule support
 	"""
 	label_predicates = []
-	all_rules = []
 	
-	with open(rule_file, 'r', encoding='utf-8') as f:
-		for line in f:
-			line = line.strip()
-			if not line or line.startswith('%'):
-				continue
-			
-			all_rules.append(line)
-			
-			# Pattern: label_name(Arguments, 'Label') :- condition.
-			# These are the final labeling predicates
-			match = re.search(r"(\w+)\((.+),\s*'([^']+)'\)\s*:-", line)
-			if match:
-				args_str = match.group(2).strip()
-				# Parse individual argument names (variable names)
-				# Split by comma and extract variable names
-				arg_list = [a.strip() for a in args_str.split(',')]
-				
-				# Keep ALL arguments including underscores
-				# Map each argument to its Prolog variable name or underscore
-				label_predicates.append({
-					'name': match.group(1),
-					'args': args_str,
-					'arg_names': arg_list,  # All arguments including _
-					'arg_count': len(arg_list),
-					'type': 'label_predicate',
-					'has_label': True
-				})
+	# Read whole clauses (heads and bodies may span several lines), cached by content hash
+	clauses, errors = load_parsed_rules(rule_file)
+	for error in errors:
+		print(f"Skipping unreadable clause in {rule_file}: {error}")
+	
+	all_rules = [clause['text'] for clause in clauses if not clause['is_directive']]
+	
+	bodies_by_key = {}
+	for clause in clauses:
+		if not clause['is_directive'] and clause['name'] is not None:
+			bodies_by_key.setdefault((clause['name'], clause['arity']), []).append(clause['body'])
+	
+	for clause in clauses:
+		# Pattern: label_name(Arguments, 'Label') :- condition.
+		# These are the final labeling predicates
+		if not is_label_clause(clause):
+			continue
+		
+		# Keep ALL arguments including underscores
+		# Map each argument to its Prolog variable name or underscore
+		arg_list = [arg[1] for arg in clause['args'][:-1]]
+		label_predicates.append({
+			'name': clause['name'],
+			'args': ', '.join(arg_list),
+			'arg_names': arg_list,  # All arguments including _
+			'arg_count': len(arg_list),
+			'type': 'label_predicate',
+			'has_label': True,
+			'label': clause['args'][-1][1],
+			'variables': clause['body_variables'],
+			'calls': reachable_goals([clause['body']], bodies_by_key),
+			'clause_count': 1
+		})
+	
+	if dedupe:
+		label_predicates = dedupe_predicates(label_predicates, prolog_var_names)
 	
 	print(f"Detected {len(label_predicates)} label predicates and {len(all_rules)} total rules")
 	print("Label predicates:")
 	for p in label_predicates:
-		print(f"  - {p['name']} ({p.get('arg_count', 0)} args): {p.get('args', '')}")
+		print(f"  - {p['name']} ({p.get('arg_count', 0)} args, {p.get('clause_count', 1)} clauses): {p.get('args', '')}")
 	
 	return label_predicates, all_rules
 
+def dedupe_predicates(predicates, prolog_var_names=None):
+	"""
+	Collapse per-clause predicate entries into one entry per name/arity.
+	
+	Args:
+		predicates (list): Predicate dictionaries, possibly one per clause
+		prolog_var_names (list): List of Prolog variable names in config (optional)
+		
+	Returns:
+		list: One predicate dictionary per name/arity, in first-seen order
+	"""
+	groups = {}
+	for pred in predicates:
+		key = (pred['name'], pred.get('arg_count', 0))
+		groups.setdefault(key, []).append(pred)
+	
+	deduped = []
+	for (name, arg_count), group in groups.items():
+		arg_names = merge_arg_names([p.get('arg_names', []) for p in group], prolog_var_names)
+		merged = dict(group[0])
+		merged.pop('label', None)
+		merged.update({
+			'args': ', '.join(arg_names),
+			'arg_names': arg_names,
+			'labels': list(dict.fromkeys(l for p in group for l in p.get('labels', [p.get('label')]) if l)),
+			'variables': list(dict.fromkeys(v for p in group for v in p.get('variables', []))),
+			'calls': sorted(set(c for p in group for c in p.get('calls', []))),
+			'clause_count': sum(p.get('clause_count', 1) for p in group)
+		})
+		deduped.append(merged)
+	return deduped
+
+def convert_cell_value(value):
+	"""
+	Convert a CSV cell to the value passed to Prolog.
+	
+	Args:
+		value: Raw cell value
+		
+	Returns:
+		Hour integer for "HH:MM" strings, otherwise the value unchanged
+	"""
+	# Convert time format "HH:MM" to hour integer
+	if isinstance(value, str) and ':' in value:
+		try:
+			return int(value.split(':')[0])
+		except:
+			return value
+	return value
+
 def get_row_values(row, column_mapping):
 	"""
 	Extract row values based on column mapping.
@@ -75,19 +196,106 @@ def get_row_values(row, column_mapping):
 	row_values = {}
 	if column_mapping:
 		for prolog_name, csv_col in column_mapping.items():
-			value = row.get(csv_col, 0)
-			
-			# Convert time format "HH:MM" to hour integer
-			if isinstance(value, str) and ':' in value:
-				try:
-					hour = int(value.split(':')[0])
-					row_values[prolog_name] = hour
-				except:
-					row_values[prolog_name] = value
-			else:
-				row_values[prolog_name] = value
+			row_values[prolog_name] = convert_cell_value(row.get(csv_col, 0))
 	return row_values
 
+@lru_cache(maxsize=None)
+def get_functor(name, arity):
+	"""
+	Get a (cached) PySwip functor.
+	
+	Args:
+		name (str): Functor name
+		arity (int): Number of arguments
+		
+	Returns:
+		Functor: PySwip functor for name/arity
+	"""
+	from pyswip import Functor
+	
+	return Functor(name, arity)
+
+def to_prolog_value(value):
+	"""
+	Convert a row value to a Python value PySwip binds as a Prolog term.
+	
+	Finite numbers are passed as Prolog numbers; any other value (NaN, text,
+	Thai strings) becomes an atom, as in ``format_prolog_value``, so the rules
+	see a non-number instead of a syntax error.
+	
+	Args:
+		value: Value produced by ``get_row_values``
+		
+	Returns:
+		int, float or Atom: Value for a PySwip term argument
+	"""
+	from pyswip import Atom
+	
+	if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+		if np.isfinite(value):
+			return value.item() if isinstance(value, np.number) else value
+	elif isinstance(value, str) and re.fullmatch(r"\s*-?\d+(\.\d+)?([eE][+-]?\d+)?\s*", value):
+		number = float(value)
+		return int(number) if re.fullmatch(r"\s*-?\d+\s*", value) else number
+	return Atom(str(value))
+
+def build_goal(name, args):
+	"""
+	Build a goal term, handling module-qualified names (``module:name``).
+	
+	Args:
+		name (str): Predicate name, optionally qualified with a module
+		args (list): Goal arguments (Python values, Atoms or Variables)
+		
+	Returns:
+		Term: Goal term ready for ``Query``
+	"""
+	from pyswip import Atom
+	
+	module, _, name = name.rpartition(':')
+	goal = get_functor(name, len(args))(*args)
+	if module:
+		goal = get_functor('call', 1)(get_functor(':', 2)(Atom(module), goal))
+	return goal
+
+@contextmanager
+def foreign_frame():
+	"""
+	Reclaim the Prolog term references created inside the block.
+	
+	Every ``Variable`` and every term built from a ``Functor`` takes a term
+	reference on the local stack, and outside a foreign frame they are only
+	released when control returns to Prolog, which for PySwip is never. As
+	in PySwip's own ``Prolog.query``, the frame is discarded afterwards;
+	asserted and retracted clauses are not affected.
+	"""
+	from pyswip.core import PL_open_foreign_frame, PL_discard_foreign_frame
+	
+	frame = PL_open_foreign_frame()
+	try:
+		yield
+	finally:
+		PL_discard_foreign_frame(frame)
+
+def run_goal(goal):
+	"""
+	Run a goal term and yield once per solution.
+	
+	Args:
+		goal (Term): Goal built by ``build_goal``
+		
+	Yields:
+		None: Once per solution; read bound ``Variable`` values meanwhile
+	"""
+	from pyswip import Query
+	
+	query = Query(goal)
+	try:
+		while query.nextSolution():
+			yield
+	finally:
+		query.closeQuery()
+
 def assert_prolog_facts(prolog, row_values):
 	"""
 	Assert facts for current row in Prolog.
@@ -97,7 +305,10 @@ def assert_prolog_facts(prolog, row_values):
 		row_values (dict): Dictionary of {prolog_name: value}
 	"""
 	for prolog_name, value in row_values.items():
-		prolog.assertz(f"{prolog_name.lower()}({value})")
+		with foreign_frame():
+			fact = get_functor(prolog_name.lower(), 1)(to_prolog_value(value))
+			for _ in run_goal(get_functor('assertz', 1)(fact)):
+				break
 
 def retract_prolog_facts(prolog, row_values):
 	"""
@@ -108,14 +319,20 @@ def retract_prolog_facts(prolog, row_values):
 		row_values (dict): Dictionary of {prolog_name: value}
 	"""
 	for prolog_name, value in row_values.items():
-		try:
-			prolog.retract(f"{prolog_name.lower()}({value})")
-		except:
-			pass
+		with foreign_frame():
+			fact = get_functor(prolog_name.lower(), 1)(to_prolog_value(value))
+			try:
+				for _ in run_goal(get_functor('retract', 1)(fact)):
+					break
+			except:
+				pass
 
-def build_query_string(pred, row_values, prolog_var_names):
+def build_query_args(pred, row_values, prolog_var_names):
 	"""
-	Build Prolog query string based on predicate's actual arguments.
+	Build query arguments based on predicate's actual arguments.
+	
+	Values are bound directly as term arguments, so nothing is formatted
+	into Prolog source and parsed again for every row.
 	
 	Args:
 		pred (dict): Predicate dictionary with 'arg_names' field
@@ -123,32 +340,29 @@ def build_query_string(pred, row_values, prolog_var_names):
 		prolog_var_names (list): List of all Prolog variable names in config
 		
 	Returns:
-		str: Query string to execute
+		list: Arguments for the predicate, without the trailing Label
 	"""
+	from pyswip import Variable
+	
 	# Use actual argument names from the rule
 	arg_names = pred.get('arg_names', [])
 	
 	if not arg_names:
 		# Fallback: use first variable
 		if prolog_var_names:
-			value = row_values.get(prolog_var_names[0], 0)
-			return f"{pred['name']}({value}, Label)"
-		return f"{pred['name']}(Label)"
+			return [to_prolog_value(row_values.get(prolog_var_names[0], 0))]
+		return []
 	
 	# Build query with values matching the rule's argument order
-	var_values = []
+	query_args = []
 	for var_name in arg_names:
 		if var_name == '_':
-			# For underscore, use Prolog anonymous variable
-			var_values.append('_')
+			# For underscore, use a fresh unbound variable
+			query_args.append(Variable())
 		else:
 			# For named variables, get value from row
-			value = row_values.get(var_name, 0)
-			var_values.append(str(value))
-	
-	# Build query with actual arguments plus Label
-	args_str = ', '.join(var_values)
-	return f"{pred['name']}({args_str}, Label)"
+			query_args.append(to_prolog_value(row_values.get(var_name, 0)))
+	return query_args
 
 def query_predicate(prolog, pred, row_values, prolog_var_names, multi_label, idx):
 	"""
@@ -166,28 +380,34 @@ def query_predicate(prolog, pred, row_values, prolog_var_names, multi_label, idx
 	Returns:
 		list: List of matched labels
 	"""
+	from pyswip import Variable
+	
 	matched_labels = []
 	
 	try:
-		# Build and execute query - Prolog will handle chain rules automatically
-		query_str = build_query_string(pred, row_values, prolog_var_names)
-		
-		if idx < 3:
-			print(f"Querying: {query_str}")
+		# Terms built for this goal are released when it is done
+		with foreign_frame():
+			# Build and execute query - Prolog will handle chain rules automatically
+			query_args = build_query_args(pred, row_values, prolog_var_names)
+			label_var = Variable()
+			goal = build_goal(pred['name'], query_args + [label_var])
 		
-		# Prolog engine will follow chain rules to find answers
-		query_results = list(prolog.query(query_str))
+			if idx < 3:
+				shown = ['_' if isinstance(arg, Variable) else str(arg) for arg in query_args]
+				print(f"Querying: {pred['name']}({', '.join(shown + ['Label'])})")
 		
-		if idx < 3 and query_results:
-			print(f"Results: {query_results}")
-		
-		# Collect all matching labels from this query
-		for result in query_results:
-			lbl = result.get('Label', '')
-			if lbl and lbl not in matched_labels:
-				matched_labels.append(lbl)
-				if not multi_label:
-					break  # Single label mode - stop at first match
+			# Prolog engine will follow chain rules to find answers
+			for _ in run_goal(goal):
+				lbl = str(label_var.value) if label_var.value is not None else ''
+			
+				if idx < 3:
+					print(f"Result: {lbl}")
+			
+				# Collect all matching labels from this query
+				if lbl and lbl not in matched_labels:
+					matched_labels.append(lbl)
+					if not multi_label:
+						break  # Single label mode - stop at first match
 				
 	except Exception as e:
 		if idx < 3:
@@ -245,91 +465,592 @@ def label_single_row(prolog, row, idx, predicates, column_mapping, prolog_var_na
 	else:
 		return matched_labels[0] if matched_labels else ""
 
+def format_prolog_value(value):
+	"""
+	Format a row value as a Prolog term for a generated fact file.
+	
+	Numbers are written the same way ``to_prolog_value`` binds them; any
+	other value becomes a quoted atom so one odd cell cannot break the file.
+	
+	Args:
+		value: Value produced by ``get_row_values``
+		
+	Returns:
+		str: Prolog source for the value
+	"""
+	if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+		if np.isfinite(value):
+			return str(value)
+	elif isinstance(value, str) and re.fullmatch(r"\s*-?\d+(\.\d+)?([eE][+-]?\d+)?\s*", value):
+		return value.strip()
+	return term_to_string(('atom', str(value)))
 
-def apply_rule_to_csv(use_case, csv_path, kb_dir="KB", label_column=None, multi_label=None, rules_file=None):
+def write_row_facts(df, column_mapping, prolog_var_names, fact_file):
 	"""
-	Apply rules to a CSV file and add a new label column using Prolog.
+	Write DataFrame rows as ``row(Id, V1, V2, ...)`` facts.
 	
 	Args:
-		use_case (str): The use case name (e.g., 'PM_Temperature', 'useCase2').
-		csv_path (str): Path to the CSV file to label.
-		kb_dir (str): Directory where knowledge base files are stored.
-		label_column (str): Name of the new label column to add (overrides config).
-		multi_label (bool): If True, collect all matching labels (overrides config).
-		rules_file (str): Specific rules filename to use (optional).
+		df (pd.DataFrame): Rows to write; Id is the row position in ``df``
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): Prolog variable names, in fact argument order
+		fact_file (str): Path of the .pl file to write
+	"""
+	columns = []
+	for prolog_name in prolog_var_names:
+		csv_col = column_mapping.get(prolog_name)
+		if csv_col in df.columns:
+			series = df[csv_col]
+			if not pd.api.types.is_numeric_dtype(series):
+				series = series.map(convert_cell_value)
+			columns.append([format_prolog_value(v) for v in series.tolist()])
+		else:
+			columns.append(['0'] * len(df))
+	
+	with open(fact_file, 'w', encoding='utf-8') as f:
+		f.write(":- encoding(utf8).\n")
+		for row_id, values in enumerate(zip(*columns) if columns else [()] * len(df)):
+			f.write(f"row({', '.join((str(row_id),) + values)}).\n")
+
+def build_batch_query(pred, prolog_var_names):
+	"""
+	Build one findall query that labels every asserted row for a predicate.
+	
+	Each row is queried inside ``catch/3`` so an error on one row only drops
+	that row's labels, as it would in ``query_predicate``.
+	
+	Args:
+		pred (dict): Predicate dictionary with 'arg_names' field
+		prolog_var_names (list): Prolog variable names, in fact argument order
 		
 	Returns:
-		pd.DataFrame: DataFrame with new label column.
+		str: Query binding ``Pairs`` to a list of [Id, Label] pairs
 	"""
-	# Load config
-	config = load_config(use_case, kb_dir)
+	fact_vars = [f"V{i}" for i in range(len(prolog_var_names))]
+	var_lookup = dict(zip(prolog_var_names, fact_vars))
 	
-	# Use config defaults if not specified
-	if label_column is None:
-		label_column = get_label_column(config)
+	arg_names = pred.get('arg_names', [])
+	if not arg_names:
+		arg_names = prolog_var_names[:1]
+	query_args = []
+	for var_name in arg_names:
+		if var_name == '_':
+			query_args.append('_')
+		else:
+			query_args.append(var_lookup.get(var_name, '0'))
 	
-	if multi_label is None:
-		multi_label = get_multi_label_mode(config)
+	row_goal = f"row({', '.join(['Id'] + fact_vars)})"
+	label_goal = f"{pred['name']}({', '.join(query_args + ['L'])})"
+	return (f"findall([Id, Label], ({row_goal}, "
+			f"catch(findall(L, {label_goal}, Ls), _, Ls = []), member(Label, Ls)), Pairs)")
+
+def reads_row_facts(predicates, column_mapping):
+	"""
+	Check whether label predicates may read the per-row facts.
 	
-	# Load rule file - use specific file if provided, otherwise use config default
-	if rules_file:
-		from lib.auto_label.query_engine_config import get_kb_dir
-		kb_directory = get_kb_dir(config)
-		rule_file = os.path.join(kb_directory, use_case, rules_file)
-	else:
-		rule_file = get_rules_file(config, use_case)
-		rules_file = os.path.basename(rule_file)  # Extract filename for metadata
+	``label_single_row`` asserts one fact per mapped column (e.g.
+	``temperature(24)``) while a row is queried; rules that call these
+	facts instead of using their arguments need that path.
+	
+	Args:
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		
+	Returns:
+		bool: True if any predicate reaches a fact predicate, or was not
+			built by ``extract_predicates_from_rules`` and cannot be checked
+	"""
+	facts = {f"{prolog_name.lower()}/1" for prolog_name in (column_mapping or {})}
+	return any('calls' not in pred or facts.intersection(pred['calls']) for pred in predicates)
+
+def _query_batch(prolog, df, predicates, column_mapping, prolog_var_names, multi_label):
+	"""Consult ``df`` as row facts and collect each row's labels with one findall per predicate."""
+	row_labels = [[] for _ in range(len(df))]
+	fd, fact_file = tempfile.mkstemp(prefix='auto_label_rows_', suffix='.pl')
+	os.close(fd)
+	fact_file_pl = fact_file.replace('\\', '/')
+	try:
+		write_row_facts(df, column_mapping, prolog_var_names, fact_file)
+		prolog.consult(fact_file_pl)
+		
+		for pred in predicates:
+			query_str = build_batch_query(pred, prolog_var_names)
+			try:
+				results = list(prolog.query(query_str))
+			except Exception as e:
+				print(f"Error querying {pred['name']}: {e}")
+				continue
+			
+			for row_id, lbl in (results[0]['Pairs'] if results else []):
+				lbl = str(lbl)
+				labels = row_labels[int(row_id)]
+				if lbl and lbl not in labels and (multi_label or not labels):
+					labels.append(lbl)
+	finally:
+		list(prolog.query(f"unload_file('{fact_file_pl}')"))
+		os.remove(fact_file)
+	return row_labels
+
+def label_rows_batch(prolog, df, predicates, column_mapping, prolog_var_names, multi_label):
+	"""
+	Label all rows set-at-a-time inside SWI-Prolog.
+	
+	Rows are consulted as ``row/N`` facts from a generated file, ``BATCH_ROWS``
+	at a time, and each predicate is queried once per batch with ``findall``.
+	No per-variable facts (e.g. ``temperature(24)``) are asserted, so when a
+	predicate reaches one of them the rows are labeled one by one instead.
+	
+	Args:
+		prolog (Prolog): PySwip Prolog instance (with all rules loaded)
+		df (pd.DataFrame): Rows to label
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names
+		multi_label (bool): Whether to collect multiple labels
+		
+	Returns:
+		list: Label for each row, in DataFrame order
+	"""
+	if len(df) == 0:
+		return []
+	if reads_row_facts(predicates, column_mapping):
+		print("Rules read per-row facts; labeling rows one by one")
+		return label_rows(prolog, df, predicates, column_mapping, prolog_var_names, multi_label)
+	
+	for pred in predicates:
+		print(f"Batch querying: {build_batch_query(pred, prolog_var_names)}")
 	
-	if not os.path.exists(rule_file):
-		raise FileNotFoundError(f"Rule file not found: {rule_file}")
+	row_labels = []
+	for start in range(0, len(df), BATCH_ROWS):
+		row_labels.extend(_query_batch(prolog, df.iloc[start:start + BATCH_ROWS], predicates,
+									   column_mapping, prolog_var_names, multi_label))
 	
-	# Load CSV - create with headers from config if doesn't exist
-	if not os.path.exists(csv_path):
-		if not config or 'dataset' not in config or 'columns' not in config['dataset']:
-			raise ValueError(f"Config file must contain dataset.columns to create CSV for use case: {use_case}")
+	# Format label output
+	if multi_label:
+		return ["; ".join(labels) for labels in row_labels]
+	return [labels[0] if labels else "" for labels in row_labels]
+
+def label_rows(prolog, df, predicates, column_mapping, prolog_var_names, multi_label, batch=False):
+	"""
+	Label rows through Prolog, either row by row or set-at-a-time.
+	
+	Args:
+		prolog (Prolog): PySwip Prolog instance (with all rules loaded)
+		df (pd.DataFrame): Rows to label
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names
+		multi_label (bool): Whether to collect multiple labels
+		batch (bool): Label rows set-at-a-time instead of one by one
 		
-		import csv
-		with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-			writer = csv.writer(f)
-			headers = get_csv_headers(config)
-			writer.writerow(headers)
+	Returns:
+		list: Label for each row, in DataFrame order
+	"""
+	if batch:
+		return label_rows_batch(prolog, df, predicates, column_mapping, prolog_var_names, multi_label)
+	return [label_single_row(prolog, row, idx, predicates, column_mapping, prolog_var_names, multi_label)
+			for idx, (_, row) in enumerate(df.iterrows())]
+
+def load_prolog(rule_file):
+	"""
+	Create a Prolog instance with a rule file consulted.
+	
+	The rules are loaded from a cached ``.qlf`` when one exists for the
+	file's content hash.
 	
-	df = pd.read_csv(csv_path)
+	Args:
+		rule_file (str): Path to the .pl rule file
+		
+	Returns:
+		Prolog: PySwip Prolog instance
+	"""
+	from pyswip import Prolog
 	
 	# Initialize Prolog and load ALL rules (including helper predicates for chaining)
 	prolog = Prolog()
-	prolog.consult(rule_file)
+	consult_compiled(prolog, rule_file)
+	return prolog
+
+def lazy_prolog(rule_file):
+	"""
+	Return a loader that starts Prolog on its first call and then reuses it.
 	
-	# Extract label predicates and all rules
-	# label_predicates: only predicates that output labels (for querying)
-	# all_rules: all rules loaded into Prolog (enables chain rule inference)
-	label_predicates, all_rules = extract_predicates_from_rules(rule_file)
+	Args:
+		rule_file (str): Path to the .pl rule file
+		
+	Returns:
+		callable: Zero-argument function returning the Prolog instance
+	"""
+	prolog = None
 	
-	print(f"\nChain rule support enabled: Prolog will follow helper predicates automatically")
-	predicates = label_predicates
+	def loader():
+		nonlocal prolog
+		if prolog is None:
+			prolog = load_prolog(rule_file)
+		return prolog
+	return loader
+
+def qualify_predicates(predicates, module):
+	"""
+	Prefix predicate names with a Prolog module (``module:name``).
 	
-	# Build column mapping from config
-	column_mapping, prolog_var_names = build_column_mapping(config)
+	Args:
+		predicates (list): List of predicate dictionaries
+		module (str): Module the rules were loaded into, or None
+		
+	Returns:
+		list: Predicate dictionaries whose queries run in ``module``
+	"""
+	if not module:
+		return predicates
+	return [dict(pred, name=f"{module}:{pred['name']}") for pred in predicates]
+
+# Prolog engine owned by a pool worker process (one embedded SWI engine per process)
+_worker_prolog = None
+
+def _init_worker(rule_file):
+	"""Start the worker's Prolog engine and consult the rule file once."""
+	global _worker_prolog
+	_worker_prolog = load_prolog(rule_file)
+
+def _label_chunk(df, predicates, column_mapping, prolog_var_names, multi_label, batch):
+	"""Label one chunk of rows with the worker's Prolog engine."""
+	return label_rows(_worker_prolog, df, predicates, column_mapping, prolog_var_names, multi_label, batch)
+
+class PrologWorkerPool:
+	"""
+	Pool of worker processes for Prolog labeling, started on first use.
+	
+	Each worker consults the rule file once and is reused for every chunk
+	labeled afterwards, until ``shutdown``. Workers are spawned rather than
+	forked: the parent may be running Tk threads and its own embedded SWI
+	engine, neither of which survives a fork.
+	"""
+	
+	def __init__(self, rule_file, workers):
+		"""
+		Args:
+			rule_file (str): Path to the .pl rule file every worker consults
+			workers (int): Number of worker processes
+		"""
+		self.rule_file = rule_file
+		self.workers = workers
+		self._executor = None
+	
+	def __call__(self):
+		"""Get the process pool, starting it on the first call."""
+		if self._executor is None:
+			import multiprocessing
+			
+			self._executor = ProcessPoolExecutor(max_workers=self.workers,
+												 mp_context=multiprocessing.get_context('spawn'),
+												 initializer=_init_worker, initargs=(self.rule_file,))
+		return self._executor
+	
+	def shutdown(self):
+		"""Stop the worker processes (a later call starts new ones)."""
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+def label_rows_parallel(pool, df, predicates, column_mapping, prolog_var_names, multi_label, batch=False):
+	"""
+	Label rows through Prolog across a pool of worker processes.
+	
+	The rows are split into one contiguous chunk per worker and the results
+	are merged back in order.
 	
-	# Label each row
+	Args:
+		pool (PrologWorkerPool): Worker pool with the rule file consulted
+		df (pd.DataFrame): Rows to label
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names
+		multi_label (bool): Whether to collect multiple labels
+		batch (bool): Label rows set-at-a-time inside each worker
+		
+	Returns:
+		list: Label for each row, in DataFrame order
+	"""
+	chunks = [chunk for chunk in np.array_split(np.arange(len(df)), pool.workers) if len(chunk) > 0]
+	print(f"Labeling {len(df)} rows with {len(chunks)} worker processes")
+	
+	executor = pool()
+	futures = [executor.submit(_label_chunk, df.iloc[chunk], predicates, column_mapping,
+							   prolog_var_names, multi_label, batch)
+			   for chunk in chunks]
 	labels = []
-	for idx, row in df.iterrows():
-		label = label_single_row(prolog, row, idx, predicates, column_mapping, prolog_var_names, multi_label)
-		labels.append(label)
-	
-	# Add labels and rules file metadata to dataframe
-	df[label_column] = labels
-	df['rules_file'] = rules_file  # Add column showing which rules file was used
-	
-	# Use output path from config if available, otherwise append _labeled
-	from lib.auto_label.query_engine_config import get_output_csv_path
-	if config:
-		output_path = get_output_csv_path(config)
-	else:
-		output_path = csv_path.replace('.csv', '_labeled.csv')
+	for future in futures:
+		labels.extend(future.result())
+	return labels
+
+def group_unique_rows(df, column_mapping):
+	"""
+	Group rows by the tuple of mapped input columns.
+	
+	Prolog only sees the mapped ``prolog_variables``, so rows with the same
+	tuple always get the same label.
+	
+	Args:
+		df (pd.DataFrame): Rows to group
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		
+	Returns:
+		tuple: (unique_rows DataFrame with one row per tuple, codes array
+			mapping each row of ``df`` to its position in ``unique_rows``)
+	"""
+	columns = list(dict.fromkeys(col for col in (column_mapping or {}).values() if col in df.columns))
+	if not columns or len(df) == 0:
+		return df, np.arange(len(df))
+	
+	codes = df.groupby(columns, sort=False, dropna=False).ngroup().to_numpy()
+	_, first = np.unique(codes, return_index=True)
+	return df.iloc[first], codes
+
+def row_cache_keys(df, column_mapping):
+	"""
+	Build label cache keys (tuples of mapped input values) for each row.
+	
+	Missing cells become ``MISSING_KEY`` so rows with NaN still hit the cache.
+	
+	Args:
+		df (pd.DataFrame): Rows to key
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		
+	Returns:
+		list: One hashable tuple per row
+	"""
+	columns = list(dict.fromkeys(col for col in (column_mapping or {}).values() if col in df.columns))
+	values = df[columns].astype(object)
+	values = values.where(values.notna(), MISSING_KEY)
+	return list(values.itertuples(index=False, name=None))
+
+def label_rows_memoized(df, column_mapping, label_fn, label_cache=None):
+	"""
+	Label only the distinct input tuples and broadcast the labels back.
+	
+	Args:
+		df (pd.DataFrame): Rows to label
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		label_fn (callable): Labels a DataFrame, returning one label per row
+		label_cache (LRUCache): Cache of tuple -> label shared across calls (optional)
+		
+	Returns:
+		list: Label for each row, in DataFrame order
+	"""
+	unique_rows, codes = group_unique_rows(df, column_mapping)
+	unique_labels = np.full(len(unique_rows), '', dtype=object)
+	missing = np.arange(len(unique_rows))
 	
-	df.to_csv(output_path, index=False)
-	print(f"Labeled {len(df)} rows. Results saved to {output_path}")
+	if label_cache is not None:
+		keys = row_cache_keys(unique_rows, column_mapping)
+		hits = [key in label_cache for key in keys]
+		for pos in np.flatnonzero(hits):
+			unique_labels[pos] = label_cache.get(keys[pos])
+		missing = np.flatnonzero(np.logical_not(hits))
 	
-	return df
+	if len(missing) > 0:
+		print(f"Prolog labeling: {len(df)} rows, {len(unique_rows)} distinct inputs, {len(missing)} queried")
+		unique_labels[missing] = label_fn(unique_rows.iloc[missing])
+		if label_cache is not None:
+			for pos in missing:
+				label_cache.put(keys[pos], unique_labels[pos])
+	
+	return list(unique_labels[codes])
 
+def label_dataframe(df, rule_file, predicates, column_mapping, prolog_var_names, multi_label, vectorize=True, batch=False, workers=1, compiled=None, prolog_loader=None, module=None, label_cache=None, worker_pool=None):
+	"""
+	Label every row of a DataFrame.
+	
+	When ``vectorize`` is enabled the rules are compiled to NumPy masks and
+	evaluated over whole columns. Rules that cannot be compiled, and rows whose
+	values Prolog would not read as numbers, go through the PySwip path.
+	
+	Args:
+		df (pd.DataFrame): Data to label
+		rule_file (str): Path to the .pl rule file
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names
+		multi_label (bool): Whether to collect multiple labels
+		vectorize (bool): Try the vectorized rule compiler first
+		batch (bool): Label Prolog rows set-at-a-time instead of one by one
+		workers (int): Number of processes for rows labeled through Prolog
+		compiled (list): Rules already compiled by ``compile_rule_file`` (optional)
+		prolog_loader (callable): Returns a Prolog instance with the rules loaded;
+			only called when some rows need Prolog (defaults to ``lazy_prolog``)
+		module (str): Prolog module the loader's rules live in (optional)
+		label_cache (LRUCache): Input tuple -> label cache kept across calls for
+			the same rule set (optional)
+		worker_pool (PrologWorkerPool): Pool reused across calls when
+			``workers`` > 1 (optional; otherwise one is started for this call)
+		
+	Returns:
+		list: Label for each row, in DataFrame order
+	"""
+	labels = None
+	pending = np.arange(len(df))
+	
+	if vectorize and compiled is None:
+		try:
+			compiled = compile_rule_file(rule_file, predicates, prolog_var_names)
+		except ValueError as e:
+			print(f"Vectorized compiler skipped ({e}); using Prolog for all rows")
+	
+	if vectorize and compiled is not None:
+		labels, fallback = label_dataframe_vectorized(df, compiled, column_mapping, multi_label)
+		pending = np.flatnonzero(fallback)
+		print(f"Vectorized labeling: {len(df) - len(pending)} rows compiled, {len(pending)} rows via Prolog")
+	
+	if labels is None:
+		labels = np.full(len(df), '', dtype=object)
+	
+	def label_pending(rows):
+		if workers > 1:
+			return label_rows_parallel(pool, rows, predicates, column_mapping, prolog_var_names, multi_label, batch)
+		prolog = (prolog_loader or lazy_prolog(rule_file))()
+		return label_rows(prolog, rows, qualify_predicates(predicates, module),
+						  column_mapping, prolog_var_names, multi_label, batch)
+	
+	if len(pending) > 0:
+		pool = worker_pool or PrologWorkerPool(rule_file, workers)
+		try:
+			# Query each distinct input tuple once
+			labels[pending] = label_rows_memoized(df.iloc[pending], column_mapping, label_pending, label_cache)
+		finally:
+			if worker_pool is None:
+				pool.shutdown()
+	
+	return list(labels)
+
+def label_csv_in_chunks(csv_path, output_path, rule_file, predicates, column_mapping, prolog_var_names,
+						label_column, rules_file, multi_label, chunksize, vectorize=True, batch=False,
+						workers=1, progress=None, prolog_loader=None, module=None, label_cache=None, on_chunk=None,
+						worker_pool=None, end=None, rules_hash=None):
+	"""
+	Stream a dataset through labeling and append each labeled chunk to the output.
+	
+	Input may be CSV, Parquet or Feather; output CSV or Parquet (by extension).
+	Only one chunk is held in memory at a time, so memory use does not grow
+	with the input size. Rules are compiled and consulted once for all chunks.
+	Chunks go to ``<output>.part<ext>``, which replaces the output only when
+	every chunk was labeled; on error or cancel it is removed.
+	
+	Args:
+		csv_path (str): Path to the dataset to label
+		output_path (str): Path of the labeled dataset to write
+		rule_file (str): Path to the .pl rule file
+		predicates (list): List of predicate dictionaries
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names
+		label_column (str): Name of the label column to add
+		rules_file (str): Rules filename stored in the ``rules_file`` column
+		multi_label (bool): Whether to collect multiple labels
+		chunksize (int): Number of rows per chunk
+		vectorize (bool): Try the vectorized rule compiler first
+		batch (bool): Label Prolog rows set-at-a-time instead of one by one
+		workers (int): Number of processes for rows labeled through Prolog
+		progress (callable): Called with the number of rows processed so far
+			after each chunk (prints progress when omitted); raising from it
+			stops labeling
+		prolog_loader (callable): Returns a Prolog instance with the rules loaded (optional)
+		module (str): Prolog module the loader's rules live in (optional)
+		label_cache (LRUCache): Input tuple -> label cache shared by all chunks (optional)
+		on_chunk (callable): Called with each labeled chunk after it is written,
+			e.g. to keep the labeled rows for plotting (optional)
+		worker_pool (PrologWorkerPool): Pool used when ``workers`` > 1 (optional;
+			otherwise one is started for this run and shared by all chunks)
+		end (int): Only label CSV input bytes before this offset (optional)
+		rules_hash (str): Content hash stored in the ``rules_hash`` column
+			(hash of ``rule_file`` if None)
+		
+	Returns:
+		int: Number of rows labeled
+	"""
+	compiled = None
+	if vectorize:
+		try:
+			compiled = compile_rule_file(rule_file, predicates, prolog_var_names)
+		except ValueError as e:
+			print(f"Vectorized compiler skipped ({e}); using Prolog for all rows")
+	if prolog_loader is None:
+		prolog_loader = lazy_prolog(rule_file)
+	if rules_hash is None:
+		rules_hash = rule_file_hash(rule_file)
+	pool = worker_pool or PrologWorkerPool(rule_file, workers)
+	
+	# Write next to the output and move it into place once complete, so a
+	# failed or cancelled run never leaves a partial file that looks finished
+	# (nor overwrites the input when labeling in place)
+	write_path = part_path(output_path)
+	
+	total = 0
+	try:
+		with DatasetWriter(write_path, label_column) as out:
+			for chunk in iter_dataset_chunks(csv_path, chunksize, end):
+				chunk[label_column] = label_dataframe(chunk, rule_file, predicates, column_mapping, prolog_var_names,
+													  multi_label, compiled is not None, batch, workers,
+													  compiled=compiled, prolog_loader=prolog_loader, module=module,
+													  label_cache=label_cache, worker_pool=pool)
+				chunk['rules_file'] = rules_file
+				chunk['rules_hash'] = rules_hash
+				out.write(chunk)
+				if on_chunk:
+					on_chunk(chunk)
+			
+				total += len(chunk)
+				if progress:
+					progress(total)
+				else:
+					print(f"Processed {total} rows")
+	except BaseException:
+		# Drop the partial output if labeling fails or the progress callback aborts
+		if os.path.exists(write_path):
+			os.remove(write_path)
+		raise
+	finally:
+		if worker_pool is None:
+			pool.shutdown()
+	
+	os.replace(write_path, output_path)
+	return total
+
+def apply_rule_to_csv(use_case, csv_path, kb_dir="KB", label_column=None, multi_label=None, rules_file=None, vectorize=None, batch=None, workers=None, chunksize=None, progress=None, incremental=None, rule_diff=None, keep_frame=False):
+	"""
+	Apply rules to a CSV file and add a new label column using Prolog.
+	
+	Parquet and Feather files are supported too (by extension), for input
+	and for the configured output path.
+	
+	Args:
+		use_case (str): The use case name (e.g., 'PM_Temperature', 'useCase2').
+		csv_path (str): Path to the CSV (or Parquet/Feather) file to label.
+		kb_dir (str): Directory where knowledge base files are stored.
+		label_column (str): Name of the new label column to add (overrides config).
+		multi_label (bool): If True, collect all matching labels (overrides config).
+		rules_file (str): Specific rules filename to use (optional).
+		vectorize (bool): If True, compile rules to vectorized masks when possible (overrides config).
+		batch (bool): If True, label rows left for Prolog set-at-a-time (overrides config).
+		workers (int): Number of worker processes for Prolog labeling (overrides config).
+		chunksize (int): If set, stream the CSV in chunks of this many rows (overrides config).
+		progress (callable): Progress callback for streaming mode, called with rows processed.
+		incremental (bool): If True, only label rows appended since the last run,
+			tracked in a ``<csv_path>.watermark.json`` sidecar (overrides config).
+		rule_diff (bool): If True and the input is already labeled with another
+			rule file, only relabel the rows the rule change affects (overrides config).
+		keep_frame (bool): If True, keep the labeled rows in the result so they
+			can be plotted without reading the output file again.
+		
+	Returns:
+		LabelResult: Path of the labeled output file actually written (config
+			``output_csv_pattern``), row count, timings and the labeled rows
+			(``keep_frame`` only), so callers do not need to recompute or re-read it.
+	"""
+	from lib.auto_label.labeling_engine import LabelingEngine
+	
+	engine = LabelingEngine(use_case, kb_dir, rules_file=rules_file, label_column=label_column,
+							multi_label=multi_label, vectorize=vectorize, batch=batch, workers=workers)
+	try:
+		return engine.label_dataset(csv_path, chunksize=chunksize, progress=progress, incremental=incremental,
+									rule_diff=rule_diff, keep_frame=keep_frame)
+	finally:
+		engine.close()
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import time
+
+# Bump when the entry format changes so old entries are ignored
+RESPONSE_CACHE_VERSION = 2
+
+
+def config_hash(config):
+	"""
+	Hash a use case config independently of key order.
+	
+	Args:
+		config (dict): Configuration dictionary (None allowed)
+		
+	Returns:
+		str: Hex SHA-256 digest of the canonical JSON form
+	"""
+	text = json.dumps(config, sort_keys=True, ensure_ascii=False)
+	return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def response_key(model, prompt, config):
+	"""
+	Build the content-addressed key of a generated response.
+	
+	Args:
+		model (str): Model name
+		prompt (str): Fully rendered prompt sent to the model
+		config (dict): Use case config the prompt was rendered from
+		
+	Returns:
+		str: Hex SHA-256 key
+	"""
+	payload = json.dumps({'model': model, 'prompt': prompt, 'config': config_hash(config)},
+						 sort_keys=True, ensure_ascii=False)
+	return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+	"""
+	On-disk cache of generated responses, one JSON file per key.
+	
+	Entries older than ``ttl`` seconds are treated as missing. When more than
+	``max_entries`` files exist the least recently used ones (by file mtime,
+	refreshed on every hit) are deleted.
+	"""
+	
+	def __init__(self, cache_dir, ttl=None, max_entries=None):
+		"""
+		Args:
+			cache_dir (str): Directory holding the ``<key>.json`` files
+			ttl (int): Seconds an entry stays valid (None or 0: forever)
+			max_entries (int): Maximum number of entries (None or 0: unbounded)
+		"""
+		self.cache_dir = cache_dir
+		self.ttl = ttl
+		self.max_entries = max_entries
+	
+	def _path(self, key):
+		return os.path.join(self.cache_dir, f"{key}.json")
+	
+	def get(self, key):
+		"""
+		Look up a cached response.
+		
+		Args:
+			key (str): Key from ``response_key``
+			
+		Returns:
+			str: Cached response text, or None on a miss
+		"""
+		path = self._path(key)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				entry = json.load(f)
+		except (OSError, ValueError):
+			return None
+		
+		if entry.get('version') != RESPONSE_CACHE_VERSION:
+			return None
+		if self.ttl and time.time() - entry.get('created', 0) > self.ttl:
+			self._remove(path)
+			return None
+		
+		# Mark as recently used for size eviction
+		try:
+			os.utime(path)
+		except OSError:
+			pass
+		return entry.get('text')
+	
+	def put(self, key, text, model=None):
+		"""
+		Store a response and evict old entries.
+		
+		Args:
+			key (str): Key from ``response_key``
+			text (str): Response text
+			model (str): Model name, kept for inspection
+		"""
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			path = self._path(key)
+			tmp_path = path + '.tmp'
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump({'version': RESPONSE_CACHE_VERSION, 'model': model,
+						   'created': time.time(), 'text': text}, f, ensure_ascii=False)
+			os.replace(tmp_path, path)
+		except OSError as e:
+			print(f"Could not write response cache {self.cache_dir}: {e}")
+			return
+		self.evict()
+	
+	def evict(self):
+		"""Delete expired entries, then the least recently used beyond ``max_entries``."""
+		try:
+			names = [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+		except OSError:
+			return
+		
+		now = time.time()
+		entries = []
+		for name in names:
+			path = os.path.join(self.cache_dir, name)
+			try:
+				mtime = os.path.getmtime(path)
+			except OSError:
+				continue
+			# mtime is never older than the creation time, so this entry has expired
+			if self.ttl and now - mtime > self.ttl:
+				self._remove(path)
+			else:
+				entries.append((mtime, path))
+		
+		if self.max_entries and len(entries) > self.max_entries:
+			entries.sort()
+			for _, path in entries[:len(entries) - self.max_entries]:
+				self._remove(path)
+	
+	def clear(self):
+		"""Delete every cached response."""
+		try:
+			for name in os.listdir(self.cache_dir):
+				if name.endswith('.json'):
+					self._remove(os.path.join(self.cache_dir, name))
+		except OSError:
+			pass
+	
+	@staticmethod
+	def _remove(path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
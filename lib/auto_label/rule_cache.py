@@ -0,0 +1,206 @@
+import hashlib
+import os
+import pickle
+import shutil
+from collections import OrderedDict
+from lib.auto_label.rule_parser import read_rule_file
+
+# Bump when the parsed clause format changes so stale disk entries are ignored
+CACHE_VERSION = 3
+CACHE_DIR_NAME = ".cache"
+MEMORY_CACHE_SIZE = 32
+
+
+class LRUCache:
+	"""Bounded mapping that evicts the least recently used entry."""
+	
+	def __init__(self, maxsize):
+		"""
+		Create an empty cache.
+		
+		Args:
+			maxsize (int): Maximum number of entries kept
+		"""
+		self.maxsize = maxsize
+		self._entries = OrderedDict()
+	
+	def __contains__(self, key):
+		return key in self._entries
+	
+	def __len__(self):
+		return len(self._entries)
+	
+	def get(self, key, default=None):
+		"""Return the value for ``key`` (marking it recently used), or ``default``."""
+		if key not in self._entries:
+			return default
+		self._entries.move_to_end(key)
+		return self._entries[key]
+	
+	def put(self, key, value):
+		"""Store ``value`` under ``key``, evicting the oldest entries if full."""
+		self._entries[key] = value
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.maxsize:
+			self._entries.popitem(last=False)
+	
+	def clear(self):
+		"""Drop every entry."""
+		self._entries.clear()
+
+
+# In-process LRU cache for parsed and compiled rules
+_memory_cache = LRUCache(MEMORY_CACHE_SIZE)
+
+
+def rule_file_hash(rule_file):
+	"""
+	Hash the content of a rule file.
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+
+	Returns:
+		str: Hex SHA-256 digest of the file content
+	"""
+	with open(rule_file, 'rb') as f:
+		return hashlib.sha256(f.read()).hexdigest()
+
+
+def get_cache_dir(rule_file):
+	"""
+	Get the disk cache directory for a rule file (``KB/<use_case>/.cache``).
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+
+	Returns:
+		str: Cache directory path
+	"""
+	return os.path.join(os.path.dirname(os.path.abspath(rule_file)), CACHE_DIR_NAME)
+
+
+def _prolog_path(path):
+	"""Format a path for use inside a quoted Prolog atom."""
+	return path.replace('\\', '/').replace("'", "\\'")
+
+
+def cached(key, factory):
+	"""
+	Return a value from the in-memory LRU cache, computing it on a miss.
+
+	Exceptions raised by ``factory`` are cached too and re-raised, so rule
+	sets that cannot be compiled are not retried on every run.
+
+	Args:
+		key (tuple): Hashable cache key
+		factory (callable): Builds the value on a cache miss
+
+	Returns:
+		The cached or newly computed value
+	"""
+	if key in _memory_cache:
+		value = _memory_cache.get(key)
+	else:
+		try:
+			value = factory()
+		except Exception as e:
+			value = e
+		_memory_cache.put(key, value)
+
+	if isinstance(value, Exception):
+		raise value
+	return value
+
+
+def clear_cache():
+	"""Drop every in-memory cache entry (disk entries are kept)."""
+	_memory_cache.clear()
+
+
+def load_parsed_rules(rule_file, use_disk=True):
+	"""
+	Read a rule file through the memory and disk caches.
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+		use_disk (bool): Also read/write ``<hash>.parsed.pkl`` in the cache directory
+
+	Returns:
+		tuple: (clauses list, errors list) as returned by ``read_rule_file``
+	"""
+	digest = rule_file_hash(rule_file)
+
+	def parse():
+		cache_file = os.path.join(get_cache_dir(rule_file), f"{digest}.parsed.pkl")
+		if use_disk and os.path.exists(cache_file):
+			try:
+				with open(cache_file, 'rb') as f:
+					entry = pickle.load(f)
+				if entry.get('version') == CACHE_VERSION:
+					return entry['clauses'], entry['errors']
+			except Exception as e:
+				print(f"Ignoring unreadable rule cache {cache_file}: {e}")
+
+		clauses, errors = read_rule_file(rule_file)
+		if use_disk:
+			try:
+				os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+				tmp_file = cache_file + '.tmp'
+				with open(tmp_file, 'wb') as f:
+					pickle.dump({'version': CACHE_VERSION, 'clauses': clauses, 'errors': errors}, f)
+				os.replace(tmp_file, cache_file)
+			except OSError as e:
+				print(f"Could not write rule cache {cache_file}: {e}")
+		return clauses, errors
+
+	return cached(('parsed', digest), parse)
+
+
+def consult_compiled(prolog, rule_file, module=None):
+	"""
+	Consult a rule file through a cached SWI-Prolog ``.qlf`` file.
+
+	On the first load the rule file is copied to ``<hash>.pl`` in the cache
+	directory and compiled with ``qcompile/1`` (which also loads it); later
+	loads consult ``<hash>.qlf`` directly. Any failure falls back to
+	consulting the source file.
+
+	Args:
+		prolog (Prolog): PySwip Prolog instance
+		rule_file (str): Path to the .pl rule file
+		module (str): Load the clauses into this module instead of ``user``
+
+	Returns:
+		str: Path of the file that was loaded (for ``unload_file/1``)
+	"""
+	prefix = f"{module}:" if module else ""
+	try:
+		digest = rule_file_hash(rule_file)
+		cache_dir = get_cache_dir(rule_file)
+		qlf_file = os.path.join(cache_dir, f"{digest}.qlf")
+
+		if os.path.exists(qlf_file):
+			list(prolog.query(f"{prefix}consult('{_prolog_path(qlf_file)}')"))
+			return qlf_file
+
+		os.makedirs(cache_dir, exist_ok=True)
+		source_copy = os.path.join(cache_dir, f"{digest}.pl")
+		shutil.copyfile(rule_file, source_copy)
+		list(prolog.query(f"{prefix}qcompile('{_prolog_path(source_copy)}')"))
+		return source_copy
+	except Exception as e:
+		print(f"QLF cache unavailable for {rule_file} ({e}); consulting source")
+		list(prolog.query(f"{prefix}consult('{_prolog_path(rule_file)}')"))
+		return rule_file
+
+
+def unload_rules(prolog, loaded_file):
+	"""
+	Unload a file previously loaded by ``consult_compiled``.
+
+	Args:
+		prolog (Prolog): PySwip Prolog instance
+		loaded_file (str): Path returned by ``consult_compiled``
+	"""
+	list(prolog.query(f"unload_file('{_prolog_path(loaded_file)}')"))
@@ -0,0 +1,558 @@
+import numpy as np
+import pandas as pd
+from lib.auto_label.rule_parser import term_name_arity
+from lib.auto_label.rule_cache import cached, load_parsed_rules, rule_file_hash
+
+# Arithmetic comparison builtins and their NumPy equivalents
+COMPARISON_OPS = {
+	'<': np.less,
+	'>': np.greater,
+	'=<': np.less_equal,
+	'>=': np.greater_equal,
+	'=:=': np.equal,
+	'=\\=': np.not_equal,
+}
+
+# Arithmetic functions that behave identically on floats and Prolog numbers
+ARITHMETIC_OPS = {
+	'+': np.add,
+	'-': np.subtract,
+	'*': np.multiply,
+	'min': np.minimum,
+	'max': np.maximum,
+}
+
+UNARY_OPS = {
+	'-': np.negative,
+	'+': np.positive,
+	'abs': np.abs,
+}
+
+# Directives that do not change how label predicates evaluate
+HARMLESS_DIRECTIVES = {'encoding', 'dynamic', 'discontiguous', 'set_prolog_flag'}
+
+# Text that Prolog reads back as a number when formatted into a query
+_NUMERIC_TEXT_RE = r"^\s*-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\s*$"
+_HOUR_TEXT_RE = r"^\s*[+-]?\d+\s*$"
+
+
+class UnsupportedRuleError(ValueError):
+	"""Raised when a rule cannot be compiled to a vectorized mask."""
+
+
+def load_clauses(rule_file):
+	"""
+	Read a rule file and group its clauses by predicate.
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+
+	Returns:
+		dict: {(name, arity): [(head, body), ...]} in file order
+	"""
+	clauses, errors = load_parsed_rules(rule_file)
+	if errors:
+		raise UnsupportedRuleError(f"Rule file has syntax errors: {errors[0]}")
+
+	grouped = {}
+	for clause in clauses:
+		if clause['is_directive']:
+			name, _ = term_name_arity(clause['body'])
+			if name not in HARMLESS_DIRECTIVES:
+				raise UnsupportedRuleError(f"Directive {name} may change rule semantics")
+			continue
+		if clause['name'] is None:
+			raise UnsupportedRuleError("Clause head is not callable")
+		grouped.setdefault((clause['name'], clause['arity']), []).append((clause['head'], clause['body']))
+	return grouped
+
+
+def _constant(value):
+	fn = lambda cols: value
+	fn.value = value
+	fn.columns = frozenset()
+	return fn
+
+
+def _column(var_name):
+	fn = lambda cols: cols[var_name]
+	fn.column = var_name
+	fn.columns = frozenset([var_name])
+	return fn
+
+
+def _record_threshold(left, right, thresholds):
+	"""
+	Record the constant a value column is compared against.
+
+	Columns compared against anything other than a constant (arithmetic,
+	another column) are marked None: their labels are not constant between
+	thresholds, so they cannot be indexed.
+	"""
+	for side, other in ((left, right), (right, left)):
+		column = getattr(side, 'column', None)
+		if column is not None and hasattr(other, 'value'):
+			if thresholds.setdefault(column, set()) is not None:
+				thresholds[column].add(other.value)
+			return
+	for column in getattr(left, 'columns', frozenset()) | getattr(right, 'columns', frozenset()):
+		thresholds[column] = None
+
+
+def _compile_expr(term, env):
+	"""Compile an arithmetic expression to a function of the value columns."""
+	kind = term[0]
+	if kind == 'num':
+		return _constant(float(term[1]))
+	if kind == 'var':
+		fn = env.get(term[1])
+		if fn is None:
+			raise UnsupportedRuleError(f"Variable {term[1]} is unbound in arithmetic")
+		return fn
+	if kind == 'compound':
+		name, args = term[1], term[2]
+		if len(args) == 2 and name in ARITHMETIC_OPS:
+			op = ARITHMETIC_OPS[name]
+			left = _compile_expr(args[0], env)
+			right = _compile_expr(args[1], env)
+			fn = lambda cols: op(left(cols), right(cols))
+			fn.columns = getattr(left, 'columns', frozenset()) | getattr(right, 'columns', frozenset())
+			return fn
+		if len(args) == 1 and name in UNARY_OPS:
+			op = UNARY_OPS[name]
+			arg = _compile_expr(args[0], env)
+			fn = lambda cols: op(arg(cols))
+			fn.columns = getattr(arg, 'columns', frozenset())
+			return fn
+	raise UnsupportedRuleError(f"Unsupported arithmetic term: {term}")
+
+
+def _bind_call_args(head, call_args, env):
+	"""Bind a helper clause's head variables to the caller's argument expressions."""
+	local_env = {}
+	for head_arg, call_arg in zip(head[2] if head[0] == 'compound' else [], call_args):
+		if head_arg[0] != 'var':
+			raise UnsupportedRuleError("Helper clause heads must only contain variables")
+		if head_arg[1] == '_':
+			continue
+		if head_arg[1] in local_env:
+			raise UnsupportedRuleError(f"Repeated head variable {head_arg[1]}")
+		if call_arg[0] == 'var':
+			local_env[head_arg[1]] = env.get(call_arg[1]) if call_arg[1] != '_' else None
+		elif call_arg[0] == 'num':
+			local_env[head_arg[1]] = _constant(float(call_arg[1]))
+		else:
+			raise UnsupportedRuleError(f"Unsupported call argument: {call_arg}")
+	return local_env
+
+
+def _compile_goal(goal, env, clauses, stack, thresholds):
+	"""
+	Compile a body goal to a mask function.
+
+	Args:
+		goal (tuple): Parsed goal term
+		env (dict): {variable: value function or None when unbound}
+		clauses (dict): Clauses grouped by (name, arity)
+		stack (tuple): Helper predicates currently being expanded
+		thresholds (dict): Collects {column: set of constants or None}, see
+			``_record_threshold``
+
+	Returns:
+		tuple: (mask function, env after the goal succeeds)
+	"""
+	name, arity = term_name_arity(goal)
+	args = goal[2] if goal[0] == 'compound' else []
+
+	if goal[0] == 'atom' and name == 'true':
+		return _constant(True), env
+	if goal[0] == 'atom' and name in ('fail', 'false'):
+		return _constant(False), env
+
+	if name == ',' and arity == 2:
+		first, env = _compile_goal(args[0], env, clauses, stack, thresholds)
+		second, env = _compile_goal(args[1], env, clauses, stack, thresholds)
+		return (lambda cols: np.logical_and(first(cols), second(cols))), env
+
+	if name == ';' and arity == 2:
+		cond_goal = args[0]
+		if cond_goal[0] == 'compound' and cond_goal[1] == '->' and len(cond_goal[2]) == 2:
+			cond, cond_env = _compile_goal(cond_goal[2][0], env, clauses, stack, thresholds)
+			then, _ = _compile_goal(cond_goal[2][1], cond_env, clauses, stack, thresholds)
+			other, _ = _compile_goal(args[1], env, clauses, stack, thresholds)
+			return (lambda cols: np.where(cond(cols), then(cols), other(cols))), env
+		left, _ = _compile_goal(args[0], env, clauses, stack, thresholds)
+		right, _ = _compile_goal(args[1], env, clauses, stack, thresholds)
+		return (lambda cols: np.logical_or(left(cols), right(cols))), env
+
+	if name == '->' and arity == 2:
+		cond, env = _compile_goal(args[0], env, clauses, stack, thresholds)
+		then, env = _compile_goal(args[1], env, clauses, stack, thresholds)
+		return (lambda cols: np.logical_and(cond(cols), then(cols))), env
+
+	if name == '\\+' and arity == 1:
+		inner, _ = _compile_goal(args[0], env, clauses, stack, thresholds)
+		return (lambda cols: np.logical_not(inner(cols))), env
+
+	if name in COMPARISON_OPS and arity == 2:
+		op = COMPARISON_OPS[name]
+		left = _compile_expr(args[0], env)
+		right = _compile_expr(args[1], env)
+		_record_threshold(left, right, thresholds)
+		return (lambda cols: op(left(cols), right(cols))), env
+
+	if name == 'is' and arity == 2:
+		target = args[0]
+		if target[0] != 'var' or env.get(target[1]) is not None:
+			raise UnsupportedRuleError("'is' is only supported for binding a fresh variable")
+		value = _compile_expr(args[1], env)
+		if target[1] == '_':
+			return _constant(True), env
+		return _constant(True), dict(env, **{target[1]: value})
+
+	# Helper predicate: inline every clause and OR their masks
+	if (name, arity) in clauses:
+		if (name, arity) in stack:
+			raise UnsupportedRuleError(f"Recursive predicate {name}/{arity}")
+		branches = []
+		for head, body in clauses[(name, arity)]:
+			local_env = _bind_call_args(head, args, env)
+			branch, _ = _compile_goal(body, local_env, clauses, stack + ((name, arity),), thresholds)
+			branches.append(branch)
+
+		def helper_mask(cols, branches=branches):
+			mask = False
+			for branch in branches:
+				mask = np.logical_or(mask, branch(cols))
+			return mask
+		return helper_mask, env
+
+	raise UnsupportedRuleError(f"Cannot compile goal {name}/{arity}")
+
+
+def compile_label_predicate(pred, clauses, prolog_var_names):
+	"""
+	Compile the query issued for one label predicate into per-clause masks.
+
+	The query arguments mirror ``build_query_args``: named arguments take the
+	row value of the Prolog variable with the same name (0 when unmapped) and
+	``_`` stays unbound.
+
+	Args:
+		pred (dict): Predicate dictionary with 'name' and 'arg_names'
+		clauses (dict): Clauses grouped by (name, arity)
+		prolog_var_names (list): List of Prolog variable names in config
+
+	Returns:
+		dict: {'name', 'branches': [(label, mask_fn)], 'columns': set of
+			Prolog variable names the query reads, 'thresholds': {column:
+			constants it is compared against, or None if not indexable}}
+	"""
+	arg_names = pred.get('arg_names', [])
+	if not arg_names:
+		raise UnsupportedRuleError(f"Predicate {pred['name']} has no arguments")
+
+	query_args = []
+	columns = set()
+	for var_name in arg_names:
+		if var_name == '_':
+			query_args.append(None)
+		elif var_name in prolog_var_names:
+			query_args.append(_column(var_name))
+			columns.add(var_name)
+		else:
+			query_args.append(_constant(0.0))
+
+	key = (pred['name'], len(arg_names) + 1)
+	if key not in clauses:
+		raise UnsupportedRuleError(f"Predicate {key[0]}/{key[1]} is not defined in the rule file")
+
+	branches = []
+	thresholds = {}
+	for head, body in clauses[key]:
+		*head_args, label_arg = head[2]
+		if label_arg[0] != 'atom':
+			raise UnsupportedRuleError(f"Label of {key[0]}/{key[1]} is not a constant atom")
+
+		env = {}
+		unifiable = True
+		for head_arg, query_arg in zip(head_args, query_args):
+			if head_arg[0] == 'var':
+				if head_arg[1] == '_':
+					continue
+				if head_arg[1] in env:
+					raise UnsupportedRuleError(f"Repeated head variable {head_arg[1]}")
+				env[head_arg[1]] = query_arg
+			elif head_arg[0] in ('atom', 'str', 'compound') and query_arg is not None:
+				# A number from the row never unifies with a non-numeric term
+				unifiable = False
+			elif query_arg is not None:
+				raise UnsupportedRuleError("Numeric constants in label heads are not supported")
+
+		mask, _ = _compile_goal(body, env, clauses, (key,), thresholds)
+		if unifiable and label_arg[1]:
+			branches.append((label_arg[1], mask))
+
+	return {'name': pred['name'], 'branches': branches, 'columns': columns, 'thresholds': thresholds}
+
+
+def compile_rule_file(rule_file, predicates, prolog_var_names):
+	"""
+	Compile every label predicate of a rule file to vectorized masks.
+
+	Results are cached in memory by the rule file's content hash.
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+		predicates (list): Label predicates from ``extract_predicates_from_rules``
+		prolog_var_names (list): List of Prolog variable names in config
+
+	Returns:
+		list: Compiled predicates in query order
+
+	Raises:
+		ValueError: If any construct cannot be compiled (callers fall back to Prolog)
+	"""
+	def compile_all():
+		clauses = load_clauses(rule_file)
+		return [compile_label_predicate(pred, clauses, prolog_var_names) for pred in predicates]
+
+	# Compiled masks are closures, so they are only cached in memory
+	query_key = tuple((pred['name'], tuple(pred.get('arg_names', []))) for pred in predicates)
+	return cached(('compiled', rule_file_hash(rule_file), query_key, tuple(prolog_var_names)), compile_all)
+
+
+def build_value_columns(df, column_mapping):
+	"""
+	Convert mapped CSV columns to float arrays, mirroring ``get_row_values``.
+
+	Values that Prolog would not read back as a number (NaN, text, booleans)
+	are flagged invalid so those rows can take the Prolog path instead.
+
+	Args:
+		df (pd.DataFrame): Data to label
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+
+	Returns:
+		tuple: (values dict, valid dict) keyed by Prolog variable name
+	"""
+	values = {}
+	valid = {}
+	n = len(df)
+	for prolog_name, csv_col in column_mapping.items():
+		if csv_col not in df.columns:
+			# get_row_values falls back to 0 for missing columns
+			values[prolog_name] = np.zeros(n)
+			valid[prolog_name] = np.ones(n, dtype=bool)
+			continue
+
+		series = df[csv_col]
+		if pd.api.types.is_bool_dtype(series):
+			values[prolog_name] = np.zeros(n)
+			valid[prolog_name] = np.zeros(n, dtype=bool)
+			continue
+		if pd.api.types.is_numeric_dtype(series):
+			arr = series.to_numpy(dtype=float, na_value=np.nan)
+			values[prolog_name] = arr
+			valid[prolog_name] = np.isfinite(arr)
+			continue
+
+		# Mixed/text column: "HH:MM" becomes the hour, numeric text stays a number
+		is_text = series.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+		text = series.where(is_text, '').astype(str)
+		has_colon = text.str.contains(':', regex=False).to_numpy(dtype=bool)
+		hour_text = text.str.split(':', n=1).str[0]
+		hour_ok = has_colon & hour_text.str.match(_HOUR_TEXT_RE).to_numpy(dtype=bool)
+		num_ok = ~has_colon & text.str.match(_NUMERIC_TEXT_RE).to_numpy(dtype=bool)
+
+		arr = np.full(n, np.nan)
+		arr[hour_ok] = pd.to_numeric(hour_text[hour_ok]).to_numpy(dtype=float)
+		arr[num_ok] = pd.to_numeric(text[num_ok]).to_numpy(dtype=float)
+
+		# Non-string objects (e.g. ints in an object column) are used as-is
+		others = series[~is_text]
+		is_number = others.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_)))
+		arr[np.flatnonzero(~is_text)[is_number.to_numpy(dtype=bool)]] = others[is_number].to_numpy(dtype=float)
+
+		values[prolog_name] = arr
+		valid[prolog_name] = np.isfinite(arr)
+	return values, valid
+
+
+def _evaluate_rows(compiled, values, n, multi_label):
+	"""
+	Evaluate compiled predicates row by row over whole columns.
+
+	Labels are ordered exactly as ``label_single_row`` would collect them:
+	predicate order first, then clause order, keeping the first occurrence.
+
+	Args:
+		compiled (list): Output of ``compile_rule_file``
+		values (dict): Float arrays keyed by Prolog variable name
+		n (int): Number of rows
+		multi_label (bool): Whether to collect multiple labels
+
+	Returns:
+		np.ndarray: Object array of label strings
+	"""
+	first_position = {}
+	position = 0
+	for pred in compiled:
+		for label, mask_fn in pred['branches']:
+			mask = np.broadcast_to(np.asarray(mask_fn(values), dtype=bool), (n,))
+			positions = first_position.setdefault(label, np.full(n, np.inf))
+			np.copyto(positions, position, where=mask & np.isinf(positions))
+			position += 1
+
+	if not first_position or n == 0:
+		return np.full(n, '', dtype=object)
+
+	label_names = list(first_position)
+	positions = np.column_stack([first_position[label] for label in label_names])
+
+	if not multi_label:
+		best = np.array(label_names, dtype=object)[positions.argmin(axis=1)]
+		best[~np.isfinite(positions.min(axis=1))] = ''
+		return best
+
+	# Rows share a label string whenever their match positions are identical
+	patterns, inverse = np.unique(positions, axis=0, return_inverse=True)
+	texts = []
+	for pattern in patterns:
+		order = [i for i in np.argsort(pattern, kind='stable') if np.isfinite(pattern[i])]
+		texts.append("; ".join(label_names[i] for i in order))
+	return np.array(texts, dtype=object)[inverse.ravel()]
+
+
+def build_interval_index(compiled):
+	"""
+	Collect the sorted threshold breakpoints of every compared column.
+
+	Between two consecutive breakpoints (and on each breakpoint itself) every
+	comparison in the rule set has the same outcome, so all values in such a
+	cell get the same labels.
+
+	Args:
+		compiled (list): Output of ``compile_rule_file``
+
+	Returns:
+		dict: {column: sorted breakpoint array}, or None when some column is
+			used in a way the index cannot represent (or there are too many
+			cell combinations to number)
+	"""
+	breakpoints = {}
+	for pred in compiled:
+		for column, constants in pred.get('thresholds', {}).items():
+			if constants is None:
+				return None
+			breakpoints.setdefault(column, set()).update(constants)
+	if np.prod([2.0 * len(constants) + 2 for constants in breakpoints.values()]) >= 2 ** 62:
+		return None
+	return {column: np.array(sorted(constants), dtype=float) for column, constants in breakpoints.items()}
+
+
+def interval_cells(values, breakpoints):
+	"""
+	Map values to interval cell numbers with ``np.searchsorted``.
+
+	With k breakpoints there are 2k + 1 cells: even numbers for the open
+	intervals, odd numbers for the breakpoints themselves. Non-finite values
+	get their own cell (-1).
+
+	Args:
+		values (np.ndarray): Float column
+		breakpoints (np.ndarray): Sorted breakpoints from ``build_interval_index``
+
+	Returns:
+		np.ndarray: Integer cell number per value
+	"""
+	pos = np.searchsorted(breakpoints, values, side='left')
+	if len(breakpoints) == 0:
+		cells = pos * 2
+	else:
+		on_breakpoint = breakpoints[np.minimum(pos, len(breakpoints) - 1)] == values
+		cells = pos * 2 + on_breakpoint
+	return np.where(np.isfinite(values), cells, -1)
+
+
+def group_interval_cells(values, n, index):
+	"""
+	Reduce rows to one representative row per interval cell combination.
+
+	Args:
+		values (dict): Float arrays keyed by Prolog variable name
+		n (int): Number of rows
+		index (dict): Breakpoints from ``build_interval_index``
+
+	Returns:
+		tuple: (inverse, cell_values, count) where ``inverse`` maps each row to
+			its cell combination, ``cell_values`` holds one row of values per
+			combination and ``count`` is the number of combinations
+	"""
+	# Combine the per-column cells into one code per row (cells start at -1)
+	codes = np.zeros(n, dtype=np.int64)
+	for column, breakpoints in index.items():
+		codes = codes * (2 * len(breakpoints) + 2) + interval_cells(values[column], breakpoints) + 1
+	inverse, uniques = pd.factorize(codes)
+
+	# Any row of a cell combination can stand in for the others
+	representative = np.empty(len(uniques), dtype=np.int64)
+	representative[inverse] = np.arange(n)
+	cell_values = {name: np.asarray(column)[representative] for name, column in values.items()}
+	return inverse, cell_values, len(uniques)
+
+
+def evaluate_compiled_rules(compiled, values, n, multi_label, index=None):
+	"""
+	Evaluate compiled predicates over whole columns.
+
+	When the rules are threshold bands (see ``build_interval_index``) rows are
+	first reduced to their interval cells; the rules are only evaluated once
+	per distinct cell combination and the labels are broadcast back. Labels
+	are ordered exactly as ``label_single_row`` would collect them.
+
+	Args:
+		compiled (list): Output of ``compile_rule_file``
+		values (dict): Float arrays keyed by Prolog variable name
+		n (int): Number of rows
+		multi_label (bool): Whether to collect multiple labels
+		index (dict): Breakpoints from ``build_interval_index`` (built when None)
+
+	Returns:
+		np.ndarray: Object array of label strings
+	"""
+	if index is None:
+		index = build_interval_index(compiled)
+	if index is None or n == 0:
+		return _evaluate_rows(compiled, values, n, multi_label)
+
+	inverse, cell_values, cells = group_interval_cells(values, n, index)
+	labels = _evaluate_rows(compiled, cell_values, cells, multi_label)
+	return labels[inverse]
+
+
+def label_dataframe_vectorized(df, compiled, column_mapping, multi_label):
+	"""
+	Label a DataFrame with compiled rules.
+
+	Args:
+		df (pd.DataFrame): Data to label
+		compiled (list): Output of ``compile_rule_file``
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		multi_label (bool): Whether to collect multiple labels
+
+	Returns:
+		tuple: (labels object array, fallback bool array) where fallback marks
+			rows whose values must be labeled through Prolog instead
+	"""
+	n = len(df)
+	values, valid = build_value_columns(df, column_mapping)
+
+	fallback = np.zeros(n, dtype=bool)
+	for pred in compiled:
+		for var_name in pred['columns']:
+			fallback |= ~valid[var_name]
+
+	labels = evaluate_compiled_rules(compiled, values, n, multi_label)
+	labels[fallback] = ''
+	return labels, fallback
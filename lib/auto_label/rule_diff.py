@@ -0,0 +1,173 @@
+import numpy as np
+from lib.auto_label.rule_parser import term_name_arity
+from lib.auto_label.rule_compiler import (
+	UnsupportedRuleError,
+	load_clauses,
+	compile_label_predicate,
+	build_value_columns,
+	build_interval_index,
+	group_interval_cells,
+	_evaluate_rows
+)
+
+
+def _reachable_predicates(key, clauses):
+	"""
+	Collect a predicate and every helper predicate its clauses call.
+
+	Args:
+		key (tuple): (name, arity) of the predicate
+		clauses (dict): Clauses grouped by (name, arity)
+
+	Returns:
+		set: (name, arity) keys defined in ``clauses``
+	"""
+	found = set()
+	stack = [key]
+	while stack:
+		current = stack.pop()
+		if current in found or current not in clauses:
+			continue
+		found.add(current)
+		terms = [body for _, body in clauses[current]]
+		while terms:
+			term = terms.pop()
+			if term[0] not in ('atom', 'compound'):
+				continue
+			stack.append(term_name_arity(term))
+			if term[0] == 'compound':
+				terms.extend(term[2])
+	return found
+
+
+def predicate_signature(pred, clauses):
+	"""
+	Get everything that decides what a label predicate answers.
+
+	Two rule files give a predicate the same signature when its clauses and
+	those of every helper it reaches are the same terms, regardless of
+	layout, comments or unrelated clauses.
+
+	Args:
+		pred (dict): Predicate dictionary with 'name' and 'arg_names'
+		clauses (dict): Clauses grouped by (name, arity)
+
+	Returns:
+		tuple: Comparable signature
+	"""
+	key = (pred['name'], len(pred.get('arg_names', [])) + 1)
+	reachable = _reachable_predicates(key, clauses)
+	return tuple(pred.get('arg_names', [])), tuple((k, tuple(clauses[k])) for k in sorted(reachable))
+
+
+def diff_rule_sets(old_clauses, new_clauses, old_predicates, new_predicates):
+	"""
+	Diff two rule sets at the clause level.
+
+	Args:
+		old_clauses (dict): Clauses of the previous rule file, from ``load_clauses``
+		new_clauses (dict): Clauses of the new rule file
+		old_predicates (list): Label predicates of the previous rule file
+		new_predicates (list): Label predicates of the new rule file
+
+	Returns:
+		list: Names of the label predicates whose answers may differ (added,
+			removed or changed), or None when the predicates that both files
+			share are queried in a different order, which changes how labels
+			combine on every row
+	"""
+	old_by_name = {pred['name']: pred for pred in old_predicates}
+	new_by_name = {pred['name']: pred for pred in new_predicates}
+
+	shared_old = [pred['name'] for pred in old_predicates if pred['name'] in new_by_name]
+	shared_new = [pred['name'] for pred in new_predicates if pred['name'] in old_by_name]
+	if shared_old != shared_new:
+		return None
+
+	changed = []
+	for name in dict.fromkeys([pred['name'] for pred in old_predicates + new_predicates]):
+		if name not in old_by_name or name not in new_by_name:
+			changed.append(name)
+		elif predicate_signature(old_by_name[name], old_clauses) != predicate_signature(new_by_name[name], new_clauses):
+			changed.append(name)
+	return changed
+
+
+def affected_rows(df, old_rule_file, new_rule_file, old_predicates, new_predicates, column_mapping, prolog_var_names):
+	"""
+	Find the rows whose labels may change when switching rule files.
+
+	Only the label predicates that differ between the files are compiled.
+	The thresholds of their old and new versions split every compared column
+	into value regions; both versions are evaluated once per region and the
+	rows in regions where any of them answers differently are affected.
+	Rows whose values are not numbers to Prolog are always affected.
+
+	Args:
+		df (pd.DataFrame): Rows labeled with the previous rule file
+		old_rule_file (str): Path to the previous .pl rule file
+		new_rule_file (str): Path to the new .pl rule file
+		old_predicates (list): Label predicates of the previous rule file
+		new_predicates (list): Label predicates of the new rule file
+		column_mapping (dict): Mapping from Prolog variable names to CSV columns
+		prolog_var_names (list): List of Prolog variable names in config
+
+	Returns:
+		np.ndarray: Boolean mask of affected rows, or None when the change
+			cannot be localized (every row must be relabeled)
+	"""
+	try:
+		old_clauses = load_clauses(old_rule_file)
+		new_clauses = load_clauses(new_rule_file)
+	except UnsupportedRuleError as e:
+		print(f"Rule diff skipped ({e})")
+		return None
+
+	changed = diff_rule_sets(old_clauses, new_clauses, old_predicates, new_predicates)
+	if changed is None:
+		print("Rule diff skipped (label predicates were reordered)")
+		return None
+
+	n = len(df)
+	if not changed:
+		print("Rule diff: no label predicate changed")
+		return np.zeros(n, dtype=bool)
+
+	# (old version, new version) of each changed predicate; None when absent
+	old_by_name = {pred['name']: pred for pred in old_predicates}
+	new_by_name = {pred['name']: pred for pred in new_predicates}
+	pairs = []
+	try:
+		for name in changed:
+			pairs.append(tuple(
+				compile_label_predicate(by_name[name], clauses, prolog_var_names) if name in by_name else None
+				for by_name, clauses in ((old_by_name, old_clauses), (new_by_name, new_clauses))
+			))
+	except UnsupportedRuleError as e:
+		print(f"Rule diff skipped ({e})")
+		return None
+
+	values, valid = build_value_columns(df, column_mapping)
+	compiled = [pred for pair in pairs for pred in pair if pred is not None]
+
+	affected = np.zeros(n, dtype=bool)
+	for pred in compiled:
+		for var_name in pred['columns']:
+			affected |= ~valid[var_name]
+
+	index = build_interval_index(compiled)
+	if index is not None and n > 0:
+		inverse, cell_values, cells = group_interval_cells(values, n, index)
+	else:
+		inverse, cell_values, cells = np.arange(n), values, n
+
+	changed_cells = np.zeros(cells, dtype=bool)
+	for old, new in pairs:
+		old_labels = _evaluate_rows([old], cell_values, cells, True) if old else np.full(cells, '', dtype=object)
+		new_labels = _evaluate_rows([new], cell_values, cells, True) if new else np.full(cells, '', dtype=object)
+		changed_cells |= old_labels != new_labels
+	affected |= changed_cells[inverse]
+
+	print(f"Rule diff: {', '.join(changed)} changed; {int(changed_cells.sum())} of {cells} value regions "
+		  f"and {int(affected.sum())} of {n} rows affected")
+	return affected
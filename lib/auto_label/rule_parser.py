@@ -0,0 +1,524 @@
+import re
+
+# Term representation used throughout the auto-label engine:
+#   ('var', name)                 Prolog variable (including '_')
+#   ('num', value)                integer or float literal
+#   ('atom', name)                atom; a QuotedAtom when written in quotes
+#   ('str', text)                 double-quoted string
+#   ('compound', name, [args])    compound term / operator application
+
+# Standard SWI-Prolog operator table (subset relevant to generated rules)
+INFIX_OPS = {
+	':-': (1200, 'xfx'), '-->': (1200, 'xfx'),
+	';': (1100, 'xfy'), '|': (1100, 'xfy'),
+	'->': (1050, 'xfy'), '*->': (1050, 'xfy'),
+	',': (1000, 'xfy'),
+	'=': (700, 'xfx'), '\\=': (700, 'xfx'), '==': (700, 'xfx'), '\\==': (700, 'xfx'),
+	'@<': (700, 'xfx'), '@>': (700, 'xfx'), '@=<': (700, 'xfx'), '@>=': (700, 'xfx'),
+	'=..': (700, 'xfx'), 'is': (700, 'xfx'), '=:=': (700, 'xfx'), '=\\=': (700, 'xfx'),
+	'<': (700, 'xfx'), '>': (700, 'xfx'), '=<': (700, 'xfx'), '>=': (700, 'xfx'),
+	'+': (500, 'yfx'), '-': (500, 'yfx'), '/\\': (500, 'yfx'), '\\/': (500, 'yfx'), 'xor': (500, 'yfx'),
+	'*': (400, 'yfx'), '/': (400, 'yfx'), '//': (400, 'yfx'), 'rem': (400, 'yfx'),
+	'mod': (400, 'yfx'), 'div': (400, 'yfx'), '<<': (400, 'yfx'), '>>': (400, 'yfx'),
+	'**': (200, 'xfx'), '^': (200, 'xfy'),
+}
+
+PREFIX_OPS = {
+	':-': (1200, 'fx'), '?-': (1200, 'fx'),
+	'\\+': (900, 'fy'),
+	'-': (200, 'fy'), '+': (200, 'fy'), '\\': (200, 'fy'),
+}
+
+SYMBOL_CHARS = set('#$&*+-./:<=>?@^~\\')
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_RADIX_RE = re.compile(r"0(?:x[0-9a-fA-F]+|o[0-7]+|b[01]+)")
+# A clause-ending '.', for skipping past a clause that cannot be tokenized
+_END_RE = re.compile(r"(?<![#$&*+\-./:<=>?@^~\\])\.(?=\s|%|$)")
+_ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', "'": "'", '"': '"', '`': '`', '\n': ''}
+_NAME_RE = re.compile(r"[^\W\d]\w*")
+
+
+class PrologSyntaxError(ValueError):
+	"""Raised when a rule file cannot be read as Prolog clauses."""
+
+	def __init__(self, message, offset=None):
+		super().__init__(message)
+		# Position in the source text, for errors raised while tokenizing
+		self.offset = offset
+
+
+class QuotedAtom(tuple):
+	"""
+	An ``('atom', name)`` term that was written in quotes (``'High'``).
+
+	It compares and hashes like the plain tuple, as Prolog does not tell
+	``'high'`` and ``high`` apart, but still records how the atom was written.
+	"""
+
+
+def tokenize(text):
+	"""
+	Split Prolog source text into tokens.
+
+	Args:
+		text (str): Prolog source code
+
+	Returns:
+		list: List of (kind, value, layout_before) tuples where kind is one of
+			'num', 'var', 'atom', 'qatom', 'str', 'punct' or 'end'
+	"""
+	return [token for token, _ in _scan(text, 0)]
+
+
+def _scan(text, start):
+	"""Yield (token, next_index) pairs from ``start``; see ``tokenize``."""
+	i = start
+	n = len(text)
+	layout = True
+
+	while i < n:
+		ch = text[i]
+
+		# Whitespace and comments
+		if ch.isspace():
+			i += 1
+			layout = True
+			continue
+		if ch == '%':
+			while i < n and text[i] != '\n':
+				i += 1
+			layout = True
+			continue
+		if text.startswith('/*', i):
+			end = text.find('*/', i + 2)
+			if end < 0:
+				raise PrologSyntaxError("Unterminated block comment", i)
+			i = end + 2
+			layout = True
+			continue
+
+		if ch.isdigit():
+			value, i = _read_number(text, i)
+			token = ('num', value, layout)
+		elif ch.isalpha() or ch == '_':
+			match = _NAME_RE.match(text, i)
+			name = match.group(0)
+			kind = 'var' if (name[0].isupper() or name[0] == '_') else 'atom'
+			token = (kind, name, layout)
+			i = match.end()
+		elif ch in ("'", '"'):
+			value, i = _read_quoted(text, i)
+			token = ('qatom' if ch == "'" else 'str', value, layout)
+		elif ch in '()[]{},|':
+			token = ('punct', ch, layout)
+			i += 1
+		elif ch in '!;':
+			token = ('atom', ch, layout)
+			i += 1
+		elif ch in SYMBOL_CHARS:
+			j = i
+			while j < n and text[j] in SYMBOL_CHARS:
+				j += 1
+			symbol = text[i:j]
+			# A lone '.' followed by layout (or EOF / comment) ends a clause
+			if symbol == '.' and (j >= n or text[j].isspace() or text[j] == '%'):
+				token = ('end', '.', layout)
+			else:
+				token = ('atom', symbol, layout)
+			i = j
+		else:
+			raise PrologSyntaxError(f"Unexpected character {ch!r} at offset {i}", i)
+		layout = False
+		yield token, i
+
+
+def _read_number(text, start):
+	"""Read a number literal starting at ``start``; returns (value, next_index)."""
+	# Character code: 0'a, 0'\n, 0''' (SWI also reads 0'' as the quote)
+	if text.startswith("0'", start) and start + 2 < len(text):
+		ch = text[start + 2]
+		escape = text[start + 3:start + 4]
+		if ch == '\\' and escape in _ESCAPES and _ESCAPES[escape]:
+			return ord(_ESCAPES[escape]), start + 4
+		if text.startswith("''", start + 2):
+			return ord("'"), start + 4
+		return ord(ch), start + 3
+
+	# 0x1F, 0o17, 0b101
+	match = _RADIX_RE.match(text, start)
+	if match:
+		return int(match.group(0), 0), match.end()
+
+	match = _NUMBER_RE.match(text, start)
+	literal = match.group(0)
+	value = float(literal) if ('.' in literal or 'e' in literal or 'E' in literal) else int(literal)
+	return value, match.end()
+
+
+def _clause_tokens(text, start):
+	"""Tokenize the clause starting at ``start``; returns (tokens through its end, next_index)."""
+	tokens = []
+	i = start
+	for token, i in _scan(text, start):
+		tokens.append(token)
+		if token[0] == 'end':
+			break
+	else:
+		i = len(text)
+	return tokens, i
+
+
+def _read_quoted(text, start):
+	"""Read a quoted atom or string starting at ``start``; returns (value, next_index)."""
+	quote = text[start]
+	chars = []
+	i = start + 1
+	while i < len(text):
+		ch = text[i]
+		if ch == quote:
+			if i + 1 < len(text) and text[i + 1] == quote:
+				chars.append(quote)
+				i += 2
+				continue
+			return ''.join(chars), i + 1
+		if ch == '\\' and i + 1 < len(text):
+			nxt = text[i + 1]
+			if nxt in _ESCAPES:
+				chars.append(_ESCAPES[nxt])
+				i += 2
+				continue
+		chars.append(ch)
+		i += 1
+	raise PrologSyntaxError("Unterminated quoted atom", start)
+
+
+class _TermReader:
+	"""Operator-precedence reader over a token list."""
+
+	def __init__(self, tokens):
+		self.tokens = tokens
+		self.pos = 0
+
+	def peek(self):
+		if self.pos < len(self.tokens):
+			return self.tokens[self.pos]
+		return ('eof', None, True)
+
+	def advance(self):
+		tok = self.peek()
+		self.pos += 1
+		return tok
+
+	def expect(self, kind, value=None):
+		tok = self.advance()
+		if tok[0] != kind or (value is not None and tok[1] != value):
+			raise PrologSyntaxError(f"Expected {value or kind}, got {tok[1]!r}")
+		return tok
+
+	def read_clause(self):
+		term = self.parse(1200)
+		self.expect('end')
+		return term
+
+	def _starts_term(self, tok):
+		kind, value, _ = tok
+		if kind in ('num', 'var', 'qatom', 'str', 'atom'):
+			return not (kind == 'atom' and value in INFIX_OPS and value not in PREFIX_OPS)
+		return kind == 'punct' and value in '([{'
+
+	def parse(self, max_prec):
+		left, left_prec = self.parse_primary(max_prec)
+		return self.parse_infix(left, left_prec, max_prec)
+
+	def parse_infix(self, left, left_prec, max_prec):
+		while True:
+			kind, value, _ = self.peek()
+			if kind == 'punct' and value in (',', '|'):
+				name = value
+			elif kind == 'atom' and value in INFIX_OPS:
+				name = value
+			else:
+				break
+			prec, typ = INFIX_OPS[name]
+			if prec > max_prec:
+				break
+			left_max = prec if typ == 'yfx' else prec - 1
+			if left_prec > left_max:
+				break
+			right_max = prec if typ == 'xfy' else prec - 1
+			self.advance()
+			right = self.parse(right_max)
+			if name == '|':
+				name = ';'
+			left = ('compound', name, [left, right])
+			left_prec = prec
+		return left
+
+	def parse_primary(self, max_prec):
+		kind, value, _ = self.advance()
+
+		if kind == 'num':
+			return ('num', value), 0
+		if kind == 'var':
+			return ('var', value), 0
+		if kind == 'str':
+			return ('str', value), 0
+		if kind == 'punct':
+			if value == '(':
+				term = self.parse(1200)
+				self.expect('punct', ')')
+				return term, 0
+			if value == '[':
+				return self.parse_list(), 0
+			if value == '{':
+				term = self.parse(1200)
+				self.expect('punct', '}')
+				return ('compound', '{}', [term]), 0
+			raise PrologSyntaxError(f"Unexpected {value!r}")
+		if kind not in ('atom', 'qatom'):
+			raise PrologSyntaxError(f"Unexpected {value!r}")
+
+		nxt = self.peek()
+		# Functional notation: name immediately followed by '('
+		if nxt[0] == 'punct' and nxt[1] == '(' and not nxt[2]:
+			self.advance()
+			args = [self.parse(999)]
+			while self.peek()[0] == 'punct' and self.peek()[1] == ',':
+				self.advance()
+				args.append(self.parse(999))
+			self.expect('punct', ')')
+			return ('compound', value, args), 0
+
+		# Prefix operators (unquoted only)
+		if kind == 'atom' and value in PREFIX_OPS:
+			# Negative numeric literal: '-' directly followed by a number
+			if value == '-' and nxt[0] == 'num' and not nxt[2]:
+				self.advance()
+				return ('num', -nxt[1]), 0
+			if self._starts_term(nxt):
+				prec, typ = PREFIX_OPS[value]
+				if prec > max_prec:
+					prec = 999
+				arg_max = prec if typ == 'fy' else prec - 1
+				arg = self.parse(arg_max)
+				return ('compound', value, [arg]), prec
+
+		prec = 0
+		if kind == 'atom' and (value in INFIX_OPS or value in PREFIX_OPS):
+			prec = max(INFIX_OPS.get(value, (0,))[0], PREFIX_OPS.get(value, (0,))[0])
+			if prec > max_prec:
+				prec = 0
+		if kind == 'qatom':
+			return QuotedAtom(('atom', value)), prec
+		return ('atom', value), prec
+
+	def parse_list(self):
+		if self.peek()[0] == 'punct' and self.peek()[1] == ']':
+			self.advance()
+			return ('atom', '[]')
+		items = [self.parse(999)]
+		while self.peek()[0] == 'punct' and self.peek()[1] == ',':
+			self.advance()
+			items.append(self.parse(999))
+		tail = ('atom', '[]')
+		if self.peek()[0] == 'punct' and self.peek()[1] == '|':
+			self.advance()
+			tail = self.parse(999)
+		self.expect('punct', ']')
+		for item in reversed(items):
+			tail = ('compound', '.', [item, tail])
+		return tail
+
+
+def read_terms(text, errors=None):
+	"""
+	Read all clauses from Prolog source text.
+
+	Args:
+		text (str): Prolog source code
+		errors (list): If given, syntax errors are appended here and the
+			offending clause is skipped (as SWI-Prolog does when consulting)
+			instead of raising
+
+	Returns:
+		list: List of parsed clause terms
+	"""
+	terms = []
+	pos = 0
+	while True:
+		start = pos
+		try:
+			tokens, pos = _clause_tokens(text, start)
+			if not tokens:
+				break
+			terms.append(_TermReader(tokens).read_clause())
+		except PrologSyntaxError as e:
+			if errors is None:
+				raise
+			errors.append(str(e))
+			if e.offset is not None:
+				# Tokenizing stopped inside the clause: resume after its end
+				end = _END_RE.search(text, e.offset)
+				pos = end.end() if end else len(text)
+	return terms
+
+
+def split_clause(term):
+	"""
+	Split a clause term into head and body.
+
+	Args:
+		term (tuple): Parsed clause term
+
+	Returns:
+		tuple: (head, body) where body is ('atom', 'true') for facts, or
+			(None, goal) for directives
+	"""
+	if term[0] == 'compound' and term[1] == ':-':
+		if len(term[2]) == 2:
+			return term[2][0], term[2][1]
+		return None, term[2][0]
+	return term, ('atom', 'true')
+
+
+def term_name_arity(term):
+	"""
+	Get the functor name and arity of a callable term.
+
+	Args:
+		term (tuple): Parsed term
+
+	Returns:
+		tuple: (name, arity) or (None, 0) if the term is not callable
+	"""
+	if term[0] == 'compound':
+		return term[1], len(term[2])
+	if term[0] == 'atom':
+		return term[1], 0
+	return None, 0
+
+
+def term_variables(term, found=None):
+	"""
+	Collect the named variables of a term in order of first appearance.
+
+	Args:
+		term (tuple): Parsed term
+		found (list): Accumulator used for recursion
+
+	Returns:
+		list: Variable names, excluding the anonymous variable ``_``
+	"""
+	if found is None:
+		found = []
+	if term[0] == 'var':
+		if term[1] != '_' and term[1] not in found:
+			found.append(term[1])
+	elif term[0] == 'compound':
+		for arg in term[2]:
+			term_variables(arg, found)
+	return found
+
+
+def describe_clause(term):
+	"""
+	Describe a parsed clause as a dictionary.
+
+	Args:
+		term (tuple): Parsed clause term
+
+	Returns:
+		dict: Clause with 'name', 'arity', 'head', 'args', 'body', 'is_directive',
+			'is_fact', 'variables', 'body_variables' and 'text'
+	"""
+	head, body = split_clause(term)
+	name, arity = term_name_arity(head) if head is not None else (None, 0)
+	return {
+		'name': name,
+		'arity': arity,
+		'head': head,
+		'args': head[2] if head is not None and head[0] == 'compound' else [],
+		'body': body,
+		'is_directive': head is None,
+		'is_fact': head is not None and not (term[0] == 'compound' and term[1] == ':-'),
+		'variables': term_variables(term),
+		'body_variables': term_variables(body),
+		'text': term_to_string(term, parens=False) + '.'
+	}
+
+
+def read_rule_file(rule_file):
+	"""
+	Read a Prolog rule file into structured clauses.
+
+	Clauses may span several lines; comments are ignored.
+
+	Args:
+		rule_file (str): Path to the .pl rule file
+
+	Returns:
+		tuple: (clauses list, errors list)
+			- clauses: clause dictionaries from ``describe_clause`` in file order
+			- errors: syntax errors for clauses that were skipped
+	"""
+	with open(rule_file, 'r', encoding='utf-8') as f:
+		text = f.read()
+	errors = []
+	terms = read_terms(text, errors)
+	return [describe_clause(term) for term in terms], errors
+
+
+def is_label_clause(clause):
+	"""
+	Check whether a clause is a labeling rule: ``name(Var, ..., 'label') :- Body``.
+
+	Helper predicates such as ``level(X, high) :- ...`` (unquoted last
+	argument) and facts are not labeling clauses.
+
+	Args:
+		clause (dict): Clause dictionary from ``read_rule_file``
+
+	Returns:
+		bool: True if the clause has a body, the last head argument is a
+			quoted atom and all others are variables
+	"""
+	args = clause['args']
+	if clause['is_directive'] or clause['is_fact'] or len(args) < 2:
+		return False
+	return isinstance(args[-1], QuotedAtom) and all(arg[0] == 'var' for arg in args[:-1])
+
+
+def term_to_string(term, parens=True):
+	"""
+	Render a parsed term back to Prolog source (canonical operator form).
+
+	Args:
+		term (tuple): Parsed term
+		parens (bool): Wrap an infix operator term in parentheses
+
+	Returns:
+		str: Prolog source representation
+	"""
+	kind = term[0]
+	if kind == 'var':
+		return term[1]
+	if kind == 'num':
+		return repr(term[1])
+	if kind == 'str':
+		return '"' + term[1].replace('\\', '\\\\').replace('"', '\\"') + '"'
+	if kind == 'atom':
+		name = term[1]
+		if re.fullmatch(r"[a-z][A-Za-z0-9_]*", name) or name in ('[]', '!', ';') or all(c in SYMBOL_CHARS for c in name):
+			return name
+		return "'" + name.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+	name, args = term[1], term[2]
+	if len(args) == 2 and name in INFIX_OPS:
+		sep = ', ' if name == ',' else f' {name} '
+		text = f"{term_to_string(args[0])}{sep}{term_to_string(args[1])}"
+		return f"({text})" if parens else text
+	if len(args) == 1 and name in PREFIX_OPS:
+		return f"{name}({term_to_string(args[0])})"
+	functor = term_to_string(('atom', name))
+	return f"{functor}({', '.join(term_to_string(a) for a in args)})"
@@ -1,19 +1,33 @@
 # -*- coding: utf-8 -*-
 import tkinter as tk
 from gemini_api import GEMINI_GOOGLE
-from tkinter import font
+from tkinter import font, ttk
 import os
-from lib.auto_label.query_rule import apply_rule_to_csv
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import shutil
 from lib.auto_label.query_engine_config import (
     load_config,
     get_rules_file,
     get_source_csv_path,
-    get_output_csv_path
+    get_chunk_size,
+    get_plot_max_points
 )
 from lib.auto_label.query_engine_config import get_kb_dir
-from render_graph import plot_labeled_results, plot_rain_results
+# labeling_engine (pandas, PySwip) and render_graph (matplotlib) are imported
+# where they are first used so the window appears without loading them
+
+# Rows per chunk when labeling from the UI, so progress and cancel respond
+UI_CHUNK_SIZE = 20000
+# How often (ms) the Tk loop applies updates posted by the worker thread
+UI_POLL_INTERVAL = 100
+
+
+class JobCancelled(Exception):
+    """Raised inside a background job when the user pressed Cancel."""
+
 
 class Project_UI:
     def __init__(self):
@@ -24,14 +38,25 @@ class Project_UI:
         ``setup_ui``.
 
         Side effects:
-        - Instantiates ``self.gemini`` (a ``GEMINI_GOOGLE`` client).
+        - Instantiates ``self.gemini`` (a ``GEMINI_GOOGLE`` client; the
+          network client itself is created on the first request).
+        - Creates ``self.engines`` (warm ``LabelingEngine`` per use case).
+        - Creates ``self.executor``, a single background worker thread.
+          Jobs run one after another in submission order and Prolog is
+          always driven from the same thread.
         - Creates ``self.app`` (a ``tk.Tk`` root window).
         - Calls ``self.setup_ui()`` to construct widgets.
         """
 
         self.gemini = GEMINI_GOOGLE()
+        self.engines = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.ui_queue = queue.Queue()
+        self.jobs = []
         self.app = tk.Tk()
         self.setup_ui()
+        self.app.protocol("WM_DELETE_WINDOW", self.close)
+        self.app.after(UI_POLL_INTERVAL, self.poll_ui_queue)
 
     def setup_ui(self):
         """Build and arrange the Tkinter user interface.
@@ -45,6 +70,9 @@ class Project_UI:
         - ``self.result_label``: ``tk.Label`` for displaying the conversion
           result.
         - ``self.submit_btn``: ``tk.Button`` bound to ``self.submit_rules``.
+        - ``self.progress_bar``: ``ttk.Progressbar`` animated while jobs run.
+        - ``self.status_label``: ``tk.Label`` showing the current job step.
+        - ``self.cancel_btn``: ``tk.Button`` bound to ``self.cancel_jobs``.
         - ``self.selected_option``: ``tk.StringVar`` storing the selected
           data source option.
         """
@@ -100,7 +128,27 @@ class Project_UI:
             padx=5,
             pady=5,
         )
-        self.submit_btn.pack(pady=20)
+        self.submit_btn.pack(pady=(20, 5))
+
+        # Progress
+        self.progress_bar = ttk.Progressbar(text_frame, mode="indeterminate")
+        self.progress_bar.pack(fill="x")
+
+        self.status_label = tk.Label(text_frame, text="", bg="white", anchor="w")
+        self.status_label.pack(fill="x")
+
+        # Cancel Button
+        self.cancel_btn = tk.Button(
+            text_frame,
+            text="Cancel",
+            command=self.cancel_jobs,
+            bg="#f0f0f0",
+            relief="solid",
+            borderwidth=2,
+            padx=5,
+            state="disabled",
+        )
+        self.cancel_btn.pack(pady=5)
 
         # Right Panel
         options_frame = tk.Frame(content_frame, bg="white")
@@ -139,22 +187,54 @@ class Project_UI:
 
         self.app.mainloop()
 
-    
+    def close(self):
+        """Cancel background jobs, close the labeling engines and the main window."""
+
+        self.cancel_jobs()
+        # Engines are closed on the worker thread that drives them, after the
+        # cancelled jobs; this also stops their Prolog worker processes
+        for engine in self.engines.values():
+            self.executor.submit(engine.close)
+        self.executor.shutdown(wait=False)
+        self.app.destroy()
+
+    def run_on_ui(self, callback, *args):
+        """Schedule ``callback(*args)`` on the Tk thread.
+
+        Safe to call from the worker thread; ``poll_ui_queue`` runs the
+        callbacks from the Tk event loop.
+        """
+
+        self.ui_queue.put((callback, args))
+
+    def poll_ui_queue(self):
+        """Apply updates posted by the worker thread, then re-arm via ``after``."""
+
+        while True:
+            try:
+                callback, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+        self.app.after(UI_POLL_INTERVAL, self.poll_ui_queue)
+
+    def set_status(self, text):
+        """Show the current job step below the progress bar."""
+
+        self.status_label["text"] = text
+
     def submit_rules(self):
-        """Read user input, convert to Prolog rules via Gemini, and display.
+        """Read user input and queue rule generation and labeling.
 
         Steps performed:
         1. Read the text content from ``self.text_input``.
         2. If the input is empty, clear the output and return.
-        3. Send the input to the Gemini API client (``self.gemini``) to
-           obtain Prolog-formatted rules.
-        4. Format and save the returned rules via ``format_rules`` and
-           ``save_rules_to_file`` (indirectly), then update
-           ``self.result_label`` with the formatted rules.
+        3. Queue ``run_rules_job`` on the background worker; the window
+           stays responsive and further prompts queue behind it.
 
         Returns:
-            The raw Prolog rule string returned by the Gemini client, or
-            ``None`` if the input was empty.
+            The ``Future`` of the queued job, or ``None`` if the input was
+            empty.
         """
 
         input_rule_text: str = self.text_input.get('1.0', 'end-1c')
@@ -162,22 +242,102 @@ class Project_UI:
             self.display_output("")
             return
 
-        # Load config for current use case
+        # Capture the use case now; the user may switch sources while the job runs
         use_case = "PM_Temperature" if "PM2.5" in self.selected_option.get() else "Rain_Forecast"
+
+        cancel_event = threading.Event()
+        self.jobs.append(cancel_event)
+        self.update_job_controls()
+        future = self.executor.submit(self.run_rules_job, input_rule_text, use_case, cancel_event)
+        future.add_done_callback(lambda f: self.run_on_ui(self.finish_job, f, cancel_event))
+        return future
+
+    def run_rules_job(self, input_rule_text, use_case, cancel_event):
+        """Generate rules with Gemini and label the use case's data.
+
+        Runs on the worker thread; all UI updates go through
+        ``run_on_ui``.
+
+        Args:
+            input_rule_text (str): Natural-language rules typed by the user.
+            use_case (str): Use case name selected when the job was queued.
+            cancel_event (threading.Event): Set when the user cancels.
+
+        Returns:
+            tuple: ``(use_case, result)`` with the ``LabelResult`` of the run,
+            including the labeled rows for plotting.
+        """
+
+        def check_cancelled():
+            if cancel_event.is_set():
+                raise JobCancelled()
+
+        check_cancelled()
         config = load_config(use_case)
-        
+
         # Get Prolog rule from Gemini API
+        self.run_on_ui(self.set_status, "Generating rules with Gemini...")
         prolog_rule = self.gemini.get_response(input_rule_text, config)
-        # prolog_rule = input_rule_text
         print("Prolog Rule: \n"  + prolog_rule)
+        check_cancelled()
+
         formatted_rules = self.format_rules(prolog_rule, use_case, config)
-        
-        # prolog_rule = self.gemini.get_response(input_rule_text, config)
-        # formatted_rules = self.format_rules(prolog_rule, use_case, config)
+        self.run_on_ui(self.display_output, "Result: \n"  + formatted_rules)
+
+        def progress(rows):
+            self.run_on_ui(self.set_status, f"Labeled {rows} rows...")
+            check_cancelled()
+
+        self.run_on_ui(self.set_status, "Labeling...")
+        result = self.applied_rules(use_case, self.current_rules_file, progress)
+        return use_case, result
 
-        self.display_output("Result: \n"  + formatted_rules)
-        self.applied_rules()
-        return prolog_rule
+    def finish_job(self, future, cancel_event):
+        """Show the outcome of a finished job and plot its results (Tk thread)."""
+
+        if cancel_event in self.jobs:
+            self.jobs.remove(cancel_event)
+        self.update_job_controls()
+
+        if future.cancelled():
+            return
+        try:
+            use_case, result = future.result()
+        except JobCancelled:
+            self.set_status("Cancelled")
+            return
+        except Exception as e:
+            print(f"Error during auto-labeling: {e}")
+            self.set_status(f"Error: {e}")
+            return
+
+        self.set_status(f"Labeled {result.rows} rows in {result.timings['label']:.1f}s. "
+                        f"Output saved to: {result.output_path}")
+        from render_graph import plot_use_case_results
+
+        # Plot the labeled rows still in memory; the output file is not read back
+        started = time.perf_counter()
+        plot_use_case_results(use_case, result.output_path, get_plot_max_points(load_config(use_case)), df=result.df)
+        result.timings['plot'] = time.perf_counter() - started
+        print(f"Timings: {', '.join(f'{step} {seconds:.2f}s' for step, seconds in result.timings.items())}")
+
+    def cancel_jobs(self):
+        """Cancel the running job and every queued one."""
+
+        for cancel_event in self.jobs:
+            cancel_event.set()
+        if self.jobs:
+            self.set_status("Cancelling...")
+
+    def update_job_controls(self):
+        """Animate the progress bar and enable Cancel while jobs are pending."""
+
+        if self.jobs:
+            self.progress_bar.start(10)
+            self.cancel_btn["state"] = "normal"
+        else:
+            self.progress_bar.stop()
+            self.cancel_btn["state"] = "disabled"
 
     def format_rules(self, prolog_rules, use_case, config):
         """Format a Prolog rules string and persist it to the KB.
@@ -240,41 +400,56 @@ class Project_UI:
 
         self.result_label["text"] = output
         
-    def applied_rules(self):
-        # Apply rules to CSV and add auto-label column
-        use_case = "PM_Temperature" if "PM2.5" in self.selected_option.get() else "Rain_Forecast"
+    def applied_rules(self, use_case, rules_filename='generated_rules.pl', progress=None):
+        """Apply a rules file to the use case's CSV and add the label column.
+
+        Labeling is streamed in chunks so ``progress`` is called regularly;
+        it may raise ``JobCancelled`` to stop between chunks.
+
+        Args:
+            use_case (str): Use case name (e.g. ``"PM_Temperature"``).
+            rules_filename (str): Rules file inside ``KB/<use_case>/``.
+            progress (callable): Called with the number of rows labeled.
+
+        Returns:
+            LabelResult: Path of the labeled CSV actually written, row count,
+            timings and the labeled rows.
+        """
+
         config = load_config(use_case)
-        
-        # Get paths from config
+
+        # Label the source in place; the engine resolves and returns the output path
         source_file = get_source_csv_path(config)
-        destination = get_output_csv_path(config)
-        
-        # Copy source file for usecase to new file before labeling
-        self.copy_source_file(source_file, destination)
-        try:
-            # Pass the rules filename to apply_rule_to_csv
-            rules_filename = getattr(self, 'current_rules_file', 'generated_rules.pl')
-            df_labeled = apply_rule_to_csv(use_case, destination, rules_file=rules_filename)
-            
-            # Get actual output path from query_rule (it uses get_output_csv_path internally)
-            output_path = get_output_csv_path(config)
-            print(f"Auto-labeling complete. Output saved to: {output_path}")
-            
-            # Plot graph after labeling - use appropriate plotting function based on use case
-            if use_case == "Rain_Forecast":
-                plot_rain_results(output_path)
-            else:
-                plot_labeled_results(output_path)
-        except Exception as e:
-            print(f"Error during auto-labeling: {e}")
+        engine = self.get_labeling_engine(use_case, rules_filename)
+        result = engine.label_dataset(source_file, chunksize=get_chunk_size(config, UI_CHUNK_SIZE), progress=progress,
+                                      keep_frame=True)
+        print(f"Auto-labeling complete. Output saved to: {result.output_path}")
+        return result
+
+    def get_labeling_engine(self, use_case, rules_filename):
+        """Return the warm labeling engine for a use case.
+
+        The engine (and its Prolog instance) is created once per use case
+        and switched to ``rules_filename`` on later runs, which unloads the
+        previously applied rule set.
+
+        Args:
+            use_case (str): Use case name (e.g. ``"PM_Temperature"``).
+            rules_filename (str): Rules file inside ``KB/<use_case>/``.
 
-    def copy_source_file(self, source, destination):
-        if os.path.exists(source):
-            shutil.copy(source, destination)
-            print(f"Copied {source} to {destination}")
+        Returns:
+            LabelingEngine: Engine with ``rules_filename`` loaded.
+        """
+        from lib.auto_label.labeling_engine import LabelingEngine
+
+        engine = self.engines.get(use_case)
+        if engine is None:
+            engine = LabelingEngine(use_case, rules_file=rules_filename)
+            self.engines[use_case] = engine
         else:
-            print(f"Source file not found: {source}")
-            
+            engine.load_rules(rules_filename)
+        return engine
+
 if __name__ == "__main__":
     app = Project_UI()
     app.mainloop()
\ No newline at end of file
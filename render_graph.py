@@ -1,9 +1,20 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-from matplotlib.colors import to_rgb
 #POC MOCKUP
+# matplotlib and pandas are imported inside each function so importing this
+# module (e.g. from main.py at startup) stays cheap.
+
+# Label annotations drawn per plot; beyond this only the longest region of
+# each label is annotated
+MAX_ANNOTATIONS = 40
+
+# Line colors of the plotted series, in plot.columns order
+SERIES_COLORS = ['red', 'blue', 'green', 'purple', 'orange', 'brown']
+
+# Worker process for render_in_background, started on first use
+_render_executor = None
 
 def _is_dark_color(color):
+    from matplotlib.colors import to_rgb
+
     try:
         r, g, b = to_rgb(color)
         luminance = 0.2126 * r + 0.7152 * g + 0.0722 * b
@@ -11,306 +22,506 @@ def _is_dark_color(color):
     except Exception:
         return False
 
-def plot_labeled_results(csv_path):
+def new_figure(figsize, show=True):
     """
-    Plot visualization of labeled data.
-    
+    Create a figure with two stacked axes.
+
+    Headless figures (``show=False``) are plain ``Figure`` objects on an Agg
+    canvas. They never touch pyplot's global state or need a display, and
+    are freed as soon as the caller drops them, so batch runs do not leak
+    figures.
+
     Args:
-        csv_path (str): Path to the labeled CSV file
+        figsize (tuple): Figure size in inches
+        show (bool): Create the figure through pyplot so it can be shown
+
+    Returns:
+        tuple: (figure, axes array)
     """
-    try:
-        df = pd.read_csv(csv_path)
-        
-        df["Date"] = df["Date"] + " " + df["Time"]
-
-        # Create figure with subplots
-        plt.rcParams.update({'font.family': 'tahoma'})
-        fig, axes = plt.subplots(2, 1, figsize=(12, 10))
-        
-        # Plot 1: PM2.5 and Temperature over time with label areas
+    if show:
+        import matplotlib.pyplot as plt
+
+        return plt.subplots(2, 1, figsize=figsize)
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(2, 1)
+
+def finish_figure(fig, save_path, show=True):
+    """
+    Lay out and save a figure, then show it (pyplot figures only).
+
+    Args:
+        fig: Figure from ``new_figure``
+        save_path (str|None): Save the figure as PNG to this path
+        show (bool): Show the figure window (blocks until it is closed)
+    """
+    fig.tight_layout()
+    if save_path:
+        fig.savefig(save_path, dpi=100, bbox_inches='tight')
+        print(f"Plot saved to: {save_path}")
+    if show:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+
+def label_color_map(labels):
+    """Map labels to Set3 colors in order of first appearance."""
+    import matplotlib
+
+    labels = list(labels)
+    return dict(zip(labels, matplotlib.colormaps['Set3'](range(max(1, len(labels))))))
+
+def draw_label_counts(ax, label_counts, color_map, rotation=0):
+    """Bar chart of label counts with the count above each bar."""
+    positions = range(len(label_counts))
+    bar_colors = [color_map.get(l, 'gray') for l in label_counts.index]
+    bars = ax.bar(positions, label_counts.to_numpy(), width=0.5, color=bar_colors, edgecolor='black', linewidth=1.2)
+    ax.set_xticks(positions, [str(l) for l in label_counts.index], rotation=rotation)
+
+    # Add count labels on bars
+    ax.bar_label(bars, padding=2, fontweight='bold')
+
+def find_label_regions(labels):
+    """
+    Find runs of consecutive rows with the same non-empty label.
+
+    Args:
+        labels (array-like): Label per row ('' or NaN for unlabeled rows)
+
+    Returns:
+        tuple: (starts, ends, region_labels) arrays; ``ends`` are inclusive
+    """
+    import numpy as np
+    import pandas as pd
+
+    labels = pd.Series(labels, dtype=object).fillna('').astype(str).to_numpy()
+    if len(labels) == 0:
+        empty = np.array([], dtype=int)
+        return empty, empty, np.array([], dtype=object)
+
+    # A region starts wherever the label code differs from the previous row
+    codes, _ = pd.factorize(labels)
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    ends = np.append(starts[1:] - 1, len(labels) - 1)
+    keep = labels[starts] != ''
+    return starts[keep], ends[keep], labels[starts[keep]]
+
+def time_axis(df, date_column='Date', time_column='Time'):
+    """
+    Build x positions from a date (and time of day) column.
+
+    Args:
+        df (pd.DataFrame): Data to plot
+        date_column (str): Column holding the date (or full timestamp)
+        time_column (str|None): Column holding the time of day (optional)
+
+    Returns:
+        tuple: (x float array, is_date) with Matplotlib date numbers, or row
+            positions when the columns are missing, not parseable or out of
+            order
+    """
+    import numpy as np
+    import pandas as pd
+    from matplotlib.dates import date2num
+
+    if date_column in df.columns and len(df) > 0:
+        text = df[date_column].astype(str)
+        if time_column in df.columns:
+            text = text + ' ' + df[time_column].astype(str)
+        times = pd.to_datetime(text, errors='coerce')
+        # Some exports write the midnight that closes a day as 0:00 of that day
+        closing_midnight = (times.diff() < pd.Timedelta(0)) & (times == times.dt.normalize())
+        times = times.where(~closing_midnight, times + pd.Timedelta(days=1))
+        if times.notna().all() and times.is_monotonic_increasing:
+            return date2num(times.to_numpy()), True
+    return np.arange(len(df), dtype=float), False
+
+def format_time_axis(ax, is_date):
+    """Use compact automatic date ticks on a ``time_axis`` x axis."""
+    import matplotlib.dates as mdates
+
+    if is_date:
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+def downsample_indices(series, max_points, keep=None):
+    """
+    Pick the rows to draw with per-bucket min/max downsampling.
+
+    Rows are split into about ``max_points / 4`` equal buckets; each bucket
+    keeps its first and last row and the rows holding the minimum and
+    maximum of every series, so peaks and the line's shape survive at
+    screen resolution.
+
+    Args:
+        series (list): Value arrays of equal length
+        max_points (int): Target number of rows (0 or None keeps every row)
+        keep (list): Row index arrays that are always kept (e.g. label
+            region boundaries)
+
+    Returns:
+        np.ndarray: Sorted row indices
+    """
+    import numpy as np
+
+    n = len(series[0]) if series else 0
+    if not max_points or n <= max_points:
+        return np.arange(n)
+
+    buckets = max(1, max_points // 4)
+    edges = np.unique(np.linspace(0, n, buckets + 1).astype(int))
+    bucket_of_row = np.repeat(np.arange(len(edges) - 1), np.diff(edges))
+    selected = [edges[:-1], edges[1:] - 1]
+    for values in series:
+        values = np.asarray(values, dtype=float)
+        for reduce in (np.fmin, np.fmax):
+            extreme = reduce.reduceat(values, edges[:-1])
+            hits = np.flatnonzero(values == extreme[bucket_of_row])
+            _, first = np.unique(bucket_of_row[hits], return_index=True)
+            selected.append(hits[first])
+    for rows in keep or []:
+        selected.append(np.asarray(rows, dtype=int))
+    indices = np.unique(np.concatenate(selected))
+    return indices[(indices >= 0) & (indices < n)]
+
+def region_boundaries(starts, ends):
+    """Rows on both sides of every label boundary, kept when downsampling."""
+    import numpy as np
+
+    return np.concatenate([starts - 1, starts, ends, ends + 1])
+
+def draw_label_regions(ax, x, starts, ends, region_labels, label_color_map, y0=0.0, y1=1.0, **kwargs):
+    """
+    Shade label regions with one collection per label.
+
+    Rectangles span the axes height from ``y0`` to ``y1`` (axes fractions),
+    so the number of artists grows with the number of labels rather than
+    the number of regions. Each
+    region extends halfway to the neighbouring rows, so boundaries fall
+    exactly between the last row of one label and the first of the next.
+
+    Args:
+        ax: Matplotlib axes
+        x (np.ndarray): x position of every row (see ``time_axis``)
+        starts, ends, region_labels: Output of ``find_label_regions``
+        label_color_map (dict): Label -> color
+        y0, y1 (float): Vertical extent as fractions of the axes height
+        **kwargs: Passed to ``PolyCollection`` (alpha, edgecolor, ...)
+    """
+    import numpy as np
+    from matplotlib.collections import PolyCollection
+
+    if len(x) == 0:
+        return
+    # Midpoints between rows; the outer rows get half a step on the outside
+    step = np.diff(x)
+    half = np.append(step[:1], step) / 2 if len(step) else np.array([0.5])
+    bounds = np.append(x - half, x[-1] + half[-1])
+
+    for label_text in dict.fromkeys(region_labels):
+        mask = region_labels == label_text
+        x0 = bounds[starts[mask]]
+        x1 = bounds[ends[mask] + 1]
+        bottom = np.full(len(x0), y0)
+        top = np.full(len(x0), y1)
+        verts = np.stack([np.column_stack(corner) for corner in
+                          ((x0, bottom), (x0, top), (x1, top), (x1, bottom))], axis=1)
+        collection = PolyCollection(verts, facecolors=[label_color_map.get(label_text, 'gray')],
+                                    transform=ax.get_xaxis_transform(), **kwargs)
+        ax.add_collection(collection, autolim=False)
+
+def annotate_label_regions(ax, x, starts, ends, region_labels, y_values, label_color_map,
+                           max_annotations=MAX_ANNOTATIONS, offset=30, bbox_alpha=0.8, bbox_linewidth=1.5):
+    """
+    Annotate label regions at their middle row.
+
+    When there are more than ``max_annotations`` regions only the longest
+    region of each label is annotated (still at most ``max_annotations``).
+
+    Args:
+        ax: Matplotlib axes
+        x (np.ndarray): x position of every row (see ``time_axis``)
+        starts, ends, region_labels: Output of ``find_label_regions``
+        y_values (array-like): Value per row the annotations point at
+        label_color_map (dict): Label -> color
+        max_annotations (int): Maximum number of annotations
+        offset (float): Vertical text offset in points
+        bbox_alpha (float): Opacity of the text box
+        bbox_linewidth (float): Edge width of the text box
+    """
+    import numpy as np
+
+    selected = np.arange(len(starts))
+    if len(selected) > max_annotations:
+        # Longest region of each label, longest first
+        order = np.argsort(starts - ends, kind='stable')
+        _, first = np.unique(region_labels[order], return_index=True)
+        selected = np.sort(order[np.sort(first)][:max_annotations])
+
+    y_values = np.asarray(y_values)
+    for i in selected:
+        label_text = region_labels[i]
+        color = label_color_map.get(label_text, 'gray')
+        mid_idx = (starts[i] + ends[i]) // 2
+        ax.annotate(str(label_text),
+                    xy=(x[mid_idx], y_values[mid_idx]),
+                    xytext=(0, offset),
+                    textcoords='offset points',
+                    fontsize=9,
+                    color='white' if _is_dark_color(color) else 'black',
+                    bbox=dict(boxstyle='round,pad=0.5', fc=color, alpha=bbox_alpha,
+                              edgecolor='black', linewidth=bbox_linewidth),
+                    ha='center',
+                    zorder=10)
+
+def split_labels(labels, separator=';'):
+    """
+    Split multi-label strings into one row per individual label.
+
+    Args:
+        labels (array-like): Label per row ('' or NaN for unlabeled rows);
+            multi-label rows are joined with ``separator`` (e.g. "A; B")
+
+    Returns:
+        pd.Series: Individual labels indexed by row position
+    """
+    import pandas as pd
+
+    labels = pd.Series(labels, dtype=object).reset_index(drop=True).fillna('').astype(str)
+    exploded = labels.str.split(separator).explode().str.strip()
+    return exploded[exploded != '']
+
+def plot_layout(df, config):
+    """
+    Work out what to plot from the use case config.
+
+    Plotted series are ``plot.columns`` if set, otherwise the first two
+    ``numeric`` columns of ``dataset.columns`` found in the data (the first
+    two numeric data columns without a config). The x axis uses the first
+    ``date`` column (or ``Date``) and the first ``time`` column.
+
+    Args:
+        df (pd.DataFrame): Labeled data
+        config (dict|None): Use case config
+
+    Returns:
+        dict: {'label_column', 'series': [(column, axis label)],
+            'date_column', 'time_column'}
+    """
+    import pandas as pd
+    from lib.auto_label.query_engine_config import get_label_column, get_plot_columns
+
+    label_column = get_label_column(config)
+    columns = (config or {}).get('dataset', {}).get('columns', [])
+    described = {col['name']: col.get('description') or col['name'] for col in columns}
+
+    names = get_plot_columns(config)
+    if not names:
+        numeric = [col['name'] for col in columns if col.get('type') == 'numeric']
+        if not columns:
+            numeric = [name for name in df.columns if name not in (label_column, 'rules_file', 'No.')
+                       and pd.api.types.is_numeric_dtype(df[name])]
+        names = [name for name in numeric if name in df.columns][:2]
+
+    date_columns = [col['name'] for col in columns if col.get('type') == 'date']
+    time_columns = [col['name'] for col in columns if col.get('type') == 'time']
+    return {
+        'label_column': label_column,
+        'series': [(name, described.get(name, name)) for name in names if name in df.columns],
+        'date_column': date_columns[0] if date_columns else 'Date',
+        'time_column': time_columns[0] if time_columns else 'Time',
+    }
+
+def plot_dataframe(df, config=None, save_path=None, max_points=None, show=True):
+    """
+    Plot labeled data as configured in the use case config.
+
+    Produces two subplots:
+    - The configured series over time with shaded label regions. With
+      multi-label output ("A; B") each label gets its own band, so
+      overlapping labels stay visible.
+    - Label distribution bar chart (rows per individual label).
+
+    Args:
+        df (pd.DataFrame|pyarrow.Table): Labeled data (e.g. ``LabelResult.df``)
+        config (dict|None): Use case config (columns, ``labeling.label_column``,
+            ``plot`` settings)
+        save_path (str|None): If provided, saves the plot to this path
+        max_points (int|None): Rows drawn per line after min/max downsampling
+            (config ``plot.max_points`` if None, 0 to draw every row)
+        show (bool): Show the plot window; False renders headless and only
+            saves the PNG
+
+    Returns:
+        str|None: Saved path or None
+    """
+    import matplotlib
+    import numpy as np
+    from lib.auto_label.query_engine_config import get_plot_max_points
+
+    if max_points is None:
+        max_points = get_plot_max_points(config)
+    if hasattr(df, 'to_pandas'):
+        df = df.to_pandas()
+    df = df.reset_index(drop=True)
+    layout = plot_layout(df, config)
+    if not layout['series']:
+        raise ValueError("No numeric columns to plot; set plot.columns in config.json")
+    labels = df[layout['label_column']] if layout['label_column'] in df.columns else [''] * len(df)
+
+    # Real datetime axis; lines are downsampled, label regions are not
+    x, is_date = time_axis(df, layout['date_column'], layout['time_column'])
+    values = [df[name].to_numpy(dtype=float, na_value=np.nan) for name, _ in layout['series']]
+
+    # Runs of each individual label; overlapping labels get one band each
+    individual = split_labels(labels)
+    color_map = label_color_map(individual.unique())
+    lanes = len(color_map) if individual.index.duplicated().any() else 1
+    regions = []
+    for lane, label_text in enumerate(color_map):
+        member = np.full(len(df), '', dtype=object)
+        member[individual.index[individual == label_text]] = label_text
+        starts, ends, region_labels = find_label_regions(member)
+        position = lane if lanes > 1 else 0
+        regions.append((starts, ends, region_labels, position / lanes, (position + 1) / lanes))
+    boundaries = [region_boundaries(starts, ends) for starts, ends, *_ in regions]
+    rows = downsample_indices(values, max_points, keep=boundaries)
+
+    # Scoped font setting instead of changing the global rcParams
+    with matplotlib.rc_context({'font.family': 'tahoma'}):
+        fig, axes = new_figure((12, 10), show)
+
+        # Plot 1: series over time with label areas (first series on the
+        # left axis, the others on a twin axis)
         ax1 = axes[0]
-        # ax1.plot(df.index, df['PM2.5'], label='PM2.5', color='red', alpha=0.7, linewidth=2, zorder=3)
-        ax1.plot(df["Date"], df['PM2.5'], label='PM2.5', color='red', alpha=0.7, linewidth=2, zorder=3)
-        ax1.set_ylabel('PM2.5 (μg/m³)', color='red', fontsize=12)
-        ax1.tick_params(axis='y', labelcolor='red')
-        # ax1.set_xlabel('Row Index', fontsize=12)
-        ax1.set_xlabel('DateTime', fontsize=12)
-        ax1.set_xticks(ax1.get_xticks(), ax1.get_xticklabels(), rotation=60, ha='right')
+        series_axes = [ax1] + ([ax1.twinx()] if len(values) > 1 else [])
+        for i, ((name, axis_label), column) in enumerate(zip(layout['series'], values)):
+            ax = series_axes[min(i, 1)]
+            color = SERIES_COLORS[i % len(SERIES_COLORS)]
+            ax.plot(x[rows], column[rows], label=name, color=color, alpha=0.7, linewidth=2, zorder=3)
+            if i < 2:
+                ax.set_ylabel(axis_label, color=color, fontsize=12)
+                ax.tick_params(axis='y', labelcolor=color)
         ax1.legend(loc='upper left', fontsize=10)
+        if len(series_axes) > 1:
+            series_axes[1].legend(loc='upper right', fontsize=10)
+        ax1.set_xlabel('DateTime' if is_date else 'Row Index', fontsize=12)
+        format_time_axis(ax1, is_date)
         ax1.grid(True, alpha=0.3)
-        
-        ax1_twin = ax1.twinx()
-        # ax1_twin.plot(df.index, df['Temp'], label='Temperature', color='blue', alpha=0.7, linewidth=2, zorder=3)
-        ax1_twin.plot(df["Date"], df['Temp'], label='Temperature', color='blue', alpha=0.7, linewidth=2, zorder=3)
-        ax1_twin.set_ylabel('Temperature (°C)', color='blue', fontsize=12)
-        ax1_twin.tick_params(axis='y', labelcolor='blue')
-        ax1_twin.legend(loc='upper right', fontsize=10)
-        
-        # Find continuous labeled regions
-        labeled_rows = df[df['auto_label'].notna() & (df['auto_label'] != '')]
-        
-        # Get unique labels and assign colors using Set3 (same palette as bar chart)
-        unique_labels = labeled_rows['auto_label'].unique()
-        label_colors = plt.cm.Set3(range(max(1, len(unique_labels))))
-        label_color_map = dict(zip(unique_labels, label_colors))
-        
-        # Group consecutive indices with same label
-        if len(labeled_rows) > 0:
-            regions = []
-            current_label = None
-            start_idx = None
-            
-            for idx, row in df.iterrows():
-                label = row['auto_label']
-                
-                # Skip empty labels
-                if pd.isna(label) or label == '':
-                    if current_label is not None:
-                        # End of region
-                        regions.append({
-                            'label': current_label,
-                            'start': start_idx,
-                            'end': idx - 1
-                        })
-                        current_label = None
-                    continue
-                
-                # Start new region or continue current
-                if label != current_label:
-                    if current_label is not None:
-                        # End previous region
-                        regions.append({
-                            'label': current_label,
-                            'start': start_idx,
-                            'end': idx - 1
-                        })
-                    # Start new region
-                    current_label = label
-                    start_idx = idx
-            
-            # Close last region if exists
-            if current_label is not None:
-                regions.append({
-                    'label': current_label,
-                    'start': start_idx,
-                    'end': df.index[-1]
-                })
-            
-            # Draw shaded areas for each region
-            for region in regions:
-                label_text = region['label']
-                start = region['start']
-                end = region['end']
-                color = label_color_map.get(label_text, 'gray')
-                
-                # Shade area
-                ax1.axvspan(start, end, alpha=0.2, color=color, zorder=1)
-                
-                # Add text label at middle of region
-                mid_idx = (start + end) // 2
-                if mid_idx in df.index:
-                    pm_value = df.loc[mid_idx, 'PM2.5']
-
-                    # Add annotation at middle of region with readable contrast
-                    text_color = 'white' if _is_dark_color(color) else 'black'
-                    ax1.annotate(label_text,
-                                 xy=(mid_idx, pm_value),
-                                 xytext=(0, 30),
-                                 textcoords='offset points',
-                                 fontsize=9,
-                                 color=text_color,
-                                 bbox=dict(boxstyle='round,pad=0.5', fc=color, alpha=0.8,
-                                           edgecolor='black', linewidth=1.5),
-                                 ha='center',
-                                 zorder=10)
-        
-        ax1.set_title('PM2.5 and Temperature Over Time with Labeled Regions', fontsize=14, fontweight='bold')
-        
-        # Plot 2: Label distribution
+
+        # Shade runs of each label and annotate them
+        for starts, ends, region_labels, y0, y1 in regions:
+            draw_label_regions(ax1, x, starts, ends, region_labels, color_map, y0=y0, y1=y1,
+                               alpha=0.2 if lanes == 1 else 0.35, linewidth=0, zorder=1)
+        if regions:
+            starts, ends, region_labels = (np.concatenate(part) for part in list(zip(*regions))[:3])
+            annotate_label_regions(ax1, x, starts, ends, region_labels, values[0], color_map)
+
+        names = [name for name, _ in layout['series']]
+        ax1.set_title(f"{' and '.join(names)} Over Time with Labeled Regions", fontsize=14, fontweight='bold')
+
+        # Plot 2: Label distribution (multi-label rows count once per label)
         ax2 = axes[1]
-        label_counts = df['auto_label'].value_counts()
-        # Remove empty labels
-        label_counts = label_counts[label_counts.index != '']
-        
+        label_counts = individual.value_counts()
         if len(label_counts) > 0:
             # Use the same colors as shaded regions so bars correspond to labels
-            bar_colors = [label_color_map.get(l, 'gray') for l in label_counts.index]
-            label_counts.plot(kind='bar', ax=ax2, color=bar_colors, edgecolor='black', linewidth=1.2)
-            ax2.set_title('Label Distribution', fontsize=14, fontweight='bold')
+            draw_label_counts(ax2, label_counts, color_map, rotation=45 if len(label_counts) > 4 else 0)
             ax2.set_xlabel('Labels', fontsize=12)
             ax2.set_ylabel('Count', fontsize=12)
-            ax2.tick_params(axis='x', rotation=0)
             ax2.grid(True, alpha=0.3, axis='y')
-            
-            # Add count labels on bars
-            for i, v in enumerate(label_counts):
-                ax2.text(i, v + 0.5, str(v), ha='center', va='bottom', fontweight='bold')
         else:
-            ax2.text(0.5, 0.5, 'No labels applied', 
-                    ha='center', va='center', fontsize=16, color='gray')
-            ax2.set_title('Label Distribution', fontsize=14, fontweight='bold')
+            ax2.text(0.5, 0.5, 'No labels applied', ha='center', va='center', fontsize=16, color='gray')
             ax2.set_xlim(0, 1)
             ax2.set_ylim(0, 1)
-        
-        plt.tight_layout()
-        
-        # Save plot
-        plot_path = csv_path.replace('.csv', '_plot.png')
-        plt.savefig(plot_path, dpi=100, bbox_inches='tight')
-        print(f"Plot saved to: {plot_path}")
-        
-        # Show plot
-        plt.show()
-        
-        return plot_path
-        
+        ax2.set_title('Label Distribution', fontsize=14, fontweight='bold')
+
+        finish_figure(fig, save_path, show)
+    return save_path or None
+
+def plot_labeled_results(csv_path, config=None, max_points=None, show=True, df=None):
+    """
+    Plot a labeled file next to it as ``<name>_plot.png``.
+
+    Args:
+        csv_path (str): Path to the labeled CSV (or Parquet/Feather) file
+        config (dict|None): Use case config (see ``plot_dataframe``)
+        max_points (int|None): Rows drawn per line (config default if None)
+        show (bool): Show the plot window; False renders headless
+        df (pd.DataFrame|pyarrow.Table|None): The file's rows if already in
+            memory; the file is then not read, only used to name the plot
+
+    Returns:
+        str|None: Saved plot path or None on error
+    """
+    import os
+    from lib.auto_label.dataset_io import read_dataset
+
+    try:
+        if df is None:
+            df = read_dataset(csv_path)
+        return plot_dataframe(df, config, os.path.splitext(csv_path)[0] + '_plot.png', max_points, show)
     except Exception as e:
         print(f"Error plotting results: {e}")
         return None
 
 
-if __name__ == "__main__":
-    # Example usage
-    import sys
-    if len(sys.argv) > 1:
-        csv_file = sys.argv[1]
-        plot_labeled_results(csv_file)
-    else:
-        print("Usage: python render_graph.py <path_to_labeled_csv>")
+def plot_use_case_results(use_case, csv_path, max_points=None, show=True, df=None):
+    """
+    Plot a labeled file with its use case's config.
 
+    Args:
+        use_case (str): Use case name (e.g. "PM_Temperature")
+        csv_path (str): Path to the labeled file
+        max_points (int|None): Rows drawn per line (config default if None)
+        show (bool): Show the plot window; False renders headless
+        df (pd.DataFrame|pyarrow.Table|None): Labeled rows already in memory
+            (e.g. ``LabelResult.df``); read from ``csv_path`` if None
 
-def plot_rain_labeled_dataframe(df, save_path=None):
+    Returns:
+        str|None: Saved plot path or None on error
     """
-    Plot labeled weather/rain forecast data from a DataFrame.
+    from lib.auto_label.query_engine_config import load_config
 
-    Produces two subplots:
-    - Temperature, Humidity, Pressure over time with shaded regions by `auto_label`.
-    - Label distribution bar chart (counts per `auto_label`).
+    return plot_labeled_results(csv_path, load_config(use_case), max_points, show, df)
+
+
+def render_in_background(use_case, csv_path, max_points=None, df=None):
+    """
+    Render a use case's plot headless in a separate process.
+
+    The worker is started with ``spawn`` (safe next to Tk and threads) and
+    reused for later plots; matplotlib state and memory stay in the worker.
 
     Args:
-        df (pd.DataFrame): DataFrame containing `Temp`, `Humidity`, `Pressure` and `auto_label`.
-        save_path (str|None): If provided, saves the plot to this path.
+        use_case (str): Use case name (e.g. "PM_Temperature")
+        csv_path (str): Path to the labeled file
+        max_points (int|None): Rows drawn per line (config default if None)
+        df (pd.DataFrame|None): Labeled rows already in memory; they are
+            pickled to the worker, which is much cheaper than parsing the CSV
 
     Returns:
-        str|None: Saved path or None.
+        concurrent.futures.Future: Resolves to the saved plot path (or None)
     """
-    df_plot = df.copy().reset_index(drop=True)
-
-    # Normalize column names
-    if 'Temp' in df_plot.columns and 'Temperature' not in df_plot.columns:
-        df_plot['Temperature'] = df_plot['Temp']
-
-    # Create figure
-    fig, axes = plt.subplots(2, 1, figsize=(12, 8))
-    ax1 = axes[0]
-
-    # Plot Temperature on left axis
-    ax1.plot(df_plot["Date"], df_plot['Temperature'], label='Temperature (°C)', color='orange', linewidth=2, zorder=3)
-    # ax1.plot(df_plot.index, df_plot['Temperature'], label='Temperature (°C)', color='orange', linewidth=2, zorder=3)
-    ax1.set_ylabel('Temperature (°C)', color='orange', fontsize=12)
-    ax1.tick_params(axis='y', labelcolor='orange')
-    ax1.set_xlabel('Day', fontsize=12)
-    ax1.set_xticks(ax1.get_xticks(), ax1.get_xticklabels(), rotation=60, ha='right')
-    ax1.grid(True, alpha=0.3)
-
-    # Twin axis for Humidity
-    ax1_twin = ax1.twinx()
-    ax1_twin.plot(df_plot["Date"], df_plot['Humidity'], label='Humidity (%)', color='steelblue', linewidth=2, alpha=0.7, zorder=3)
-    ax1_twin.plot(df_plot.index, df_plot['Humidity'], label='Humidity (%)', color='steelblue', linewidth=2, alpha=0.7, zorder=3)
-    ax1_twin.set_ylabel('Humidity (%)', color='steelblue', fontsize=12)
-    ax1_twin.tick_params(axis='y', labelcolor='steelblue')
-
-    # Shade regions by auto_label (reuse label_color_map logic)
-    if 'auto_label' in df_plot.columns:
-        labels_series = df_plot['auto_label'].fillna('').astype(str)
-    else:
-        labels_series = pd.Series([''] * len(df_plot))
+    global _render_executor
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
 
-    unique_labels = [l for l in pd.unique(labels_series) if l != '']
-    label_colors = plt.cm.Set3(range(max(1, len(unique_labels))))
-    label_color_map = dict(zip(unique_labels, label_colors))
+    if _render_executor is None:
+        _render_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _render_executor.submit(plot_use_case_results, use_case, csv_path, max_points, False, df)
 
-    regions = []
-    current_label = None
-    start_idx = None
-    for i, lbl in enumerate(labels_series):
-        if lbl == '' or pd.isna(lbl):
-            if current_label is not None:
-                regions.append({'label': current_label, 'start': start_idx, 'end': i - 1})
-                current_label = None
-            continue
-        if lbl != current_label:
-            if current_label is not None:
-                regions.append({'label': current_label, 'start': start_idx, 'end': i - 1})
-            current_label = lbl
-            start_idx = i
-    if current_label is not None:
-        regions.append({'label': current_label, 'start': start_idx, 'end': len(df_plot) - 1})
-
-    for region in regions:
-        label_text = region['label']
-        start = region['start']
-        end = region['end']
-        color = label_color_map.get(label_text, 'gray')
-        span_start = max(0, start - 0.4)
-        span_end = min(len(df_plot) - 1, end + 0.4)
-        ax1.axvspan(span_start, span_end, alpha=0.25, facecolor=color, edgecolor='k', linewidth=0.6, zorder=1)
-
-        mid_idx = (start + end) // 2
-        if 0 <= mid_idx < len(df_plot):
-            temp_value = df_plot.loc[mid_idx, 'Temperature']
-            annotate_text = str(label_text)
-            ax1.annotate(annotate_text,
-                         xy=(mid_idx, temp_value),
-                         xytext=(0, 20),
-                         textcoords='offset points',
-                         fontsize=9,
-                         color='white' if _is_dark_color(color) else 'black',
-                         bbox=dict(boxstyle='round,pad=0.5', fc=color, alpha=0.85,
-                                   edgecolor='black', linewidth=1.0),
-                         ha='center',
-                         zorder=10)
-
-    ax1.set_title('Weather Predictors Over Time with Rain Forecast Labels', fontsize=14, fontweight='bold')
-
-    # Label distribution
-    ax2 = axes[1]
-    if 'auto_label' in df_plot.columns:
-        label_counts = df_plot['auto_label'].fillna('').value_counts()
-        label_counts = label_counts[label_counts.index != '']
-    else:
-        label_counts = pd.Series([], dtype=int)
-
-    if len(label_counts) > 0:
-        bar_colors = [label_color_map.get(l, 'gray') for l in label_counts.index]
-        label_counts.plot(kind='bar', ax=ax2, color=bar_colors, edgecolor='black', linewidth=1.2)
-        ax2.set_title('Forecast Label Distribution', fontsize=14, fontweight='bold')
-        ax2.set_xlabel('Labels', fontsize=12)
-        ax2.set_ylabel('Count', fontsize=12)
-        ax2.tick_params(axis='x', rotation=45)
-        ax2.grid(True, alpha=0.3, axis='y')
-        for i, v in enumerate(label_counts):
-            ax2.text(i, v + 0.5, str(v), ha='center', va='bottom', fontweight='bold')
-    else:
-        ax2.text(0.5, 0.5, 'No labels applied', ha='center', va='center', fontsize=16, color='gray')
-        ax2.set_title('Forecast Label Distribution', fontsize=14, fontweight='bold')
-        ax2.set_xlim(0, 1)
-        ax2.set_ylim(0, 1)
 
-    plt.tight_layout()
-    if save_path:
-        plt.savefig(save_path, dpi=100, bbox_inches='tight')
-        print(f"Plot saved to: {save_path}")
+if __name__ == "__main__":
+    # Example usage
+    import sys
+    if len(sys.argv) > 2:
+        plot_use_case_results(sys.argv[2], sys.argv[1])
+    elif len(sys.argv) > 1:
+        plot_labeled_results(sys.argv[1])
     else:
-        save_path = None
-    plt.show()
-    return save_path
-
-
-def plot_rain_results(csv_path):
-    try:
-        df = pd.read_csv(csv_path)
-        return plot_rain_labeled_dataframe(df, save_path=csv_path.replace('.csv', '_rain_plot.png'))
-    except Exception as e:
-        print(f"Error plotting rain results: {e}")
-        return None
\ No newline at end of file
+        print("Usage: python render_graph.py <path_to_labeled_csv> [use_case]")
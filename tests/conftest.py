@@ -0,0 +1,28 @@
+import json
+import os
+import shutil
+import sys
+import pytest
+
+# Tests import the project the way the app does (``lib.auto_label...``, ``gemini_api``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def kb(tmp_path):
+	"""A copy of the PM_Temperature knowledge base whose rule files a test may edit."""
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	source = os.path.join(root, "KB", "PM_Temperature")
+	kb_dir = tmp_path / "KB"
+	use_case = kb_dir / "PM_Temperature"
+	use_case.mkdir(parents=True)
+
+	with open(os.path.join(source, "config.json"), encoding='utf-8') as f:
+		config = json.load(f)
+	# Rule files are resolved against the configured kb_dir
+	config['paths']['kb_dir'] = str(kb_dir)
+	(use_case / "config.json").write_text(json.dumps(config), encoding='utf-8')
+	for name in os.listdir(source):
+		if name.endswith('.pl'):
+			shutil.copy(os.path.join(source, name), use_case / name)
+	return str(kb_dir)
@@ -0,0 +1,37 @@
+import os
+import pandas as pd
+import pytest
+from lib.auto_label.dataset_io import DatasetWriter, read_dataset
+from lib.auto_label.labeling_engine import LabelingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("pyarrow")
+
+
+def test_parquet_chunks_with_int_then_float_values(tmp_path):
+	path = str(tmp_path / "out.parquet")
+	with DatasetWriter(path, label_column='auto_label') as writer:
+		writer.write(pd.DataFrame({'Temp': [20, 21], 'auto_label': ['a', 'b']}))
+		writer.write(pd.DataFrame({'Temp': [52.9, None], 'auto_label': ['c', '']}))
+
+	df = read_dataset(path)
+	assert df['Temp'].tolist()[:3] == [20.0, 21.0, 52.9]
+	assert pd.isna(df['Temp'].iloc[3])
+	assert df['auto_label'].astype(str).tolist() == ['a', 'b', 'c', '']
+
+
+def test_chunked_parquet_output_matches_csv_output(tmp_path):
+	engine = LabelingEngine("PM_Temperature", os.path.join(ROOT, "KB"),
+							rules_file="generated_rules_20251207_180709.pl")
+	source = os.path.join(ROOT, "data", "PM_Temp.csv")
+	try:
+		engine.label_dataset(source, str(tmp_path / "out.parquet"), chunksize=1)
+		engine.label_dataset(source, str(tmp_path / "out.csv"), chunksize=0)
+	finally:
+		engine.close()
+
+	parquet = read_dataset(str(tmp_path / "out.parquet"))
+	csv = pd.read_csv(str(tmp_path / "out.csv"))
+	assert parquet['auto_label'].astype(str).tolist() == csv['auto_label'].fillna('').tolist()
+	assert parquet['PM2.5'].tolist() == csv['PM2.5'].astype(float).tolist()
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import pytest
+from gemini_api import GEMINI_GOOGLE, StubGeminiClient, generate_rules_from_dir
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    """A use case whose KB and response cache live under ``tmp_path``."""
+    monkeypatch.chdir(tmp_path)
+    kb_dir = tmp_path / "KB"
+    (kb_dir / "Demo").mkdir(parents=True)
+    config = {
+        "paths": {"kb_dir": str(kb_dir)},
+        "generation": {"cache_dir": str(tmp_path / "cache")},
+        "dataset": {"columns": [{"name": "PM2.5", "type": "numeric", "prolog_name": "PM2_5",
+                                 "description": "PM2.5 level"}]},
+    }
+    with open(kb_dir / "Demo" / "config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return kb_dir, config
+
+
+def test_get_responses_keeps_prompt_order(kb):
+    _, config = kb
+    stub = StubGeminiClient(reply=lambda contents: contents.split("\n")[-1])
+    gemini = GEMINI_GOOGLE(client=stub)
+    prompts = [f"prompt {i}" for i in range(5)]
+
+    responses = gemini.get_responses(prompts, config, concurrency=2)
+
+    assert len(responses) == 5
+    assert all(f"prompt {i}" in response for i, response in enumerate(responses))
+    assert len(stub.calls) == 5
+
+
+def test_get_responses_limits_concurrency(kb):
+    _, config = kb
+    stub = StubGeminiClient(delay=0.05)
+    in_flight = [0, 0]
+    generate = stub.aio.models.generate_content
+
+    async def counting(model, contents):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        try:
+            return await generate(model, contents)
+        finally:
+            in_flight[0] -= 1
+
+    stub.aio.models.generate_content = counting
+    GEMINI_GOOGLE(client=stub).get_responses([f"p{i}" for i in range(6)], config, concurrency=2)
+
+    assert in_flight[1] == 2
+
+
+def test_get_responses_rate_limits(kb):
+    _, config = kb
+    started = time.monotonic()
+    GEMINI_GOOGLE(client=StubGeminiClient()).get_responses(["a", "b", "c"], config, requests_per_minute=600)
+
+    # 600 rpm spaces request starts 0.1s apart
+    assert time.monotonic() - started >= 0.2
+
+
+def test_get_responses_retries_failed_requests(kb):
+    _, config = kb
+    failures = [2]
+
+    def flaky(contents):
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError("503")
+        return "ok"
+
+    stub = StubGeminiClient(reply=flaky)
+    responses = GEMINI_GOOGLE(client=stub).get_responses(["p"], config, retries=2, backoff=0.01)
+
+    assert responses == ["ok"]
+    assert len(stub.calls) == 3
+
+
+def test_get_responses_gives_up_after_retries(kb):
+    _, config = kb
+
+    def failing(contents):
+        raise RuntimeError("503")
+
+    responses = GEMINI_GOOGLE(client=StubGeminiClient(reply=failing)).get_responses(["p"], config, retries=1,
+                                                                                   backoff=0.01)
+    assert responses == [None]
+
+
+def test_get_responses_times_out(kb):
+    _, config = kb
+    responses = GEMINI_GOOGLE(client=StubGeminiClient(delay=1.0)).get_responses(["p"], config, retries=0,
+                                                                               timeout=0.05)
+    assert responses == [None]
+
+
+def test_injected_client_never_uses_response_cache(kb, tmp_path):
+    _, config = kb
+    gemini = GEMINI_GOOGLE(client=StubGeminiClient())
+    gemini.get_response("prompt", config)
+    gemini.get_responses(["prompt"], config)
+
+    assert gemini.get_cache(config) is None
+    assert not (tmp_path / "cache").exists()
+    # A real client still caches
+    assert GEMINI_GOOGLE().get_cache(config) is not None
+
+
+def test_generate_rules_from_dir_writes_rule_files(kb, tmp_path):
+    kb_dir, _ = kb
+    prompt_dir = tmp_path / "prompts"
+    prompt_dir.mkdir()
+    for name in ("a", "b"):
+        (prompt_dir / f"{name}.txt").write_text(f"Label {name}", encoding="utf-8")
+
+    results = generate_rules_from_dir(str(prompt_dir), "Demo", kb_dir=str(kb_dir), client=StubGeminiClient())
+
+    assert sorted(os.path.basename(path) for path in results) == ["a.txt", "b.txt"]
+    for path in results.values():
+        assert os.path.dirname(path) == str(kb_dir / "Demo")
+        assert path.endswith(".pl")
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == ":- encoding(utf8).\nstub_label(_, 'stub') :- true.\n"
@@ -0,0 +1,94 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from lib.auto_label.labeling_engine import LabelingEngine
+from lib.auto_label.incremental import load_watermark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Rule file the vectorized compiler handles completely (no Prolog needed)
+RULES_FILE = "generated_rules_20251207_180709.pl"
+OLD_RULES = "generated_rules_20251207_142538.pl"
+
+
+@pytest.fixture
+def engine():
+	engine = LabelingEngine("PM_Temperature", os.path.join(ROOT, "KB"), rules_file=RULES_FILE)
+	yield engine
+	engine.close()
+
+
+@pytest.fixture
+def source_rows():
+	return pd.read_csv(os.path.join(ROOT, "data", "PM_Temp.csv"))
+
+
+def write_rows(path, rows, header=True, trailing_newline=True, mode='w'):
+	text = rows.to_csv(index=False, header=header)
+	if not trailing_newline:
+		text = text.rstrip('\n')
+	with open(path, mode, newline='', encoding='utf-8') as f:
+		f.write(text)
+
+
+def labels(df, engine):
+	return df[engine.label_column].astype(object).fillna('').tolist()
+
+
+@pytest.mark.parametrize("chunksize", [0, 7])
+def test_source_without_trailing_newline_is_not_labeled_twice(tmp_path, engine, source_rows, chunksize):
+	source = str(tmp_path / "source.csv")
+	output = str(tmp_path / "labeled.csv")
+	write_rows(source, source_rows.iloc[:30], trailing_newline=False)
+
+	first = engine.label_dataset(source, output, chunksize=chunksize, incremental=True)
+	# The unterminated last row may still be being written
+	assert first.rows == 29
+	assert load_watermark(source)['rows'] == 29
+
+	# An appender completes the last line and adds more rows
+	with open(source, 'a', newline='', encoding='utf-8') as f:
+		f.write('\n')
+	write_rows(source, source_rows.iloc[30:40], header=False, mode='a')
+	second = engine.label_dataset(source, chunksize=chunksize, incremental=True)
+
+	labeled = pd.read_csv(second.output_path)
+	assert second.rows == 40
+	assert labeled['No.'].tolist() == source_rows['No.'].iloc[:40].tolist()
+	assert labels(labeled, engine) == labels(engine.label(source_rows.iloc[:40].copy()), engine)
+
+
+def test_rows_after_measured_end_are_left_for_next_run(tmp_path, engine, source_rows):
+	source = str(tmp_path / "source.csv")
+	output = str(tmp_path / "labeled.csv")
+	write_rows(source, source_rows.iloc[:20])
+	write_rows(source, source_rows.iloc[20:21], header=False, trailing_newline=False, mode='a')
+
+	engine.label_dataset(source, output, incremental=True)
+	with open(source, 'a', newline='', encoding='utf-8') as f:
+		f.write('\n')
+	result = engine.label_dataset(source, incremental=True)
+
+	labeled = pd.read_csv(result.output_path)
+	assert labeled['No.'].tolist() == source_rows['No.'].iloc[:21].tolist()
+	assert load_watermark(source)['rows'] == 21
+
+
+def test_rule_diff_rebuilds_when_old_rule_file_was_edited(tmp_path, kb, source_rows):
+	source = str(tmp_path / "source.csv")
+	output = str(tmp_path / "labeled.csv")
+	write_rows(source, source_rows)
+	old = LabelingEngine("PM_Temperature", kb, rules_file=OLD_RULES)
+	old.label_dataset(source, output, incremental=True)
+	old.close()
+
+	# The old rule file no longer holds the rules the output was labeled with
+	rules_dir = os.path.join(kb, "PM_Temperature")
+	shutil.copy(os.path.join(rules_dir, RULES_FILE), os.path.join(rules_dir, OLD_RULES))
+	new = LabelingEngine("PM_Temperature", kb, rules_file=RULES_FILE)
+	result = new.label_dataset(source, incremental=True, rule_diff=True)
+	expected = labels(new.label(source_rows.copy()), new)
+	new.close()
+
+	assert labels(pd.read_csv(result.output_path), new) == expected
+	assert load_watermark(source)['rules_hash'] == new.rules_hash
@@ -0,0 +1,193 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+from lib.auto_label import query_rule
+from lib.auto_label.labeling_engine import LabelingEngine
+from lib.auto_label.query_engine_config import build_column_mapping, load_config
+from lib.auto_label.rule_cache import LRUCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAPPING = {'Temperature': 'Temp', 'PM2_5': 'PM2.5'}
+PROLOG_VARS = ['Temperature', 'PM2_5']
+
+# label_single_row asserts temperature/1 for the row being labeled
+FACT_RULES = """
+hot_now :- temperature(T), T > 30.
+heat(Temperature, 'hot') :- hot_now.
+heat(Temperature, 'mild') :- Temperature =< 30.
+"""
+
+ARG_RULES = """
+high(T) :- T > 30.
+heat(Temperature, 'hot') :- high(Temperature).
+heat(Temperature, 'mild') :- Temperature =< 30.
+"""
+
+
+class FakeProlog:
+	"""Answers batch queries from the consulted row facts: row Id gets label t<V0>."""
+
+	def __init__(self):
+		self.consulted = []
+		self.rows = []
+
+	def consult(self, path):
+		with open(path, encoding='utf-8') as f:
+			self.rows = re.findall(r"^row\((\d+), ([^,)]+)", f.read(), re.M)
+		self.consulted.append(len(self.rows))
+
+	def query(self, query_str):
+		if query_str.startswith('unload_file'):
+			self.rows = []
+			return iter([])
+		return iter([{'Pairs': [[int(row_id), f"t{value}"] for row_id, value in self.rows]}])
+
+
+def predicates_for(tmp_path, text):
+	path = tmp_path / "rules.pl"
+	path.write_text(text)
+	predicates, _ = query_rule.extract_predicates_from_rules(str(path), prolog_var_names=PROLOG_VARS)
+	return str(path), predicates
+
+
+def test_predicates_record_fact_reads_through_helpers(tmp_path):
+	_, fact_predicates = predicates_for(tmp_path, FACT_RULES)
+	_, arg_predicates = predicates_for(tmp_path, ARG_RULES)
+
+	assert 'temperature/1' in fact_predicates[0]['calls']
+	assert query_rule.reads_row_facts(fact_predicates, MAPPING)
+	assert not query_rule.reads_row_facts(arg_predicates, MAPPING)
+
+
+def test_batch_labels_rows_that_read_facts_one_by_one(tmp_path, monkeypatch):
+	_, predicates = predicates_for(tmp_path, FACT_RULES)
+	monkeypatch.setattr(query_rule, 'label_single_row', lambda prolog, row, *args: f"row{row['Temp']}")
+	df = pd.DataFrame({'Temp': [35, 10], 'PM2.5': [1, 2]})
+
+	labels = query_rule.label_rows_batch(FakeProlog(), df, predicates, MAPPING, PROLOG_VARS, True)
+
+	assert labels == ['row35', 'row10']
+
+
+def test_batch_consults_bounded_sub_batches_in_order(tmp_path, monkeypatch):
+	_, predicates = predicates_for(tmp_path, ARG_RULES)
+	monkeypatch.setattr(query_rule, 'BATCH_ROWS', 2)
+	prolog = FakeProlog()
+	df = pd.DataFrame({'Temp': [1, 2, 3, 4, 5], 'PM2.5': [0, 0, 0, 0, 0]})
+
+	labels = query_rule.label_rows_batch(prolog, df, predicates, MAPPING, PROLOG_VARS, True)
+
+	assert labels == ['t1', 't2', 't3', 't4', 't5']
+	assert prolog.consulted == [2, 2, 1]
+
+
+@pytest.mark.parametrize("rules", [ARG_RULES, FACT_RULES])
+def test_batch_matches_row_labels(tmp_path, rules):
+	pytest.importorskip("pyswip")
+	config = load_config("PM_Temperature")
+	column_mapping, prolog_var_names = build_column_mapping(config)
+	path = tmp_path / "rules.pl"
+	path.write_text(rules)
+	predicates, _ = query_rule.extract_predicates_from_rules(str(path), prolog_var_names=prolog_var_names)
+	df = pd.read_csv(os.path.join(ROOT, "data", "PM_Temp.csv"))
+	prolog = query_rule.load_prolog(str(path))
+
+	batch = query_rule.label_rows(prolog, df, predicates, column_mapping, prolog_var_names, True, batch=True)
+	rows = query_rule.label_rows(prolog, df, predicates, column_mapping, prolog_var_names, True, batch=False)
+
+	assert batch == rows
+
+
+class ThreadExecutor(ThreadPoolExecutor):
+	"""Stands in for the spawn process pool; records every pool started and stopped."""
+
+	started = []
+
+	def __init__(self, max_workers, mp_context, initializer, initargs):
+		super().__init__(max_workers, initializer=initializer, initargs=initargs)
+		self.stopped = False
+		ThreadExecutor.started.append(self)
+
+	def shutdown(self, *args, **kwargs):
+		self.stopped = True
+		super().shutdown(*args, **kwargs)
+
+
+@pytest.fixture
+def fake_workers(monkeypatch):
+	"""Run pool workers as threads with a fake labeler; returns the rule files workers consulted."""
+	consulted = []
+
+	def fake_label_rows(prolog, rows, *args, **kwargs):
+		# Later chunks finish first, so results arrive out of order
+		time.sleep(0.05 / (1 + rows['Temp'].iloc[0]))
+		return [f"t{value}" for value in rows['Temp']]
+
+	monkeypatch.setattr(ThreadExecutor, 'started', [])
+	monkeypatch.setattr(query_rule, 'ProcessPoolExecutor', ThreadExecutor)
+	monkeypatch.setattr(query_rule, 'load_prolog', lambda rule_file: consulted.append(rule_file))
+	monkeypatch.setattr(query_rule, 'label_rows', fake_label_rows)
+	return consulted
+
+
+def test_pool_labels_match_serial_order(tmp_path, fake_workers):
+	rule_file, predicates = predicates_for(tmp_path, ARG_RULES)
+	df = pd.DataFrame({'Temp': range(10), 'PM2.5': [0] * 10})
+
+	def run(workers):
+		return query_rule.label_dataframe(df, rule_file, predicates, MAPPING, PROLOG_VARS, True, vectorize=False,
+										  workers=workers, prolog_loader=lambda: None)
+
+	assert run(3) == run(1) == [f"t{value}" for value in range(10)]
+	# The temporary pool is stopped when label_dataframe returns
+	assert [executor.stopped for executor in ThreadExecutor.started] == [True]
+
+
+def test_pool_workers_consult_once_across_calls(tmp_path, fake_workers):
+	rule_file, predicates = predicates_for(tmp_path, ARG_RULES)
+	pool = query_rule.PrologWorkerPool(rule_file, 2)
+	df = pd.DataFrame({'Temp': range(6), 'PM2.5': [0] * 6})
+
+	for _ in range(3):
+		labels = query_rule.label_rows_parallel(pool, df, predicates, MAPPING, PROLOG_VARS, True)
+		assert labels == [f"t{value}" for value in range(6)]
+
+	assert len(ThreadExecutor.started) == 1
+	assert 1 <= len(fake_workers) <= 2
+	assert set(fake_workers) == {rule_file}
+	pool.shutdown()
+	assert ThreadExecutor.started[0].stopped
+
+
+def test_engine_stops_workers_on_load_rules_and_close(fake_workers):
+	engine = LabelingEngine("PM_Temperature", os.path.join(ROOT, "KB"), workers=2,
+							rules_file="generated_rules_20251207_142538.pl")
+	first = engine.worker_pool()
+
+	engine.load_rules("generated_rules_20251207_180709.pl")
+	assert first.stopped
+	second = engine.worker_pool()
+	assert second is not first and not second.stopped
+
+	engine.close()
+	assert second.stopped
+
+
+def test_memoized_rows_with_nan_hit_the_cache():
+	queried = []
+
+	def label_fn(rows):
+		queried.append(len(rows))
+		return [f"t{value}" for value in rows['Temp']]
+
+	cache = LRUCache(16)
+	df = pd.DataFrame({'Temp': [1.0, float('nan'), 1.0, float('nan')], 'PM2.5': [float('nan')] * 4})
+
+	first = query_rule.label_rows_memoized(df, MAPPING, label_fn, cache)
+	second = query_rule.label_rows_memoized(df.copy(), MAPPING, label_fn, cache)
+
+	assert first == second == ['t1.0', 'tnan', 't1.0', 'tnan']
+	assert queried == [2]
@@ -0,0 +1,140 @@
+import os
+import pandas as pd
+import pytest
+from lib.auto_label import dataset_io
+from lib.auto_label.labeling_engine import LabelingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OLD_RULES = "generated_rules_20251207_142538.pl"
+NEW_RULES = "generated_rules_20251207_180709.pl"
+
+
+@pytest.fixture
+def labeled(tmp_path):
+	"""A copy of the PM data labeled with ``OLD_RULES``."""
+	path = str(tmp_path / "labeled.csv")
+	engine = LabelingEngine("PM_Temperature", os.path.join(ROOT, "KB"), rules_file=OLD_RULES)
+	engine.label_csv(os.path.join(ROOT, "data", "PM_Temp.csv"), path, chunksize=0)
+	engine.close()
+	return path
+
+
+@pytest.fixture
+def engine():
+	engine = LabelingEngine("PM_Temperature", os.path.join(ROOT, "KB"), rules_file=NEW_RULES)
+	yield engine
+	engine.close()
+
+
+def test_rule_diff_without_output_path_uses_config_pattern(tmp_path, labeled, engine, monkeypatch):
+	output = str(tmp_path / "relabeled.csv")
+	monkeypatch.setattr("lib.auto_label.labeling_engine.get_output_csv_path", lambda config: output)
+	before = pd.read_csv(labeled)
+
+	result = engine.label_dataset(labeled, rule_diff=True)
+
+	assert result.output_path == output
+	assert set(pd.read_csv(output)['rules_file']) == {NEW_RULES}
+	pd.testing.assert_frame_equal(pd.read_csv(labeled), before)
+
+
+def test_failed_in_place_relabel_keeps_existing_labels(labeled, engine, monkeypatch):
+	before = pd.read_csv(labeled)
+
+	def fail(df, path, *args, **kwargs):
+		with open(path, 'w') as f:
+			f.write("No.,Date\n1,")
+		raise OSError("disk full")
+
+	monkeypatch.setattr(pd.DataFrame, "to_csv", fail)
+	with pytest.raises(OSError):
+		engine.relabel(labeled, labeled)
+	monkeypatch.undo()
+
+	pd.testing.assert_frame_equal(pd.read_csv(labeled), before)
+	assert not os.path.exists(dataset_io.part_path(labeled))
+
+
+DIFF_OLD = """
+pm_band(PM2_5, 'pm_high') :- PM2_5 > 50.
+pm_band(PM2_5, 'pm_low') :- PM2_5 =< 50.
+temp_band(Temperature, 'hot') :- Temperature > 30.
+"""
+
+
+def write_rules(kb, name, text):
+	with open(os.path.join(kb, "PM_Temperature", name), 'w', encoding='utf-8') as f:
+		f.write(text)
+
+
+def label_with(kb, rules_file, source, output):
+	engine = LabelingEngine("PM_Temperature", kb, rules_file=rules_file)
+	engine.label_csv(source, output, chunksize=0)
+	engine.close()
+
+
+def record_relabeled(engine, monkeypatch):
+	"""Record the ``Temp`` values of every row the engine labels again."""
+	rows = []
+	label = engine.label
+
+	def recording_label(df):
+		rows.extend(df['Temp'])
+		return label(df)
+
+	monkeypatch.setattr(engine, "label", recording_label)
+	return rows
+
+
+def test_rule_diff_relabels_only_changed_regions(tmp_path, kb, monkeypatch):
+	source = os.path.join(ROOT, "data", "PM_Temp.csv")
+	labeled = str(tmp_path / "labeled.csv")
+	write_rules(kb, "old.pl", DIFF_OLD)
+	write_rules(kb, "new.pl", DIFF_OLD.replace("Temperature > 30", "Temperature > 32"))
+	label_with(kb, "old.pl", source, labeled)
+
+	engine = LabelingEngine("PM_Temperature", kb, rules_file="new.pl")
+	relabeled_rows = record_relabeled(engine, monkeypatch)
+	engine.relabel(labeled, str(tmp_path / "relabeled.csv"))
+	monkeypatch.undo()
+
+	before = pd.read_csv(labeled)
+	after = pd.read_csv(str(tmp_path / "relabeled.csv"))
+	expected = engine.label(pd.read_csv(source))
+	engine.close()
+
+	# pm_band is unchanged; temp_band only answers differently for 30 < Temp <= 32
+	changed = (before['Temp'] > 30) & (before['Temp'] <= 32)
+	assert sorted(relabeled_rows) == sorted(before.loc[changed, 'Temp'])
+	assert after['auto_label'].fillna('').tolist() == expected['auto_label'].tolist()
+	assert after.loc[~changed, 'auto_label'].equals(before.loc[~changed, 'auto_label'])
+	assert set(after['rules_hash']) == {engine.rules_hash}
+
+
+def test_rule_diff_relabels_everything_when_old_rule_file_was_edited(tmp_path, kb, monkeypatch):
+	source = os.path.join(ROOT, "data", "PM_Temp.csv")
+	labeled = str(tmp_path / "labeled.csv")
+	label_with(kb, OLD_RULES, source, labeled)
+	# The old rule file is overwritten after labeling, so diffing against it would keep stale labels
+	write_rules(kb, OLD_RULES, open(os.path.join(kb, "PM_Temperature", NEW_RULES), encoding='utf-8').read())
+
+	engine = LabelingEngine("PM_Temperature", kb, rules_file=NEW_RULES)
+	relabeled_rows = record_relabeled(engine, monkeypatch)
+	engine.relabel(labeled, str(tmp_path / "relabeled.csv"))
+	monkeypatch.undo()
+	expected = engine.label(pd.read_csv(source))
+	engine.close()
+
+	assert len(relabeled_rows) == 72
+	after = pd.read_csv(str(tmp_path / "relabeled.csv"))
+	assert after['auto_label'].fillna('').tolist() == expected['auto_label'].tolist()
+
+
+def test_parquet_output_keeps_rules_hash_in_metadata(tmp_path, engine):
+	pytest.importorskip("pyarrow")
+	output = str(tmp_path / "labeled.parquet")
+	engine.label_csv(os.path.join(ROOT, "data", "PM_Temp.csv"), output, chunksize=10)
+
+	df = dataset_io.read_dataset(output)
+	assert 'rules_hash' not in df.columns
+	assert df.attrs['rules_hash'] == engine.rules_hash
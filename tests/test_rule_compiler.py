@@ -0,0 +1,143 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from lib.auto_label import query_rule
+from lib.auto_label.query_engine_config import build_column_mapping, load_config
+from lib.auto_label.rule_compiler import (
+	UnsupportedRuleError, build_value_columns, compile_label_predicate, compile_rule_file, label_dataframe_vectorized,
+	load_clauses,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rule files next to the labels PySwip produced for them with label_single_row
+PROLOG_OUTPUTS = [
+	('PM_Temperature', 'generated_rules_20251207_180709.pl', 'PM_Temp.csv', 'PM_Temp_labeled_20251207_180709.csv'),
+	('PM_Temperature', 'generated_rules_20251207_142538.pl', 'PM_Temp.csv', 'PM_Temp_labeled_20251207_142538.csv'),
+	('PM_Temperature', 'generated_rules_20251205_005514.pl', 'PM_Temp.csv', 'PM_Temp_labeled_20251205_005514.csv'),
+	('Rain_Forecast', 'generated_rules_20251207_180819.pl', 'weather_monthly_30days_prepped.csv',
+	 'weather_labeled_20251207_180819.csv'),
+]
+
+PROLOG_VARS = ['Temperature', 'PM2_5']
+MAPPING = {'Temperature': 'Temp', 'PM2_5': 'PM2.5'}
+
+RULES = """
+temperature_band(Temperature, 'hot') :- Temperature > 30.
+temperature_band(Temperature, 'warm') :- Temperature > 20.
+temperature_band(Temperature, 'cold') :- Temperature =< 20.
+
+air_quality(PM2_5, _, 'polluted') :- PM2_5 >= 50.
+air_quality(_, _, 'hot') :- true.
+"""
+
+PREDICATES = [
+	{'name': 'temperature_band', 'arg_names': ['Temperature']},
+	{'name': 'air_quality', 'arg_names': ['PM2_5', '_']},
+]
+
+
+def write_rules(tmp_path, text):
+	path = tmp_path / "rules.pl"
+	path.write_text(text)
+	return str(path)
+
+
+def label(df, rule_file, predicates, multi_label):
+	compiled = compile_rule_file(rule_file, predicates, PROLOG_VARS)
+	return label_dataframe_vectorized(df, compiled, MAPPING, multi_label)
+
+
+@pytest.mark.parametrize("use_case, rules_file, source, expected", PROLOG_OUTPUTS)
+def test_compiled_labels_match_prolog(use_case, rules_file, source, expected):
+	config = load_config(use_case)
+	column_mapping, prolog_var_names = build_column_mapping(config)
+	rule_file = os.path.join(ROOT, "KB", use_case, rules_file)
+	predicates, _ = query_rule.extract_predicates_from_rules(rule_file, prolog_var_names=prolog_var_names)
+	df = pd.read_csv(os.path.join(ROOT, "data", source))
+
+	compiled = compile_rule_file(rule_file, predicates, prolog_var_names)
+	labels, fallback = label_dataframe_vectorized(df, compiled, column_mapping, multi_label=True)
+
+	assert not fallback.any()
+	assert list(labels) == pd.read_csv(os.path.join(ROOT, "data", expected))['auto_label'].fillna('').tolist()
+
+
+def test_single_label_takes_first_matching_clause(tmp_path):
+	df = pd.DataFrame({'Temp': [35.0, 25.0, 10.0], 'PM2.5': [10.0, 60.0, 10.0]})
+
+	labels, fallback = label(df, write_rules(tmp_path, RULES), PREDICATES, multi_label=False)
+
+	assert list(labels) == ['hot', 'warm', 'cold']
+	assert not fallback.any()
+
+
+def test_multi_label_keeps_predicate_then_clause_order(tmp_path):
+	df = pd.DataFrame({'Temp': [35.0, 25.0], 'PM2.5': [60.0, 10.0]})
+
+	labels, _ = label(df, write_rules(tmp_path, RULES), PREDICATES, multi_label=True)
+
+	# 'hot' from air_quality repeats an earlier label and is dropped
+	assert list(labels) == ['hot; warm; polluted', 'warm; hot']
+
+
+def test_unmapped_argument_is_zero(tmp_path):
+	rule_file = write_rules(tmp_path, "humidity_band(Humidity, 'dry') :- Humidity < 1.\n"
+									  "humidity_band(Humidity, 'wet') :- Humidity >= 1.\n")
+	df = pd.DataFrame({'Temp': [35.0, 5.0], 'PM2.5': [1.0, 2.0]})
+
+	labels, fallback = label(df, rule_file, [{'name': 'humidity_band', 'arg_names': ['Humidity']}], False)
+
+	assert list(labels) == ['dry', 'dry']
+	assert not fallback.any()
+
+
+def test_unbound_argument_in_arithmetic_is_not_compiled(tmp_path):
+	clauses = load_clauses(write_rules(tmp_path, "band(_, T, 'hot') :- T > 30.\n"))
+
+	with pytest.raises(UnsupportedRuleError):
+		compile_label_predicate({'name': 'band', 'arg_names': ['Temperature', '_']}, clauses, PROLOG_VARS)
+
+
+def test_non_numeric_values_fall_back(tmp_path):
+	df = pd.DataFrame({'Temp': ['35', 'n/a', None, '07:00'], 'PM2.5': [1.0, 1.0, 1.0, np.nan]})
+
+	labels, fallback = label(df, write_rules(tmp_path, RULES), PREDICATES[:1], multi_label=False)
+
+	assert list(fallback) == [False, True, True, False]
+	assert list(labels) == ['hot', '', '', 'cold']
+	# PM2.5 is not read by temperature_band, so its NaN does not matter
+	values, valid = build_value_columns(df, MAPPING)
+	assert values['Temperature'][3] == 7.0
+	assert not valid['PM2_5'][3]
+
+
+def test_label_dataframe_sends_only_fallback_rows_to_prolog(tmp_path, monkeypatch):
+	queried = []
+
+	def fake_label_rows(prolog, rows, predicates, column_mapping, prolog_var_names, multi_label, batch=False):
+		queried.extend(rows['Temp'])
+		return ['from_prolog'] * len(rows)
+
+	monkeypatch.setattr(query_rule, 'label_rows', fake_label_rows)
+	df = pd.DataFrame({'Temp': [35.0, 'n/a', 10.0, 'n/a'], 'PM2.5': [1.0, 1.0, 1.0, 1.0]})
+
+	labels = query_rule.label_dataframe(df, write_rules(tmp_path, RULES), PREDICATES[:1], MAPPING, PROLOG_VARS,
+										False, prolog_loader=lambda: None)
+
+	assert labels == ['hot', 'from_prolog', 'cold', 'from_prolog']
+	# Both 'n/a' rows share one input tuple and are queried once
+	assert queried == ['n/a']
+
+
+def test_uncompilable_rules_send_every_row_to_prolog(tmp_path, monkeypatch):
+	monkeypatch.setattr(query_rule, 'label_rows',
+						lambda prolog, rows, *args, **kwargs: ['from_prolog'] * len(rows))
+	rule_file = write_rules(tmp_path, "band(T, 'odd') :- T mod 2 =:= 1.\n")
+	df = pd.DataFrame({'Temp': [1.0, 2.0], 'PM2.5': [1.0, 1.0]})
+
+	labels = query_rule.label_dataframe(df, rule_file, [{'name': 'band', 'arg_names': ['Temperature']}], MAPPING,
+										PROLOG_VARS, False, prolog_loader=lambda: None)
+
+	assert labels == ['from_prolog', 'from_prolog']
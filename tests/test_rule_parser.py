@@ -0,0 +1,72 @@
+import pickle
+from lib.auto_label.rule_parser import QuotedAtom, read_terms, describe_clause, is_label_clause
+
+
+def clause(text):
+	return describe_clause(read_terms(text)[0])
+
+
+def test_label_rule_is_label_clause():
+	assert is_label_clause(clause("label_pm(PM2_5, 'High') :- PM2_5 > 50."))
+
+
+def test_multi_argument_label_rule_is_label_clause():
+	assert is_label_clause(clause("label_risk(PM2_5, _, 'High risk') :-\n    PM2_5 > 50."))
+
+
+def test_helper_with_unquoted_atom_is_not_label_clause():
+	assert not is_label_clause(clause("level(X, high) :- X > 50."))
+
+
+def test_fact_is_not_label_clause():
+	assert not is_label_clause(clause("threshold(X, 'high')."))
+
+
+def test_directive_is_not_label_clause():
+	assert not is_label_clause(clause(":- dynamic(level/2)."))
+
+
+def test_non_variable_argument_is_not_label_clause():
+	assert not is_label_clause(clause("label_pm(50, 'High') :- true."))
+
+
+def test_quoted_atom_equals_unquoted_atom():
+	head = read_terms("level('high').")[0]
+	assert isinstance(head[2][0], QuotedAtom)
+	assert head == read_terms("level(high).")[0]
+	assert hash(head[2][0]) == hash(('atom', 'high'))
+
+
+def test_quoted_flag_survives_pickle():
+	# Parsed clauses are cached on disk with pickle
+	parsed = clause("label_pm(PM2_5, 'High') :- PM2_5 > 50.")
+	assert is_label_clause(pickle.loads(pickle.dumps(parsed)))
+
+
+def test_fenced_rules_skip_only_the_fenced_clauses():
+	# LLM replies sometimes keep their Markdown fence; SWI rejects the clause it is glued to
+	errors = []
+	terms = read_terms("```prolog\nlow(X, 'Low') :- X < 10.\nhigh(X, 'High') :- X > 50.\n```\n", errors)
+	assert [describe_clause(term)['name'] for term in terms] == ['high']
+	assert len(errors) == 2
+
+
+def test_unterminated_string_skips_only_its_clause():
+	errors = []
+	terms = read_terms('note(X) :- X = "open.\nhigh(X, \'High\') :- X > 50.\n', errors)
+	assert len(errors) == 1
+	assert [describe_clause(term)['name'] for term in terms] == ['high']
+
+
+def test_character_code_literals():
+	assert read_terms("c(0'a, 0'\\n, 0''', 0'').") == [('compound', 'c', [('num', 97), ('num', 10), ('num', 39), ('num', 39)])]
+	terms = read_terms("is_a(X, 'A') :- X =:= 0'a.\nafter(X, 'B') :- X > 1.\n")
+	assert [describe_clause(term)['name'] for term in terms] == ['is_a', 'after']
+
+
+def test_radix_and_float_literals():
+	assert read_terms("n(0x10, 0o17, 0b101, 1.5, 2.0e3, 7).") == [
+		('compound', 'n', [('num', 16), ('num', 15), ('num', 5), ('num', 1.5), ('num', 2000.0), ('num', 7)])]
+	errors = []
+	assert len(read_terms("hex(X, 'Hex') :- X > 0x10.\n", errors)) == 1
+	assert errors == []